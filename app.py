@@ -1,12 +1,28 @@
 # app.py
+import threading
+
 from flask import Flask, jsonify
-from flask_jwt_extended import JWTManager, jwt_required, get_jwt
+from flask_jwt_extended import JWTManager, jwt_required
 from flask_cors import CORS
 from dotenv import load_dotenv
 from flask_migrate import Migrate
 
 from config import Config
 from extensions import db
+from db_engine import init_engines
+from db_router import init_router, read_only_blueprints
+from query_stats import init_query_stats
+from metrics import init_metrics
+from json_provider import init_json
+from compression import init_compression
+from services.recommender_provider import warm_recommender
+from services.feed_service import init_feed_worker
+from services.pay_events import init_pay_events
+from services.pay_reconciler import init_pay_reconciler
+from services.outbox import init_outbox
+from services.entitlement_cache import init_entitlement_cache
+from services.entitlement_service import init_entitlement_sweeper
+from services.rbac import current_roles, init_rbac
 
 # ---- 导入各个蓝图 ----
 from routes.auth import auth_bp
@@ -40,15 +56,52 @@ from routes.me_services import me_services_bp  # ✅ 新增：我的服务/权
 load_dotenv()
 
 
+def init_background_workers(app) -> None:
+    """
+    后台线程统一入口，BACKGROUND_WORKERS=0 时全部不启动（各线程另有独立开关）：
+    - Redis 订阅：支付事件 / 权益快照失效 / 角色权限失效
+    - 推荐流刷新、支付对账（上游查单只在这里发生）、发件箱投递、权益过期清理
+    在第一个请求到来时启动，而不是在 create_app() 里：flask db upgrade、命令行脚本、tools/ 只创建 app 不处理请求，
+    不会带起这些线程；gunicorn --preload 时线程也起在 fork 之后的 worker 里。
+    """
+    if not app.config["BACKGROUND_WORKERS"]:
+        return
+    lock = threading.Lock()
+    started = False
+
+    @app.before_request
+    def _start_background_workers():
+        nonlocal started
+        if started:
+            return
+        with lock:
+            if started:
+                return
+            started = True
+            init_pay_events()
+            init_entitlement_cache()
+            init_rbac()
+            init_feed_worker(app)
+            init_pay_reconciler(app)
+            init_outbox(app)
+            init_entitlement_sweeper(app)
+
+
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
+    init_json(app)  # orjson（可用时）序列化所有 jsonify 响应
 
     # ---- 初始化扩展 ----
     db.init_app(app)
+    init_engines(app)
+    init_query_stats(app)
+    init_metrics(app)
+    init_compression(app)
     from models.assessment_result import AssessmentResult  # noqa: F401
     from models.product import Product  # noqa: F401
     from models.order import Order, OrderItem, ServiceEntitlement  # noqa: F401
+    from models.recommendation_feed import RecommendationFeed  # noqa: F401
 
     JWTManager(app)
     Migrate(app, db)
@@ -101,6 +154,23 @@ def create_app():
     app.register_blueprint(pay_bp)
     app.register_blueprint(me_services_bp)  # ✅ 注册新的 /api/me/services
 
+    # ---- 读写分离：公开目录/统计/常量接口的 GET 可读副本（见 db_router.py）----
+    read_only_blueprints(
+        public_program_bp, program_stats_bp, public_product_bp, meta_bp, cases_public_bp,
+    )
+    init_router(app)
+
+    # ---- 预加载推荐模型（记录加载耗时/内存，避免首个请求卡顿）----
+    warm_recommender()
+
+    # ---- 跨 worker 广播（配置 Redis 时）：支付事件 / 权益快照失效 / 角色权限失效，发布端随 app 初始化 ----
+    init_pay_events(subscribe=False)
+    init_entitlement_cache(subscribe=False)
+    init_rbac(subscribe=False)
+
+    # ---- 后台线程：只在服务进程收到第一个请求时启动（见 init_background_workers）----
+    init_background_workers(app)
+
     # ---- 健康检查 ----
     @app.get("/")
     def health():
@@ -110,10 +180,7 @@ def create_app():
     @app.get("/api/get-async-routes")
     @jwt_required()
     def get_async_routes():
-        claims = get_jwt() or {}
-        roles = claims.get("roles") or claims.get("role") or []
-        if isinstance(roles, str):
-            roles = [roles]
+        roles = current_roles()
 
         # 这里给一个精简示例，真实项目中你可以根据 roles 动态调整
         routes = [
@@ -0,0 +1,150 @@
+# compression.py
+"""
+响应压缩（create_app 中调用 init_compression）。
+
+- 只压缩 JSON / CSV，且 body >= COMPRESS_MIN_SIZE 字节；按 Accept-Encoding 协商（含 q 值）：
+  装了 brotli 优先 br，否则 gzip
+- 流式响应、send_file（direct_passthrough）、已有 Content-Encoding 的响应原样放行
+- 用 @cache_compressed 标记的接口（项目详情、产品详情等两次写入之间内容不变的响应）：
+  无 ETag 时按 body 计算 ETag，支持 If-None-Match -> 304；压缩后的响应 ETag 带编码后缀（"<etag>-gzip" / "-br"），
+  不同编码的表示不共用同一个强 ETag；
+  压缩结果放进按 (ETag, 编码) 索引的 LRU 缓存（条数 + 总字节双上限），命中时不再重复压缩
+"""
+from __future__ import annotations
+
+import gzip
+import threading
+from collections import OrderedDict
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - 可选依赖
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = ("application/json", "text/csv")
+
+
+def cache_compressed(fn):
+    """标记视图：响应在两次写入之间稳定，可按 ETag 缓存压缩结果。"""
+    fn._cache_compressed = True
+    return fn
+
+
+class CompressedCache:
+    """按 (etag, encoding) 索引的 LRU；超过条数或总字节上限时淘汰最久未用的。"""
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data: OrderedDict[tuple[str, str], bytes] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            val = self._data.get(key)
+            if val is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return val
+
+    def put(self, key, val: bytes) -> None:
+        if len(val) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._data[key] = val
+            self._bytes += len(val)
+            while self._data and (len(self._data) > self.max_entries or self._bytes > self.max_bytes):
+                _, ev = self._data.popitem(last=False)
+                self._bytes -= len(ev)
+
+
+def negotiate(accept_encoding: str | None) -> str | None:
+    """从 Accept-Encoding 里选出 br / gzip（q=0 视为拒绝）；都不接受返回 None。"""
+    if not accept_encoding:
+        return None
+    q = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        q[name] = weight
+    star = q.get("*", 0.0)
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+    best, best_q = None, 0.0
+    for enc in candidates:
+        weight = q.get(enc, star)
+        if weight > best_q:
+            best, best_q = enc, weight
+    return best
+
+
+def compress(data: bytes, encoding: str, gzip_level: int = 6, br_quality: int = 5) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=br_quality)
+    return gzip.compress(data, compresslevel=gzip_level, mtime=0)
+
+
+def init_compression(app) -> None:
+    cfg = app.config
+    if not cfg.get("COMPRESS_ENABLED", True):
+        return
+    min_size = int(cfg.get("COMPRESS_MIN_SIZE", 1024))
+    gzip_level = int(cfg.get("COMPRESS_GZIP_LEVEL", 6))
+    br_quality = int(cfg.get("COMPRESS_BR_QUALITY", 5))
+    cache = CompressedCache(int(cfg.get("COMPRESS_CACHE_ENTRIES", 512)),
+                            int(cfg.get("COMPRESS_CACHE_BYTES", 32 * 1024 * 1024)))
+    app.extensions["compressed_cache"] = cache
+
+    @app.after_request
+    def _compress(resp):
+        if resp.status_code != 200 or resp.direct_passthrough or resp.is_streamed:
+            return resp
+        if resp.mimetype not in COMPRESSIBLE_MIMETYPES or "Content-Encoding" in resp.headers:
+            return resp
+
+        data = resp.get_data()
+        enc = negotiate(request.headers.get("Accept-Encoding")) if len(data) >= min_size else None
+        resp.vary.add("Accept-Encoding")
+
+        view = app.view_functions.get(request.endpoint)
+        cacheable = getattr(view, "_cache_compressed", False)
+        if cacheable and not resp.get_etag()[0]:
+            resp.add_etag()
+        base_etag, weak = resp.get_etag()
+        if base_etag and enc:
+            # 各编码是不同的表示，ETag 加编码后缀，避免 gzip / br / 原文共用同一个强 ETag
+            resp.set_etag(f"{base_etag}-{enc}", weak=weak)
+        if cacheable:
+            resp.make_conditional(request)
+            if resp.status_code == 304:
+                return resp
+        if enc is None:
+            return resp
+
+        body = None
+        if cacheable and base_etag:
+            body = cache.get((base_etag, enc))
+        if body is None:
+            body = compress(data, enc, gzip_level, br_quality)
+            if cacheable and base_etag:
+                cache.put((base_etag, enc), body)
+
+        resp.set_data(body)
+        resp.headers["Content-Encoding"] = enc
+        return resp
@@ -7,13 +7,116 @@ os.makedirs(INSTANCE_DIR, exist_ok=True)  # 确保目录存在
 
 DB_PATH = os.path.join(INSTANCE_DIR, "your_db.sqlite3")
 
+# 注意：绝对路径 + 3 个斜杠
+DATABASE_URI = os.getenv(
+    "SQLALCHEMY_DATABASE_URI",
+    f"sqlite:///{DB_PATH.replace(os.sep, '/')}"
+)
+IS_SQLITE = DATABASE_URI.startswith("sqlite")
+
+
+def _env_bool(name: str, default: str = "1") -> bool:
+    return os.getenv(name, default).strip().lower() in ("1", "true", "yes", "on")
+
+
+def _sqlite_file(uri: str) -> str | None:
+    """sqlite:////abs/path.db -> /abs/path.db；内存库返回 None。"""
+    path = uri.split("///", 1)[1] if "///" in uri else ""
+    path = path.split("?", 1)[0]
+    if not path or path == ":memory:":
+        return None
+    return path
+
+
+def _read_binds() -> dict:
+    """
+    只读 bind（路由规则见 db_router.py）：
+    - DATABASE_REPLICA_URI：只读副本，优先
+    - SQLite 部署模式：同一数据库文件的只读连接池（mode=ro）
+    """
+    replica = os.getenv("DATABASE_REPLICA_URI")
+    if replica:
+        return {"read": replica}
+    if not (IS_SQLITE and _env_bool("SQLITE_READONLY_POOL")):
+        return {}
+    path = _sqlite_file(DATABASE_URI)
+    if not path:
+        return {}
+    return {"read": {"url": f"sqlite:///file:{path}?mode=ro&uri=true"}}
+
+
+def _statement_timeout_args(uri: str, timeout_ms: int) -> dict:
+    """按方言把语句超时转成 connect_args（0 表示不限制）。"""
+    if timeout_ms <= 0:
+        return {}
+    if uri.startswith("postgresql"):
+        return {"options": f"-c statement_timeout={timeout_ms}"}
+    if uri.startswith("mysql"):
+        # pymysql / mysqlclient 均支持 init_command；MySQL 5.7.8+ 只对 SELECT 生效
+        return {"init_command": f"SET SESSION max_execution_time={timeout_ms}"}
+    return {}
+
+
+def _server_engine_options() -> dict:
+    """
+    Postgres / MySQL 的连接池参数（SQLite 返回空 dict，沿用默认池）。
+    - DB_POOL_SIZE / DB_MAX_OVERFLOW：每个 worker 的常驻连接数 / 峰值额外连接数
+    - DB_POOL_TIMEOUT：池满时等待连接的秒数，超时抛 TimeoutError
+    - DB_POOL_RECYCLE：连接最长存活秒数，需小于数据库/代理的空闲断开时间
+    - DB_POOL_PRE_PING：取连接前 ping 一次，闲置后被服务端断开的连接会被自动替换
+    - DB_STATEMENT_TIMEOUT_MS：单条语句超时
+    """
+    if IS_SQLITE:
+        return {}
+    opts = {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": _env_bool("DB_POOL_PRE_PING"),
+    }
+    connect_args = _statement_timeout_args(DATABASE_URI, int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0")))
+    if connect_args:
+        opts["connect_args"] = connect_args
+    return opts
+
+
 class Config:
     SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret")
-    # 注意：绝对路径 + 3 个斜杠
-    SQLALCHEMY_DATABASE_URI = os.getenv(
-        "SQLALCHEMY_DATABASE_URI",
-        f"sqlite:///{DB_PATH.replace(os.sep, '/')}"
-    )
+    SQLALCHEMY_DATABASE_URI = DATABASE_URI
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "dev-jwt")
     JSON_AS_ASCII = False
+
+    # ---- SQLite 多进程部署参数（仅 sqlite 生效，见 db_engine.py）----
+    # 每个连接建立时执行：journal_mode=WAL / synchronous / mmap_size / busy_timeout
+    SQLITE_TUNING = IS_SQLITE and _env_bool("SQLITE_TUNING")
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+    SQLALCHEMY_BINDS = _read_binds()
+
+    # ---- 服务端数据库（Postgres / MySQL）连接池参数，见 _server_engine_options ----
+    SQLALCHEMY_ENGINE_OPTIONS = _server_engine_options()
+    DB_POOL_STATS = _env_bool("DB_POOL_STATS")
+
+    # ---- 每请求 SQL 统计 / 慢查询日志（见 query_stats.py）----
+    SQL_STATS_HEADERS = _env_bool("SQL_STATS_HEADERS", "0")   # debug 模式下总是输出
+    SQL_COUNT_WARN = int(os.getenv("SQL_COUNT_WARN", "50"))     # 单请求语句数告警阈值，0 关闭
+    SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))    # 0 关闭慢查询日志
+    SLOW_QUERY_LOG_PARAMS = os.getenv("SLOW_QUERY_LOG_PARAMS", "redact")  # redact | raw | off
+
+    # ---- Prometheus 请求指标 /metrics（见 metrics.py；多进程需设置 PROMETHEUS_MULTIPROC_DIR）----
+    METRICS_ENABLED = _env_bool("METRICS_ENABLED")
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+    # ---- 后台线程总开关（见 app.init_background_workers；各线程另有 *_ENABLED 独立开关）----
+    BACKGROUND_WORKERS = _env_bool("BACKGROUND_WORKERS")
+
+    # ---- 响应压缩（见 compression.py；装了 brotli 时优先 br）----
+    COMPRESS_ENABLED = _env_bool("COMPRESS_ENABLED")
+    COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+    COMPRESS_GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+    COMPRESS_BR_QUALITY = int(os.getenv("COMPRESS_BR_QUALITY", "5"))
+    COMPRESS_CACHE_ENTRIES = int(os.getenv("COMPRESS_CACHE_ENTRIES", "512"))
+    COMPRESS_CACHE_BYTES = int(os.getenv("COMPRESS_CACHE_BYTES", str(32 * 1024 * 1024)))
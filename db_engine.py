@@ -0,0 +1,160 @@
+# db_engine.py
+"""
+数据库引擎初始化（create_app 中调用 init_engines）。
+
+SQLite 部署模式（Config.SQLITE_TUNING）：
+- 主库连接：journal_mode=WAL、synchronous=NORMAL、mmap_size、busy_timeout
+  WAL 下读写互不阻塞，多个 gunicorn worker 写入时排队等待 busy_timeout，而不是直接 "database is locked"
+- 只读连接池（SQLALCHEMY_BINDS['read']，mode=ro + query_only）：GET 请求的查询走这里，
+  路由规则见 extensions.RoutingSession
+
+服务端数据库（Postgres / MySQL）：连接池参数来自 Config.SQLALCHEMY_ENGINE_OPTIONS；
+DB_POOL_STATS 开启时为每个引擎挂连接池计数（pool_stats() 读取，按 worker 进程统计）。
+"""
+from functools import partial
+import os
+import threading
+import time
+
+from sqlalchemy import event, exc
+
+from extensions import db, READ_BIND
+
+
+def apply_sqlite_pragmas(dbapi_conn, connection_record=None, *, busy_timeout_ms=5000,
+                         synchronous="NORMAL", mmap_size=0, readonly=False):
+    """对一个 sqlite3 DBAPI 连接执行部署 PRAGMA（也供 tools/bench_sqlite_concurrency.py 直接使用）。"""
+    cur = dbapi_conn.cursor()
+    try:
+        cur.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+        if readonly:
+            cur.execute("PRAGMA query_only=ON")
+        else:
+            # journal_mode 是持久化到文件的，只读连接无需（也无法）设置
+            cur.execute("PRAGMA journal_mode=WAL")
+            cur.execute(f"PRAGMA synchronous={synchronous}")
+        if mmap_size:
+            cur.execute(f"PRAGMA mmap_size={int(mmap_size)}")
+    finally:
+        cur.close()
+
+
+def init_engines(app) -> None:
+    cfg = app.config
+    with app.app_context():
+        for key, engine in db.engines.items():
+            if cfg.get("DB_POOL_STATS"):
+                instrument_pool(key or "primary", engine)
+            if engine.dialect.name == "sqlite" and cfg.get("SQLITE_TUNING"):
+                event.listen(engine, "connect", partial(
+                    apply_sqlite_pragmas,
+                    busy_timeout_ms=cfg.get("SQLITE_BUSY_TIMEOUT_MS", 5000),
+                    synchronous=cfg.get("SQLITE_SYNCHRONOUS", "NORMAL"),
+                    mmap_size=cfg.get("SQLITE_MMAP_SIZE", 0),
+                    readonly=(key == READ_BIND),
+                ))
+
+
+# ========= 连接池统计（每个 worker 进程一份）=========
+class PoolStats:
+    """
+    - checked_out：当前借出的连接数
+    - checkouts / connects / invalidated：累计借出次数 / 新建物理连接 / 失效连接（含 pre_ping 发现的断线）
+    - overflow_events：借出时已超过 pool_size（占用 max_overflow 名额）的次数
+    - timeouts：等待连接超过 pool_timeout 的次数
+    - wait_ms_total / wait_ms_max：从池里取连接的耗时（含新建连接）
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checked_out = 0
+        self.checkouts = 0
+        self.connects = 0
+        self.invalidated = 0
+        self.overflow_events = 0
+        self.timeouts = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+
+    def incr(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + n)
+
+    def record_wait(self, ms: float) -> None:
+        with self._lock:
+            self.wait_ms_total += ms
+            if ms > self.wait_ms_max:
+                self.wait_ms_max = ms
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            data = {k: v for k, v in vars(self).items() if not k.startswith("_")}
+        data["wait_ms_avg"] = round(data["wait_ms_total"] / data["checkouts"], 3) if data["checkouts"] else 0.0
+        data["wait_ms_total"] = round(data["wait_ms_total"], 3)
+        data["wait_ms_max"] = round(data["wait_ms_max"], 3)
+        return data
+
+
+_pool_stats: dict[str, PoolStats] = {}
+_engines: dict = {}
+
+
+def instrument_pool(key: str, engine) -> PoolStats:
+    """给一个引擎的连接池挂统计事件；同一 key 只挂一次。"""
+    if key in _pool_stats:
+        return _pool_stats[key]
+    stats = _pool_stats[key] = PoolStats()
+    _engines[key] = engine
+
+    # 池事件挂在 engine 上：engine.dispose() 重建连接池后依然有效
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn, record):
+        stats.incr("connects")
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_conn, record, proxy):
+        stats.incr("checkouts")
+        stats.incr("checked_out")
+        pool = engine.pool
+        size = pool.size() if hasattr(pool, "size") else None
+        if size is not None and hasattr(pool, "checkedout") and pool.checkedout() > size:
+            stats.incr("overflow_events")
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_conn, record):
+        stats.incr("checked_out", -1)
+
+    @event.listens_for(engine, "invalidate")
+    def _on_invalidate(dbapi_conn, record, exception):
+        stats.incr("invalidated")
+
+    # 池没有"开始等待"事件：包一层 _do_get 计时（QueuePool 在这里阻塞等待空闲连接）
+    pool = engine.pool
+    orig_do_get = pool._do_get
+
+    def _timed_do_get():
+        t0 = time.perf_counter()
+        try:
+            return orig_do_get()
+        except exc.TimeoutError:
+            stats.incr("timeouts")
+            raise
+        finally:
+            stats.record_wait((time.perf_counter() - t0) * 1000)
+
+    pool._do_get = _timed_do_get
+    return stats
+
+
+def pool_stats() -> dict:
+    """当前 worker 的连接池状态：{pid, engines: {key: {...}}}。"""
+    engines = {}
+    for key, stats in _pool_stats.items():
+        pool = _engines[key].pool
+        data = stats.snapshot()
+        data["pool"] = pool.status()
+        if hasattr(pool, "size"):
+            data["size"] = pool.size()
+            data["overflow"] = pool.overflow()
+        engines[key] = data
+    return {"pid": os.getpid(), "engines": engines}
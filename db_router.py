@@ -0,0 +1,179 @@
+# db_router.py
+"""
+读写分离路由策略（extensions.RoutingSession.get_bind 调用 choose_read_bind）。
+
+READ_BIND 的来源（config.py）：
+- DATABASE_REPLICA_URI：只读副本（Postgres / MySQL 从库）
+- SQLITE_READONLY_POOL：同一 SQLite 文件的只读连接池
+
+只有同时满足以下条件的查询才走 READ_BIND，否则一律主库：
+1) GET/HEAD 请求，且所在蓝图通过 read_only_blueprints() 标记为只读（目录/统计/常量等公开接口）
+2) 本事务内没有 flush 过写操作
+3) 请求不在读己之写窗口内：任何请求写库后，响应带 cookie RYW_COOKIE（REPLICA_RYW_SECONDS 秒），
+   窗口内该客户端的读全部走主库 —— 管理员刚改完项目再刷新列表，不会读到从库的旧数据
+4) 副本健康：每 REPLICA_CHECK_INTERVAL 秒探测一次复制延迟，超过 REPLICA_MAX_LAG_S
+   或探测出错时，在下一个探测周期前回退主库；查询出错时回退 REPLICA_ERROR_COOLDOWN 秒
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict
+
+from flask import g, has_request_context, request
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# 只读 bind 的名字（SQLALCHEMY_BINDS 的 key）
+READ_BIND = "read"
+READ_METHODS = ("GET", "HEAD")
+
+RYW_COOKIE = "db_ryw"
+RYW_SECONDS = int(os.getenv("REPLICA_RYW_SECONDS", "10"))
+CHECK_INTERVAL = float(os.getenv("REPLICA_CHECK_INTERVAL", "5"))
+MAX_LAG_S = float(os.getenv("REPLICA_MAX_LAG_S", "5"))
+ERROR_COOLDOWN = float(os.getenv("REPLICA_ERROR_COOLDOWN", "30"))
+
+_read_only_blueprints: set[str] = set()
+
+
+def read_only_blueprints(*blueprints) -> None:
+    """把蓝图标记为只读：其中的 GET/HEAD 请求可以读副本。"""
+    for bp in blueprints:
+        _read_only_blueprints.add(getattr(bp, "name", bp))
+
+
+# ========= 复制延迟探测 =========
+def _pg_lag(conn) -> float:
+    return float(conn.execute(text(
+        "SELECT CASE WHEN pg_is_in_recovery() "
+        "THEN COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) "
+        "ELSE 0 END"
+    )).scalar() or 0)
+
+
+def _mysql_lag(conn) -> float:
+    try:
+        row = conn.execute(text("SHOW REPLICA STATUS")).mappings().first()
+        key = "Seconds_Behind_Source"
+    except Exception:
+        row = conn.execute(text("SHOW SLAVE STATUS")).mappings().first()
+        key = "Seconds_Behind_Master"
+    if row is None:
+        return 0.0          # 不是从库（或直连主库），视为无延迟
+    lag = row.get(key)
+    return float("inf") if lag is None else float(lag)   # NULL = 复制线程已停
+
+
+def _ping(conn) -> float:
+    conn.execute(text("SELECT 1"))
+    return 0.0
+
+
+# 方言 -> 探测函数（返回延迟秒数）；未登记的方言只做连通性检查
+LAG_PROBES: Dict[str, Callable] = {"postgresql": _pg_lag, "mysql": _mysql_lag}
+
+
+class ReplicaHealth:
+    """进程内缓存的副本健康状态；同一时刻只有一个线程去探测，其余线程用上次结果。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.healthy = True
+        self.lag_s = 0.0
+        self.checked_at = 0.0
+        self.down_until = 0.0
+        self.reason = ""
+
+    def is_usable(self, engine) -> bool:
+        if time.monotonic() < self.down_until:
+            return False
+        if time.monotonic() - self.checked_at >= CHECK_INTERVAL and self._lock.acquire(blocking=False):
+            try:
+                self._probe(engine)
+            finally:
+                self._lock.release()
+        return self.healthy
+
+    def _probe(self, engine) -> None:
+        probe = LAG_PROBES.get(engine.dialect.name, _ping)
+        try:
+            with engine.connect() as conn:
+                lag = probe(conn)
+        except Exception as e:
+            self._set(False, float("inf"), f"probe error: {e}")
+            return
+        if lag > MAX_LAG_S:
+            self._set(False, lag, f"lag {lag:.1f}s > {MAX_LAG_S}s")
+        else:
+            self._set(True, lag, "")
+
+    def mark_down(self, reason: str) -> None:
+        """查询出错时调用：冷却期内不再用副本（也不探测），之后由探测决定是否恢复。"""
+        self._set(False, self.lag_s, reason)
+        self.down_until = time.monotonic() + ERROR_COOLDOWN
+
+    def _set(self, healthy: bool, lag: float, reason: str) -> None:
+        if healthy != self.healthy:
+            if healthy:
+                logger.info("read replica back in rotation (lag %.1fs)", lag)
+            else:
+                logger.warning("read replica out of rotation: %s", reason)
+        self.healthy, self.lag_s, self.reason = healthy, lag, reason
+        self.checked_at = time.monotonic()
+
+    def snapshot(self) -> dict:
+        return {"healthy": self.healthy, "lag_s": self.lag_s, "reason": self.reason}
+
+
+replica_health = ReplicaHealth()
+
+
+# ========= 路由判断 =========
+def _in_ryw_window() -> bool:
+    raw = request.cookies.get(RYW_COOKIE)
+    if not raw:
+        return False
+    try:
+        return float(raw) > time.time()
+    except ValueError:
+        return False
+
+
+def routable_request() -> bool:
+    """当前请求本身是否允许读副本（与具体语句、副本健康无关）。"""
+    if not has_request_context() or request.method not in READ_METHODS:
+        return False
+    if request.blueprint not in _read_only_blueprints:
+        return False
+    return not _in_ryw_window()
+
+
+def choose_read_bind(engines) -> object | None:
+    """返回可用的只读引擎；不满足条件时返回 None（调用方走主库）。"""
+    engine = engines.get(READ_BIND)
+    if engine is None or not routable_request():
+        return None
+    if not replica_health.is_usable(engine):
+        return None
+    return engine
+
+
+def note_write() -> None:
+    """写操作 flush 后调用：记录本请求写过库，用于下发读己之写 cookie。"""
+    if has_request_context():
+        g._db_wrote = True
+
+
+def init_router(app) -> None:
+    """create_app 中调用：写请求的响应下发读己之写 cookie。"""
+
+    @app.after_request
+    def _set_ryw_cookie(resp):
+        if g.get("_db_wrote") and RYW_SECONDS > 0:
+            resp.set_cookie(RYW_COOKIE, f"{time.time() + RYW_SECONDS:.3f}",
+                            max_age=RYW_SECONDS, httponly=True, samesite="Lax")
+        return resp
@@ -1,4 +1,54 @@
 # backend/extensions.py
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, exc
 
-db = SQLAlchemy()
+# 读写分离策略（只读蓝图、副本健康、读己之写）见 db_router.py
+from db_router import READ_BIND, READ_METHODS, choose_read_bind, note_write, replica_health  # noqa: F401
+
+
+class RoutingSession(Session):
+    """
+    只读蓝图里 GET/HEAD 请求的 SELECT 走 READ_BIND（若已配置且健康），其余一律走主库。
+    本事务内一旦 flush 过写操作，后续读也固定走主库，保证读到自己的写入。
+    副本查询出错时把副本标记为不可用，回滚后在主库上重试一次。
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        self.info["on_read_bind"] = False
+        if bind is None and self._use_read_bind(clause):
+            engine = choose_read_bind(self._db.engines)
+            if engine is not None:
+                self.info["on_read_bind"] = True
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _use_read_bind(self, clause) -> bool:
+        if self._flushing or self.info.get("pin_primary"):
+            return False
+        return getattr(clause, "is_select", False)
+
+    def execute(self, statement, *args, **kwargs):
+        try:
+            return super().execute(statement, *args, **kwargs)
+        except exc.DBAPIError as e:
+            if not self.info.pop("on_read_bind", False):
+                raise
+            replica_health.mark_down(f"query error: {e.orig!r}")
+            self.rollback()
+            return super().execute(statement, *args, **kwargs)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _pin_primary(session, flush_context):
+    session.info["pin_primary"] = True
+    note_write()
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _unpin_primary(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("pin_primary", None)
+
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
@@ -0,0 +1,95 @@
+# json_provider.py
+"""
+Flask JSON provider：装了 orjson 就用 orjson，否则退回标准库（create_app 中设置 app.json）。
+
+与 Flask 默认 DefaultJSONProvider 的差异：
+- datetime / date / time：ISO 8601（与各 to_dict 里的 isoformat() 输出一致），不再是 HTTP 日期格式
+- Decimal（Order.total_amount / Product.price 等 Numeric 列）：转成字符串，保留精度（与 Flask 默认一致）
+- dataclass / UUID / numpy 数组与标量：直接序列化
+- 默认不排序 key（JSON_SORT_KEYS=True 可打开）；输出始终是 UTF-8，不做 \\uXXXX 转义
+- orjson 不支持的值（超过 64 位的整数等）自动退回标准库编码，不会 500
+"""
+from __future__ import annotations
+
+import dataclasses
+import decimal
+import json
+import uuid
+from datetime import date, datetime, time
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 可选依赖
+    orjson = None
+
+
+def _default(o):
+    if isinstance(o, decimal.Decimal):
+        return str(o)
+    if isinstance(o, (set, frozenset)):
+        return list(o)
+    if hasattr(o, "__html__"):
+        return str(o.__html__())
+    if hasattr(o, "tolist"):          # numpy 标量/数组（orjson 之外的路径）
+        return o.tolist()
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def _stdlib_default(o):
+    if isinstance(o, (datetime, date, time)):
+        return o.isoformat()
+    if isinstance(o, uuid.UUID):
+        return str(o)
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    return _default(o)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    sort_keys = False
+
+    def _orjson_option(self, indent: bool) -> int:
+        opt = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if self.sort_keys:
+            opt |= orjson.OPT_SORT_KEYS
+        if indent:
+            opt |= orjson.OPT_INDENT_2
+        return opt
+
+    def _pretty(self) -> bool:
+        return (self.compact is None and self._app.debug) or self.compact is False
+
+    def dumps_bytes(self, obj, indent: bool = False) -> bytes:
+        if orjson is not None:
+            try:
+                return orjson.dumps(obj, default=_default, option=self._orjson_option(indent))
+            except (orjson.JSONEncodeError, TypeError):
+                pass
+        return json.dumps(
+            obj, default=_stdlib_default, ensure_ascii=False, sort_keys=self.sort_keys,
+            indent=2 if indent else None, separators=None if indent else (",", ":"),
+        ).encode("utf-8")
+
+    def dumps(self, obj, **kwargs) -> str:
+        if kwargs:   # 调用方传了 json.dumps 的参数（indent 等），按标准库语义处理
+            kwargs.setdefault("default", _stdlib_default)
+            kwargs.setdefault("ensure_ascii", False)
+            return json.dumps(obj, **kwargs)
+        return self.dumps_bytes(obj).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = self.dumps_bytes(obj, indent=self._pretty())
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
+
+
+def init_json(app) -> None:
+    app.json = FastJSONProvider(app)
+    app.json.sort_keys = bool(app.config.get("JSON_SORT_KEYS", False))
@@ -0,0 +1,124 @@
+# metrics.py
+"""
+请求级 RED 指标 + /metrics 导出（create_app 中调用 init_metrics）。
+
+- app_requests_total{blueprint,rule,method,status}：请求数 / 错误数
+- app_request_duration_seconds{blueprint,rule,method}：延迟直方图
+- app_requests_in_flight{blueprint}：进行中的请求（多进程下各 worker 求和）
+- app_process_*{pid}：各 worker 的 RSS / CPU 秒数 / 打开文件数 / 线程数（请求结束时节流刷新）
+
+标签用蓝图名 + 路由规则（/api/programs/<string:slug>），不用原始路径，避免标签基数爆炸；
+未匹配路由统一记为 rule="unmatched"。
+
+多进程（gunicorn）：启动前设置 PROMETHEUS_MULTIPROC_DIR（空目录，每次部署清空），
+/metrics 会汇总所有 worker 的指标；gunicorn 配置里加：
+    def child_exit(server, worker):
+        from metrics import mark_worker_dead
+        mark_worker_dead(worker.pid)
+METRICS_TOKEN 非空时，/metrics 需要 Authorization: Bearer <token>。
+"""
+from __future__ import annotations
+
+import os
+import time
+
+from flask import Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest,
+)
+
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR") or os.getenv("prometheus_multiproc_dir")
+PROCESS_STATS_INTERVAL = 5.0
+
+REQUESTS = Counter(
+    "app_requests_total", "HTTP requests", ["blueprint", "rule", "method", "status"],
+)
+LATENCY = Histogram(
+    "app_request_duration_seconds", "HTTP request latency", ["blueprint", "rule", "method"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+IN_FLIGHT = Gauge(
+    "app_requests_in_flight", "Requests currently being served", ["blueprint"],
+    multiprocess_mode="livesum",
+)
+PROC_RSS = Gauge("app_process_resident_memory_bytes", "Worker RSS", multiprocess_mode="liveall")
+PROC_CPU = Gauge("app_process_cpu_seconds", "Worker CPU time (user+system)", multiprocess_mode="liveall")
+PROC_FDS = Gauge("app_process_open_fds", "Worker open file descriptors", multiprocess_mode="liveall")
+PROC_THREADS = Gauge("app_process_threads", "Worker threads", multiprocess_mode="liveall")
+
+_last_proc_update = 0.0
+
+
+def mark_worker_dead(pid: int) -> None:
+    """gunicorn child_exit 钩子里调用，清理已退出 worker 的 live* 指标文件。"""
+    if MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(pid)
+
+
+def _labels():
+    rule = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    return request.blueprint or "app", rule, request.method
+
+
+def _update_process_stats() -> None:
+    global _last_proc_update
+    now = time.monotonic()
+    if now - _last_proc_update < PROCESS_STATS_INTERVAL:
+        return
+    _last_proc_update = now
+    try:
+        import psutil
+    except ImportError:
+        return
+    p = psutil.Process()
+    with p.oneshot():
+        PROC_RSS.set(p.memory_info().rss)
+        cpu = p.cpu_times()
+        PROC_CPU.set(cpu.user + cpu.system)
+        PROC_THREADS.set(p.num_threads())
+        if hasattr(p, "num_fds"):
+            PROC_FDS.set(p.num_fds())
+
+
+def _registry():
+    if not MULTIPROC_DIR:
+        return REGISTRY
+    from prometheus_client import multiprocess
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def init_metrics(app) -> None:
+    if not app.config.get("METRICS_ENABLED", True):
+        return
+    token = app.config.get("METRICS_TOKEN")
+
+    @app.before_request
+    def _metrics_start():
+        g._metrics_t0 = time.perf_counter()
+        g._metrics_bp = request.blueprint or "app"
+        IN_FLIGHT.labels(g._metrics_bp).inc()
+
+    @app.after_request
+    def _metrics_record(resp):
+        t0 = g.get("_metrics_t0")
+        if t0 is not None:
+            bp, rule, method = _labels()
+            LATENCY.labels(bp, rule, method).observe(time.perf_counter() - t0)
+            REQUESTS.labels(bp, rule, method, str(resp.status_code)).inc()
+        return resp
+
+    @app.teardown_request
+    def _metrics_finish(exc):
+        bp = g.pop("_metrics_bp", None)
+        if bp is not None:
+            IN_FLIGHT.labels(bp).dec()
+        _update_process_stats()
+
+    @app.get("/metrics")
+    def metrics():
+        if token and request.headers.get("Authorization") != f"Bearer {token}":
+            return Response("forbidden\n", status=403, mimetype="text/plain")
+        return Response(generate_latest(_registry()), mimetype=CONTENT_TYPE_LATEST)
@@ -0,0 +1,40 @@
+"""add recommendation_feeds
+
+Revision ID: 3c9e1f7a2b64
+Revises: 51e6d09d6e76
+Create Date: 2026-10-19 10:12:31.402118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c9e1f7a2b64'
+down_revision = '51e6d09d6e76'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('recommendation_feeds',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('results', sa.JSON(), nullable=True),
+    sa.Column('features', sa.JSON(), nullable=True),
+    sa.Column('filters', sa.JSON(), nullable=True),
+    sa.Column('topk', sa.Integer(), nullable=True),
+    sa.Column('computed_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id')
+    )
+    with op.batch_alter_table('recommendation_feeds', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_recommendation_feeds_computed_at'), ['computed_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('recommendation_feeds', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_recommendation_feeds_computed_at'))
+
+    op.drop_table('recommendation_feeds')
@@ -0,0 +1,65 @@
+"""compress assessment_results.results
+
+Revision ID: 8a41d2c6e905
+Revises: 3c9e1f7a2b64
+Create Date: 2026-10-19 11:03:47.215904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from models.types import compress_json, decompress_json
+
+
+# revision identifiers, used by Alembic.
+revision = '8a41d2c6e905'
+down_revision = '3c9e1f7a2b64'
+branch_labels = None
+depends_on = None
+
+BATCH = 500
+
+
+def _copy(conn, src, dst, convert):
+    """分批把 src 列转换后写入 dst 列，避免一次性读全表。"""
+    last_id = 0
+    while True:
+        rows = conn.execute(sa.text(
+            f"SELECT id, {src} FROM assessment_results WHERE id > :last ORDER BY id LIMIT {BATCH}"
+        ), {"last": last_id}).fetchall()
+        if not rows:
+            break
+        conn.execute(
+            sa.text(f"UPDATE assessment_results SET {dst} = :v WHERE id = :id"),
+            [{"id": rid, "v": convert(val)} for rid, val in rows],
+        )
+        last_id = rows[-1][0]
+
+
+def upgrade():
+    with op.batch_alter_table('assessment_results', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('results_z', sa.LargeBinary(), nullable=True))
+
+    # JSON 文本 -> zlib(JSON)
+    _copy(op.get_bind(), 'results', 'results_z', lambda v: compress_json(decompress_json(v)))
+
+    with op.batch_alter_table('assessment_results', schema=None) as batch_op:
+        batch_op.drop_column('results')
+        batch_op.alter_column('results_z', new_column_name='results', existing_type=sa.LargeBinary())
+
+
+def downgrade():
+    import json
+
+    with op.batch_alter_table('assessment_results', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('results_json', sa.JSON(), nullable=True))
+
+    def _to_json(v):
+        obj = decompress_json(v)
+        return None if obj is None else json.dumps(obj, ensure_ascii=False)
+
+    _copy(op.get_bind(), 'results', 'results_json', _to_json)
+
+    with op.batch_alter_table('assessment_results', schema=None) as batch_op:
+        batch_op.drop_column('results')
+        batch_op.alter_column('results_json', new_column_name='results', existing_type=sa.JSON())
@@ -0,0 +1,48 @@
+"""add entitlement validity / sweep indexes
+
+Revision ID: a3e7c9d1f5b2
+Revises: f2c8d6a4b1e9
+Create Date: 2026-10-19 16:40:03.774512
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3e7c9d1f5b2'
+down_revision = 'f2c8d6a4b1e9'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('service_entitlements', 'ix_service_entitlements_validity', ['user_id', 'status', 'valid_to']),
+    ('service_entitlements', 'ix_service_entitlements_sweep', ['status', 'valid_to']),
+]
+
+
+def _existing(insp, table):
+    if not insp.has_table(table):
+        return None
+    return {ix['name'] for ix in insp.get_indexes(table)}
+
+
+def upgrade():
+    insp = sa.inspect(op.get_bind())
+    for table, name, cols in INDEXES:
+        names = _existing(insp, table)
+        if names is None or name in names:
+            continue
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.create_index(name, cols, unique=False)
+
+
+def downgrade():
+    insp = sa.inspect(op.get_bind())
+    for table, name, cols in reversed(INDEXES):
+        names = _existing(insp, table)
+        if not names or name not in names:
+            continue
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(name)
@@ -0,0 +1,29 @@
+"""backfill orders.paid_at for paid orders
+
+Revision ID: b5d2e8f1c4a7
+Revises: a3e7c9d1f5b2
+Create Date: 2026-10-19 18:41:09.512337
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5d2e8f1c4a7'
+down_revision = 'a3e7c9d1f5b2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 账单按 paid_at keyset 分页并过滤 paid_at IS NOT NULL；早期只写了 pay_time 的已支付订单补上 paid_at
+    op.execute(sa.text(
+        "UPDATE orders SET paid_at = COALESCE(pay_time, created_at) "
+        "WHERE status = 'paid' AND paid_at IS NULL"
+    ))
+
+
+def downgrade():
+    # 补写的 paid_at 无法与原值区分，保持不变
+    pass
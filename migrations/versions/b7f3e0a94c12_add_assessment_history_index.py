@@ -0,0 +1,26 @@
+"""add assessment history keyset index
+
+Revision ID: b7f3e0a94c12
+Revises: 8a41d2c6e905
+Create Date: 2026-10-19 11:48:05.630277
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7f3e0a94c12'
+down_revision = '8a41d2c6e905'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('assessment_results', schema=None) as batch_op:
+        batch_op.create_index('ix_assessment_results_user_created', ['user_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('assessment_results', schema=None) as batch_op:
+        batch_op.drop_index('ix_assessment_results_user_created')
@@ -0,0 +1,56 @@
+"""add composite indexes for hot query shapes
+
+Revision ID: d4a7c2e91f30
+Revises: b7f3e0a94c12
+Create Date: 2026-10-19 12:20:41.118093
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4a7c2e91f30'
+down_revision = 'b7f3e0a94c12'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('programs', 'ix_programs_created_at', ['created_at']),
+    ('programs', 'ix_programs_status_created', ['status', 'created_at']),
+    ('programs', 'ix_programs_status_country', ['status', 'country']),
+    ('programs', 'ix_programs_country_discipline', ['country', 'discipline']),
+    ('program_requirements', 'ix_program_requirements_program_id', ['program_id']),
+    ('orders', 'ix_orders_user_status_paid', ['user_id', 'status', 'paid_at']),
+    ('orders', 'ix_orders_user_created', ['user_id', 'created_at']),
+    ('service_entitlements', 'ix_service_entitlements_lookup', ['user_id', 'kind', 'code', 'status']),
+    # materials 表不在迁移链里（早期由 create_all 建表），不存在时跳过
+    ('materials', 'ix_materials_app_due', ['app_id', 'due_at']),
+]
+
+
+def _existing(insp, table):
+    if not insp.has_table(table):
+        return None
+    return {ix['name'] for ix in insp.get_indexes(table)}
+
+
+def upgrade():
+    insp = sa.inspect(op.get_bind())
+    for table, name, cols in INDEXES:
+        names = _existing(insp, table)
+        if names is None or name in names:
+            continue
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.create_index(name, cols, unique=False)
+
+
+def downgrade():
+    insp = sa.inspect(op.get_bind())
+    for table, name, cols in reversed(INDEXES):
+        names = _existing(insp, table)
+        if not names or name not in names:
+            continue
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(name)
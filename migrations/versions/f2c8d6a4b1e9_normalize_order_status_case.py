@@ -0,0 +1,26 @@
+"""normalize order status to lowercase
+
+Revision ID: f2c8d6a4b1e9
+Revises: e6b1f4d8a2c7
+Create Date: 2026-10-19 15:22:47.906113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c8d6a4b1e9'
+down_revision = 'e6b1f4d8a2c7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # routes/pay.py 早期写入 'PENDING' / 'PAID'，orders / billing 使用小写；统一为小写
+    op.execute(sa.text("UPDATE orders SET status = LOWER(status) WHERE status <> LOWER(status)"))
+
+
+def downgrade():
+    # 无法区分原来的大小写来源，保持小写
+    pass
@@ -39,3 +39,7 @@ class Material(db.Model):
     status = db.Column(db.String(16), default="missing")  # missing | pending | approved
     due_at = db.Column(db.DateTime)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index("ix_materials_app_due", "app_id", "due_at"),  # 任务列表：按申请取材料，按截止时间排序
+    )
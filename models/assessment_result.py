@@ -1,6 +1,7 @@
 # models/assessment_result.py
 from extensions import db
 from datetime import datetime
+from models.types import CompressedJSON
 
 class AssessmentResult(db.Model):
     __tablename__ = "assessment_results"
@@ -13,7 +14,8 @@ class AssessmentResult(db.Model):
 
     # 原始入参/结果
     input_payload = db.Column(db.JSON)
-    results = db.Column(db.JSON)
+    # Top-K 卡片列表体积最大，zlib 压缩存储（读写对业务透明）
+    results = db.Column(CompressedJSON)
 
     # Top 项目摘要
     top_program_id = db.Column(db.Integer)
@@ -34,4 +36,6 @@ class AssessmentResult(db.Model):
     __table_args__ = (
         # user_id + anon_session_id 保证同一匿名会话只归档一次
         db.UniqueConstraint('user_id', 'anon_session_id', name='uq_user_anon'),
+        # 评估历史 keyset 分页：WHERE user_id=? ORDER BY created_at DESC, id DESC
+        db.Index('ix_assessment_results_user_created', 'user_id', 'created_at', 'id'),
     )
@@ -14,7 +14,7 @@ class Order(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False, index=True)
 
     # === 原有字段 (保持不变) ===
-    status = db.Column(db.String(20), default="pending", index=True)  # pending | paid | cancelled | refunded (注意：pay.py使用 'PENDING'/'PAID'，建议统一)
+    status = db.Column(db.String(20), default="pending", index=True)  # pending | paid | cancelled | refunded，只通过 services/order_state 变更
     channel = db.Column(db.String(20))                                # wechat / alipay / manual / stripe ...
     currency = db.Column(db.String(8), default="CNY")
     total_amount = db.Column(db.Numeric(10, 2), nullable=True)        # 原有金额字段
@@ -40,7 +40,13 @@ class Order(db.Model):
     # 关联关系 (保持不变)
     items = db.relationship("OrderItem", backref="order", lazy="joined")
 
-    def to_dict(self):
+    __table_args__ = (
+        db.Index("ix_orders_user_status_paid", "user_id", "status", "paid_at"),  # 账单：user+status，按 paid_at 排序
+        db.Index("ix_orders_user_created", "user_id", "created_at"),            # 我的订单：按时间倒序
+    )
+
+    def to_summary_dict(self):
+        """不含 items 的摘要（订单列表 summary 模式，见 services/order_history）"""
         return {
             "id": self.id,
             "status": self.status,
@@ -55,7 +61,11 @@ class Order(db.Model):
             "description": self.description,
             "created_at": self.created_at.isoformat() if self.created_at else None,
             "paid_at": self.paid_at.isoformat() if self.paid_at else (self.pay_time.isoformat() if self.pay_time else None),
-            
+        }
+
+    def to_dict(self):
+        return {
+            **self.to_summary_dict(),
             # 保持原有的 items 输出
             "items": [i.to_dict() for i in self.items],
         }
@@ -111,11 +121,20 @@ class ServiceEntitlement(db.Model):
     valid_from = db.Column(db.DateTime, nullable=True)
     valid_to = db.Column(db.DateTime, nullable=True)
 
-    status = db.Column(db.String(20), default="active")
+    status = db.Column(db.String(20), default="active")              # active | expired | exhausted
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        # 套餐判断：filter_by(user_id, kind, code, status)
+        db.Index("ix_service_entitlements_lookup", "user_id", "kind", "code", "status"),
+        # 我的权益：user_id + status='active' + valid_to 有效期过滤
+        db.Index("ix_service_entitlements_validity", "user_id", "status", "valid_to"),
+        # 过期清理：全表按 status='active' + valid_to 扫到期行
+        db.Index("ix_service_entitlements_sweep", "status", "valid_to"),
+    )
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -0,0 +1,45 @@
+# models/outbox.py
+from extensions import db
+from datetime import datetime
+
+class OutboxMessage(db.Model):
+    """
+    事务型发件箱：与业务状态变更（如订单置为已支付）在同一个事务里写入，
+    由 services/outbox 的后台线程异步投递（短信等），失败按指数退避重试。
+
+    idempotency_key 唯一（如 sms:pay:<out_trade_no>），同一业务事件最多一行，
+    并发回调 / 轮询不会产生重复短信。
+    """
+    __tablename__ = "outbox_messages"
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)                     # sms.payment_success ...
+    idempotency_key = db.Column(db.String(128), nullable=False, unique=True)
+    payload = db.Column(db.JSON)
+
+    status = db.Column(db.String(20), default="pending", nullable=False)  # pending | sending | sent | failed
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    # pending：最早可投递时间；sending：租约到期时间（进程崩溃后由其他 worker 接手）
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    claim_token = db.Column(db.String(32))
+    last_error = db.Column(db.String(500))
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index("ix_outbox_status_next", "status", "next_attempt_at"),   # 取待投递批次
+    )
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "idempotency_key": self.idempotency_key,
+            "status": self.status,
+            "attempts": self.attempts,
+            "next_attempt_at": self.next_attempt_at.isoformat() if self.next_attempt_at else None,
+            "last_error": self.last_error,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "sent_at": self.sent_at.isoformat() if self.sent_at else None,
+        }
@@ -55,6 +55,13 @@ class Program(db.Model):
 
     requirements = db.relationship("ProgramRequirement", backref="program", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        db.Index("ix_programs_created_at", "created_at"),                  # 列表 order by created_at desc
+        db.Index("ix_programs_status_created", "status", "created_at"),    # 按状态筛选的列表/导出
+        db.Index("ix_programs_status_country", "status", "country"),       # 国家统计 group by（覆盖索引）
+        db.Index("ix_programs_country_discipline", "country", "discipline"),  # 推荐候选按国家/专业筛选
+    )
+
     def to_dict(self, with_requirements=True):
         data = {
             "id": self.id,
@@ -103,7 +110,7 @@ class Program(db.Model):
 class ProgramRequirement(db.Model):
     __tablename__ = "program_requirements"
     id = db.Column(db.Integer, primary_key=True)
-    program_id = db.Column(db.Integer, db.ForeignKey("programs.id"), nullable=False)
+    program_id = db.Column(db.Integer, db.ForeignKey("programs.id"), nullable=False, index=True)
     req_type = db.Column(db.String(40))
     min_value = db.Column(db.String(40))
     note = db.Column(db.String(200))
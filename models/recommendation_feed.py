@@ -0,0 +1,32 @@
+# models/recommendation_feed.py
+from extensions import db
+from datetime import datetime
+
+class RecommendationFeed(db.Model):
+    """
+    每个用户一行的预计算推荐（Top-K 卡片）。
+    由 services/feed_service 在画像变更 / 项目库变更后异步重算，
+    读接口按 user_id 唯一索引直接取，不再实时打分。
+    """
+    __tablename__ = "recommendation_feeds"
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False, unique=True)
+
+    # 与 /api/assessments/submit 的 results 同构（_card 列表）
+    results = db.Column(db.JSON)
+    # 计算时使用的特征 / 过滤条件，便于前端提示与排查
+    features = db.Column(db.JSON)
+    filters = db.Column(db.JSON)
+    topk = db.Column(db.Integer, default=10)
+
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def to_dict(self):
+        return {
+            "results": self.results or [],
+            "features": self.features or {},
+            "filters": self.filters or {},
+            "topk": self.topk,
+            "computed_at": self.computed_at.isoformat() if self.computed_at else None,
+        }
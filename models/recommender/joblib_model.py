@@ -0,0 +1,128 @@
+# models/recommender/joblib_model.py
+"""
+sklearn / joblib 模型后端：加载离线导出的模型文件，对候选项目给出录取概率。
+
+模型文件约定（joblib.dump 的 dict）：
+    {
+        "model": <带 predict_proba 的 sklearn 估计器>,
+        "feature_names": [...],   # 必须与 FEATURE_NAMES 一致
+        "version": "...",         # 可选，用于日志/排查
+    }
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, List, Sequence, Tuple
+import time
+
+from models.recommender.pseudo import Candidate, InputPref, build_explain
+
+# 特征顺序即模型输入列顺序，训练与推理必须一致
+FEATURE_NAMES = [
+    "gpa", "ielts", "gre",
+    "gpa_min", "ielts_min", "gre_min",
+    "gpa_gap", "ielts_gap", "gre_gap",
+    "has_gpa_req", "has_ielts_req", "has_gre_req",
+]
+
+
+def _f(v) -> float:
+    try:
+        return float(v) if v is not None else 0.0
+    except Exception:
+        return 0.0
+
+
+def build_feature_row(cand: Candidate, features: Dict[str, Any]) -> List[float]:
+    """把 (候选, 用户特征) 转成一行模型输入；缺失要求记 0 并用 has_* 标记。"""
+    gpa, ielts, gre = _f(features.get("gpa")), _f(features.get("ielts")), _f(features.get("gre"))
+    gpa_min, ielts_min, gre_min = _f(cand.gpa_min), _f(cand.ielts_min), _f(cand.gre_min)
+    has_gpa, has_ielts, has_gre = cand.gpa_min is not None, cand.ielts_min is not None, cand.gre_min is not None
+    return [
+        gpa, ielts, gre,
+        gpa_min, ielts_min, gre_min,
+        (gpa - gpa_min) if has_gpa else 0.0,
+        (ielts - ielts_min) if has_ielts else 0.0,
+        ((gre - gre_min) / 50.0) if has_gre else 0.0,
+        float(has_gpa), float(has_ielts), float(has_gre),
+    ]
+
+
+def build_feature_matrix(cands: Sequence[Candidate], features: Dict[str, Any]):
+    """向量化版本：一次构造 (n_cands, n_features) 矩阵，列顺序同 FEATURE_NAMES。"""
+    import numpy as np
+
+    n = len(cands)
+    gpa, ielts, gre = _f(features.get("gpa")), _f(features.get("ielts")), _f(features.get("gre"))
+    mins = np.array(
+        [[c.gpa_min, c.ielts_min, c.gre_min] for c in cands], dtype=np.float64
+    ).reshape(n, 3)  # None -> nan
+    has = ~np.isnan(mins)
+    mins = np.nan_to_num(mins, nan=0.0)
+    user = np.array([gpa, ielts, gre], dtype=np.float64)
+    gaps = np.where(has, user - mins, 0.0)
+    gaps[:, 2] /= 50.0
+
+    X = np.empty((n, len(FEATURE_NAMES)), dtype=np.float64)
+    X[:, 0:3] = user
+    X[:, 3:6] = mins
+    X[:, 6:9] = gaps
+    X[:, 9:12] = has
+    return X
+
+
+class JoblibRecommender:
+    """包装 joblib 模型文件；实例只读，可在多线程间共享。"""
+    name = "joblib"
+
+    def __init__(self, path: str):
+        import joblib  # 可选依赖：仅在启用该后端时导入
+
+        # mmap_mode='r'：numpy 大数组按需映射，多 worker 共享页缓存
+        artifact = joblib.load(path, mmap_mode="r")
+        if isinstance(artifact, dict):
+            self._model = artifact["model"]
+            names = list(artifact.get("feature_names") or FEATURE_NAMES)
+            self.version = str(artifact.get("version") or "")
+        else:
+            self._model = artifact
+            names = list(FEATURE_NAMES)
+            self.version = ""
+        if names != FEATURE_NAMES:
+            raise ValueError(f"模型特征与当前代码不一致: {names}")
+        self.path = path
+
+    def score(self, cand: Candidate, pref: InputPref) -> Tuple[float, Dict[str, Any]]:
+        row = build_feature_row(cand, pref.features or {})
+        prob = float(self._model.predict_proba([row])[0][1])
+        final = max(0.0, min(1.0, round(prob, 3)))
+        return final, build_explain(cand, pref, final, self._basis())
+
+    def _basis(self) -> str:
+        tag = f"学习模型（{self.version}）" if self.version else "学习模型"
+        return f"{tag}：基于历史评估数据训练"
+
+    def score_many(
+        self,
+        cands: Sequence[Candidate],
+        pref: InputPref,
+        deadline: float | None = None,
+        chunk: int = 256,
+    ) -> List[Tuple[float, Dict[str, Any]] | None]:
+        """对整批候选一次性推理。
+
+        deadline 为 time.perf_counter() 的截止时刻；超时后剩余候选返回 None，
+        由调用方（recommender_provider）用规则模型兜底，保证接口耗时可控。
+        """
+        if not cands:
+            return []
+        X = build_feature_matrix(cands, pref.features or {})
+        out: List[Tuple[float, Dict[str, Any]] | None] = [None] * len(cands)
+        basis = self._basis()
+        for start in range(0, len(cands), chunk):
+            if deadline is not None and start and time.perf_counter() >= deadline:
+                break
+            probs = self._model.predict_proba(X[start:start + chunk])[:, 1]
+            for i, prob in enumerate(probs, start=start):
+                final = max(0.0, min(1.0, round(float(prob), 3)))
+                out[i] = (final, build_explain(cands[i], pref, final, basis))
+        return out
@@ -1,7 +1,7 @@
 # models/recommender/pseudo.py
 from dataclasses import dataclass
 from typing import List, Dict, Any, Tuple
-import random
+import hashlib
 
 @dataclass
 class Candidate:
@@ -26,9 +26,22 @@ class InputPref:
     features: Dict[str, Any]  # {'gpa':..., 'ielts':..., 'gre':...}
 
 class PseudoRecommender:
-    """占位伪模型：差距(硬性要求) + 偏好(可选) + 轻噪声，输出(0..1)及解释。"""
+    """占位伪模型：差距(硬性要求) + 偏好(可选) + 轻噪声，输出(0..1)及解释。
+
+    噪声由 (seed, 候选, 特征) 哈希得到，不依赖共享的随机数状态：
+    同一输入在任意线程/进程里得到同一分数，实例本身无可变状态，可安全并发使用。
+    """
+    name = "pseudo"
+
     def __init__(self, seed: int | None = None):
-        self._rnd = random.Random(seed)
+        self._seed = 0 if seed is None else int(seed)
+
+    def _noise(self, cand: Candidate, pref: InputPref) -> float:
+        """返回 [-0.02, 0.02] 的确定性噪声。"""
+        f = pref.features or {}
+        key = f"{self._seed}|{cand.id}|{f.get('gpa')}|{f.get('ielts')}|{f.get('gre')}"
+        h = int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+        return (h / 0xFFFFFFFFFFFFFFFF) * 0.04 - 0.02
 
     def score(self, cand: Candidate, pref: InputPref) -> Tuple[float, Dict[str, Any]]:
         gpa = float(pref.features.get('gpa') or 0)
@@ -59,31 +72,39 @@ class PseudoRecommender:
         add(min(pref_bonus, 0.25), 0.25)
 
         # 轻噪声（打散同分）
-        add(self._rnd.uniform(-0.02, 0.02) + 0.5, 0.05)
+        add(self._noise(cand, pref) + 0.5, 0.05)
 
         final = (score / wsum) if wsum > 0 else 0.5
 
-        # 可解释信息
-        risks, improvements = [], []
-        if cand.gpa_min and gpa < cand.gpa_min:
-            diff = round(cand.gpa_min - gpa, 2)
-            risks.append(f"GPA 低于最低要求 {diff} 分（需 ≥ {cand.gpa_min}）")
-            improvements.append("提高相关课程平均分，补齐硬性要求")
-        if cand.ielts_min and ielts < cand.ielts_min:
-            diff = round(cand.ielts_min - ielts, 1)
-            risks.append(f"IELTS 低于最低要求 {diff} 分（需 ≥ {cand.ielts_min}）")
-            improvements.append("集中刷题与模考，适当报名冲刺班")
-        if cand.gre_min and gre < cand.gre_min:
-            diff = max(0, int(cand.gre_min - gre))
-            if diff > 0:
-                risks.append(f"GRE 低于最低要求 {diff} 分（需 ≥ {cand.gre_min}）")
-                improvements.append("针对薄弱项（Quant/Verbal/写作）分模块提升")
-
-        explain = {
-            "low": max(0, round(final - 0.15, 3)),
-            "high": min(1, round(final + 0.15, 3)),
-            "risks": risks[:4],
-            "improvements": list(dict.fromkeys(improvements))[:4],
-            "basis": "伪模型：按与最低要求的差距 + 偏好匹配 + 轻噪声综合评分"
-        }
+        explain = build_explain(cand, pref, final, "伪模型：按与最低要求的差距 + 偏好匹配 + 轻噪声综合评分")
         return max(0.0, min(1.0, round(final, 3))), explain
+
+
+def build_explain(cand: Candidate, pref: InputPref, final: float, basis: str, band: float = 0.15) -> Dict[str, Any]:
+    """按与最低要求的差距生成风险/提升建议（各模型后端共用，保证前端字段一致）。"""
+    gpa = float(pref.features.get('gpa') or 0)
+    ielts = float(pref.features.get('ielts') or 0)
+    gre = float(pref.features.get('gre') or 0)
+
+    risks, improvements = [], []
+    if cand.gpa_min and gpa < cand.gpa_min:
+        diff = round(cand.gpa_min - gpa, 2)
+        risks.append(f"GPA 低于最低要求 {diff} 分（需 ≥ {cand.gpa_min}）")
+        improvements.append("提高相关课程平均分，补齐硬性要求")
+    if cand.ielts_min and ielts < cand.ielts_min:
+        diff = round(cand.ielts_min - ielts, 1)
+        risks.append(f"IELTS 低于最低要求 {diff} 分（需 ≥ {cand.ielts_min}）")
+        improvements.append("集中刷题与模考，适当报名冲刺班")
+    if cand.gre_min and gre < cand.gre_min:
+        diff = max(0, int(cand.gre_min - gre))
+        if diff > 0:
+            risks.append(f"GRE 低于最低要求 {diff} 分（需 ≥ {cand.gre_min}）")
+            improvements.append("针对薄弱项（Quant/Verbal/写作）分模块提升")
+
+    return {
+        "low": max(0, round(final - band, 3)),
+        "high": min(1, round(final + band, 3)),
+        "risks": risks[:4],
+        "improvements": list(dict.fromkeys(improvements))[:4],
+        "basis": basis,
+    }
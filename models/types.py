@@ -0,0 +1,50 @@
+# models/types.py
+"""
+自定义列类型。
+
+CompressedJSON：JSON 序列化后 zlib 压缩，落库为二进制。
+- 写入：Python 对象 -> json（紧凑、保留中文）-> zlib
+- 读取：兼容压缩数据、未压缩的 JSON bytes/str（迁移前的旧行），对业务代码透明
+"""
+import json
+import zlib
+
+from sqlalchemy.types import LargeBinary, TypeDecorator
+
+_ZLIB_HEADERS = (b"\x78\x01", b"\x78\x5e", b"\x78\x9c", b"\x78\xda")
+
+
+def compress_json(value, level: int = 6) -> bytes | None:
+    if value is None:
+        return None
+    raw = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return zlib.compress(raw, level)
+
+
+def decompress_json(value):
+    if value is None:
+        return None
+    if isinstance(value, memoryview):
+        value = value.tobytes()
+    if isinstance(value, (bytes, bytearray)):
+        value = bytes(value)
+        if value[:2] in _ZLIB_HEADERS:
+            try:
+                value = zlib.decompress(value)
+            except zlib.error:
+                pass
+        value = value.decode("utf-8")
+    if isinstance(value, str):
+        return json.loads(value) if value else None
+    return value
+
+
+class CompressedJSON(TypeDecorator):
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return compress_json(value)
+
+    def process_result_value(self, value, dialect):
+        return decompress_json(value)
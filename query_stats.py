@@ -0,0 +1,139 @@
+# query_stats.py
+"""
+每个请求的 SQL 统计（create_app 中调用 init_query_stats）。
+
+- SQLAlchemy before/after_cursor_execute 钩子：累计本请求的语句条数、总 DB 耗时、最慢的一条
+- 调试模式（app.debug 或 SQL_STATS_HEADERS=1）下写入响应头：
+    X-SQL-Count / X-SQL-Time-ms / X-SQL-Slowest-ms
+- Prometheus：按 endpoint 记录每请求语句数、DB 耗时直方图，慢查询计数
+- 慢查询日志：单条耗时 >= SLOW_QUERY_MS 记 warning；参数按 SLOW_QUERY_LOG_PARAMS 脱敏
+    redact（默认）：整数原样保留（便于按 id 排查），其它值只保留类型/长度
+    raw：原样输出（仅限本地排查）
+    off：不输出参数
+- 单请求语句数 >= SQL_COUNT_WARN 时记 warning，用于发现 N+1
+"""
+from __future__ import annotations
+
+import logging
+import time
+
+from flask import g, has_request_context, request
+from prometheus_client import Counter, Histogram
+from sqlalchemy import event
+
+from extensions import db
+
+logger = logging.getLogger("sql")
+
+SQL_STATEMENTS = Histogram(
+    "app_sql_statements_per_request", "SQL statements executed per request",
+    ["endpoint"], buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+SQL_TIME = Histogram(
+    "app_sql_time_seconds_per_request", "Total SQL time per request",
+    ["endpoint"], buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+SQL_SLOW = Counter("app_sql_slow_queries_total", "Statements slower than SLOW_QUERY_MS", ["endpoint"])
+
+
+class _RequestStats:
+    __slots__ = ("count", "total", "slowest", "slowest_sql")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.slowest = 0.0
+        self.slowest_sql = ""
+
+
+def redact_params(params, mode: str = "redact"):
+    """慢查询日志里的参数脱敏；params 可以是 tuple / list / dict / executemany 的列表。"""
+    if mode == "raw":
+        return params
+    if mode == "off" or params is None:
+        return None
+    if isinstance(params, dict):
+        return {k: _redact_value(v) for k, v in params.items()}
+    if isinstance(params, (list, tuple)):
+        return type(params)(redact_params(p, mode) if isinstance(p, (list, tuple, dict)) else _redact_value(p)
+                            for p in params)
+    return _redact_value(params)
+
+
+def _redact_value(v):
+    if v is None or isinstance(v, bool):
+        return v
+    if isinstance(v, int):
+        return v
+    if isinstance(v, (str, bytes, bytearray, memoryview)):
+        return f"<{type(v).__name__}:{len(v)}>"
+    return f"<{type(v).__name__}>"
+
+
+def _endpoint() -> str:
+    return request.endpoint or "unmatched"
+
+
+def _stats() -> _RequestStats | None:
+    if not has_request_context():
+        return None
+    st = g.get("_sql_stats")
+    if st is None:
+        st = g._sql_stats = _RequestStats()
+    return st
+
+
+def _attach(engine, cfg) -> None:
+    slow_s = float(cfg.get("SLOW_QUERY_MS", 200)) / 1000.0
+    params_mode = cfg.get("SLOW_QUERY_LOG_PARAMS", "redact")
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_sql_t0", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        stack = conn.info.get("_sql_t0")
+        if not stack:
+            return
+        cost = time.perf_counter() - stack.pop()
+        st = _stats()
+        if st is not None:
+            st.count += 1
+            st.total += cost
+            if cost > st.slowest:
+                st.slowest, st.slowest_sql = cost, statement
+        if slow_s > 0 and cost >= slow_s:
+            ep = _endpoint() if has_request_context() else "-"
+            SQL_SLOW.labels(ep).inc()
+            logger.warning(
+                "slow query %.1fms [%s] %s | params=%s",
+                cost * 1000, ep, " ".join(statement.split())[:2000], redact_params(parameters, params_mode),
+            )
+
+
+def init_query_stats(app) -> None:
+    cfg = app.config
+    with app.app_context():
+        for engine in db.engines.values():
+            _attach(engine, cfg)
+
+    headers = app.debug or cfg.get("SQL_STATS_HEADERS")
+    count_warn = int(cfg.get("SQL_COUNT_WARN", 50))
+
+    @app.after_request
+    def _sql_after_request(resp):
+        st = g.get("_sql_stats")
+        if st is None:
+            st = _RequestStats()
+        ep = _endpoint()
+        SQL_STATEMENTS.labels(ep).observe(st.count)
+        SQL_TIME.labels(ep).observe(st.total)
+        if count_warn and st.count >= count_warn:
+            logger.warning("%s ran %d SQL statements (%.1fms), possible N+1; slowest: %s",
+                           ep, st.count, st.total * 1000, " ".join(st.slowest_sql.split())[:200])
+        if headers:
+            resp.headers["X-SQL-Count"] = str(st.count)
+            resp.headers["X-SQL-Time-ms"] = f"{st.total * 1000:.2f}"
+            resp.headers["X-SQL-Slowest-ms"] = f"{st.slowest * 1000:.2f}"
+        return resp
@@ -1,38 +1,21 @@
 # backend/routes/admin_manage.py
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt
 from extensions import db
 from models.admin_user import AdminUser, StudentUser
 from models.rbac import Role, Permission
+from services.rbac import role_required
 
 admin_manage_bp = Blueprint("admin_manage_bp", __name__, url_prefix="/api/admin")
 
-def require_roles(*need):
-    def deco(fn):
-        from functools import wraps
-        @wraps(fn)
-        def wrapper(*args, **kwargs):
-            claims = get_jwt() or {}
-            roles = claims.get("roles") or claims.get("role") or []
-            if isinstance(roles, str):
-                roles = [roles]
-            if not any(r in roles for r in need):
-                return jsonify({"msg": "forbidden"}), 403
-            return fn(*args, **kwargs)
-        return wrapper
-    return deco
-
 # ========== 管理员（AdminUser） ==========
 @admin_manage_bp.get("/admins")
-@jwt_required()
-@require_roles("admin")
+@role_required("admin")
 def list_admins():
     q = AdminUser.query.order_by(AdminUser.id.desc()).all()
     return jsonify([a.to_dict() for a in q])
 
 @admin_manage_bp.post("/admins")
-@jwt_required()
-@require_roles("admin")
+@role_required("admin")
 def create_admin():
     data = request.get_json(force=True) or {}
     username = data.get("username")
@@ -53,8 +36,7 @@ def create_admin():
     return jsonify(a.to_dict())
 
 @admin_manage_bp.put("/admins/<int:aid>")
-@jwt_required()
-@require_roles("admin")
+@role_required("admin")
 def update_admin(aid):
     a = AdminUser.query.get_or_404(aid)
     data = request.get_json(force=True) or {}
@@ -69,8 +51,7 @@ def update_admin(aid):
     return jsonify(a.to_dict())
 
 @admin_manage_bp.delete("/admins/<int:aid>")
-@jwt_required()
-@require_roles("admin")
+@role_required("admin")
 def delete_admin(aid):
     a = AdminUser.query.get_or_404(aid)
     db.session.delete(a)
@@ -79,15 +60,13 @@ def delete_admin(aid):
 
 # ========== 角色（Role） ==========
 @admin_manage_bp.get("/roles")
-@jwt_required()
-@require_roles("admin")
+@role_required("admin")
 def list_roles():
     roles = Role.query.order_by(Role.id.asc()).all()
     return jsonify([r.to_dict() for r in roles])
 
 @admin_manage_bp.post("/roles")
-@jwt_required()
-@require_roles("admin")
+@role_required("admin")
 def create_role():
     data = request.get_json(force=True) or {}
     name = data.get("name")
@@ -101,8 +80,7 @@ def create_role():
     return jsonify(r.to_dict())
 
 @admin_manage_bp.put("/roles/<int:rid>")
-@jwt_required()
-@require_roles("admin")
+@role_required("admin")
 def update_role(rid):
     r = Role.query.get_or_404(rid)
     data = request.get_json(force=True) or {}
@@ -114,8 +92,7 @@ def update_role(rid):
     return jsonify(r.to_dict())
 
 @admin_manage_bp.delete("/roles/<int:rid>")
-@jwt_required()
-@require_roles("admin")
+@role_required("admin")
 def delete_role(rid):
     r = Role.query.get_or_404(rid)
     db.session.delete(r)
@@ -124,15 +101,13 @@ def delete_role(rid):
 
 # ========== 权限（Permission） ==========
 @admin_manage_bp.get("/permissions")
-@jwt_required()
-@require_roles("admin")
+@role_required("admin")
 def list_permissions():
     perms = Permission.query.order_by(Permission.id.asc()).all()
     return jsonify([p.to_dict() for p in perms])
 
 @admin_manage_bp.post("/permissions")
-@jwt_required()
-@require_roles("admin")
+@role_required("admin")
 def create_permission():
     data = request.get_json(force=True) or {}
     code = data.get("code")
@@ -147,8 +122,7 @@ def create_permission():
     return jsonify(p.to_dict())
 
 @admin_manage_bp.put("/roles/<int:rid>/permissions")
-@jwt_required()
-@require_roles("admin")
+@role_required("admin")
 def set_role_permissions(rid):
     r = Role.query.get_or_404(rid)
     data = request.get_json(force=True) or {}
@@ -157,3 +131,12 @@ def set_role_permissions(rid):
     r.permissions = perms
     db.session.commit()
     return jsonify(r.to_dict())
+
+# ========== 运行状态 ==========
+@admin_manage_bp.get("/db/pool")
+@role_required("admin")
+def db_pool_stats():
+    """当前 worker 的连接池统计 + 只读副本健康状态（多 worker 部署时每次请求落到的进程不同）。"""
+    from db_engine import pool_stats
+    from db_router import replica_health
+    return jsonify({**pool_stats(), "replica": replica_health.snapshot()})
@@ -2,6 +2,7 @@
 from __future__ import annotations
 from flask import Blueprint, request, jsonify, current_app
 from uuid import uuid4
+from datetime import datetime
 from typing import Any, Dict, List
 from werkzeug.exceptions import BadRequest
 from flask_jwt_extended import jwt_required, get_jwt_identity
@@ -114,15 +115,88 @@ def start_assessment():
         return _err("Internal error starting assessment.", status=500)
 
 # ---------- 登录后归档 ----------
+# 单次 claim 最多归档的匿名会话数
+CLAIM_MAX_SESSIONS = 20
+
+def _claim_row(user_id: int, item: Dict[str, Any]) -> Dict[str, Any] | None:
+    """把一条 {anon_session_id, input, results} 转成 assessment_results 行（anon_session_id 缺失返回 None）。"""
+    anon_sid = (item.get("anon_session_id") or "").strip() if isinstance(item, dict) else ""
+    if not anon_sid:
+        return None
+    results: List[Dict[str, Any]] = item.get("results") or []
+    # 由后端提取 summary，抹平字段差异
+    summary = _extract_summary_from_top(_first(results))
+    return {
+        "user_id": user_id,
+        "anon_session_id": anon_sid,
+        "input_payload": item.get("input") or {},
+        "results": results,
+        "top_program_id": summary["top"]["program_id"],
+        "top_program_title": summary["top"]["title"],
+        "top_university": summary["top"]["university"],
+        "top_country": summary["top"]["country"],
+        "top_city": summary["top"]["city"],
+        "prob": _num(summary["prob"]),
+        "prob_low": _num(summary["low"]),
+        "prob_high": _num(summary["high"]),
+        "risks": summary["risks"],
+        "improvements": summary["improvements"],
+        "created_at": datetime.utcnow(),
+    }
+
+def _insert_ignore(rows: List[Dict[str, Any]]) -> set[str] | None:
+    """
+    INSERT ... ON CONFLICT (user_id, anon_session_id) DO NOTHING（uq_user_anon），单条语句批量写入。
+    返回本次真正插入的 anon_session_id 集合；方言不支持 RETURNING 时返回 None。
+    """
+    table = AssessmentResult.__table__
+    dialect = db.engine.dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table).values(rows).on_conflict_do_nothing(index_elements=["user_id", "anon_session_id"])
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table).values(rows).on_conflict_do_nothing(constraint="uq_user_anon")
+    else:
+        # MySQL 等：INSERT IGNORE
+        stmt = table.insert().values(rows).prefix_with("IGNORE")
+
+    if getattr(db.engine.dialect, "insert_returning", False):
+        res = db.session.execute(stmt.returning(table.c.anon_session_id))
+        return {r[0] for r in res}
+    db.session.execute(stmt)
+    return None
+
+def _latest_dict(saved: AssessmentResult) -> Dict[str, Any]:
+    return {
+        "id": saved.id,
+        "prob": saved.prob,
+        "low": saved.prob_low,
+        "high": saved.prob_high,
+        "risks": saved.risks or [],
+        "improvements": saved.improvements or [],
+        "top": {
+            "program_id": saved.top_program_id,
+            "title": saved.top_program_title,
+            "university": saved.top_university,
+            "country": saved.top_country,
+            "city": saved.top_city,
+        },
+        "created_at": saved.created_at.isoformat() if saved.created_at else None,
+    }
+
 @assessment_bp.post("/claim")
 @jwt_required(optional=True)
 def claim_assessment():
     """
     统一契约（推荐）：
       { anon_session_id: str, input?: object, results?: array }
+    批量契约（一次归档多个匿名会话）：
+      { sessions: [{ anon_session_id, input?, results? }, ...] }
     行为：
       - 校验 anon_session_id 存在
-      - 登录用户：幂等落库（user_id + anon_session_id 唯一）
+      - 登录用户：INSERT ... ON CONFLICT DO NOTHING 幂等落库（uq_user_anon），
+        重试/并发请求不会先读后写，也不会撞唯一约束报错
       - 未登录：直接 200 ok，不写库（前端也能继续流程）
     """
     try:
@@ -130,71 +204,66 @@ def claim_assessment():
         user_id = ident["id"] if isinstance(ident, dict) and "id" in ident else ident
 
         data = _json_obj()
-        anon_sid = (data.get("anon_session_id") or "").strip()
-        if not anon_sid:
-            return _err("anon_session_id is required", status=422)
+        batch = isinstance(data.get("sessions"), list)
+        items = data["sessions"] if batch else [data]
+        if len(items) > CLAIM_MAX_SESSIONS:
+            return _err(f"at most {CLAIM_MAX_SESSIONS} sessions per claim", status=422)
 
-        input_payload = data.get("input") or {}
-        results: List[Dict[str, Any]] = data.get("results") or []
+        sids = [(it.get("anon_session_id") or "").strip() if isinstance(it, dict) else "" for it in items]
+        if not sids or not all(sids):
+            return _err("anon_session_id is required", status=422)
+        sids = list(dict.fromkeys(sids))
 
         # 未登录：不报错，直接返回 ok，以提升体验稳定性
         if not user_id:
+            if batch:
+                return _ok({"ok": True, "items": [{"anon_session_id": s, "saved_id": None, "duplicate": False} for s in sids]})
             return _ok({"ok": True, "saved_id": None, "duplicate": False})
 
-        # 幂等：同一 user + anon_session_id 只写一次
-        existed = (AssessmentResult.query
-                   .filter_by(user_id=int(user_id), anon_session_id=anon_sid)
-                   .first())
-        duplicate = existed is not None
-
-        # 由后端提取 summary，抹平字段差异
-        top = _first(results)
-        summary = _extract_summary_from_top(top)
-
-        if not duplicate:
-            row = AssessmentResult(
-                user_id=int(user_id),
-                anon_session_id=anon_sid,           # 需要模型有这个字段 & 唯一索引
-                input_payload=input_payload,        # 需要模型有 JSON 字段 input_payload
-                results=results,                    # JSON
-                top_program_id=summary["top"]["program_id"],
-                top_program_title=summary["top"]["title"],
-                top_university=summary["top"]["university"],
-                top_country=summary["top"]["country"],
-                top_city=summary["top"]["city"],
-                prob=_num(summary["prob"]),
-                prob_low=_num(summary["low"]),
-                prob_high=_num(summary["high"]),
-                risks=summary["risks"],
-                improvements=summary["improvements"],
-            )
-            db.session.add(row)
-            db.session.commit()
-            saved = row
-        else:
-            saved = existed
-
-        latest = {
-            "id": saved.id,
-            "prob": saved.prob,
-            "low": saved.prob_low,
-            "high": saved.prob_high,
-            "risks": saved.risks or [],
-            "improvements": saved.improvements or [],
-            "top": {
-                "program_id": saved.top_program_id,
-                "title": saved.top_program_title,
-                "university": saved.top_university,
-                "country": saved.top_country,
-                "city": saved.top_city,
-            },
-            "created_at": getattr(saved, "created_at", None).isoformat() if getattr(saved, "created_at", None) else None,
-        }
-        return _ok({"ok": True, "saved_id": saved.id, "duplicate": duplicate, "latest": latest})
+        uid = int(user_id)
+        # 同一批次内重复的 anon_session_id 只取第一条
+        rows, seen = [], set()
+        for it in items:
+            row = _claim_row(uid, it)
+            if row and row["anon_session_id"] not in seen:
+                seen.add(row["anon_session_id"])
+                rows.append(row)
+
+        q = AssessmentResult.query.filter(
+            AssessmentResult.user_id == uid, AssessmentResult.anon_session_id.in_(sids)
+        )
+        before = None
+        if not getattr(db.engine.dialect, "insert_returning", False):
+            # 不支持 RETURNING 的方言：按写入前是否已存在判断（仅用于返回 duplicate 标记）
+            before = {sid for (sid,) in q.with_entities(AssessmentResult.anon_session_id).all()}
+        inserted = _insert_ignore(rows)
+        if inserted is None:
+            inserted = set(sids) - (before or set())
+        db.session.commit()
+
+        saved_by_sid = {r.anon_session_id: r for r in q.all()}
+        out = [
+            {
+                "anon_session_id": sid,
+                "saved_id": saved_by_sid[sid].id if sid in saved_by_sid else None,
+                "duplicate": sid not in inserted,
+            }
+            for sid in sids
+        ]
+
+        if batch:
+            newest = max(saved_by_sid.values(), key=lambda r: (r.created_at or datetime.min, r.id), default=None)
+            return _ok({"ok": True, "items": out, "latest": _latest_dict(newest) if newest else None})
+
+        saved = saved_by_sid.get(sids[0])
+        if saved is None:
+            return _err("Internal error in claim.", status=500)
+        return _ok({"ok": True, "saved_id": saved.id, "duplicate": out[0]["duplicate"], "latest": _latest_dict(saved)})
 
     except BadRequest as e:
         return _err(str(e), status=400)
     except Exception:
+        db.session.rollback()
         current_app.logger.exception("claim_assessment failed")
         return _err("Internal error in claim.", status=500)
 
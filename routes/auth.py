@@ -10,8 +10,7 @@ from flask_jwt_extended import (
 )
 from extensions import db
 from models.user import User  # 确保模型路径正确
-from functools import wraps
-from flask_jwt_extended import verify_jwt_in_request, get_jwt
+from services.rbac import role_required  # noqa: F401  兼容旧的 from routes.auth import role_required
 
 auth_bp = Blueprint("auth", __name__, url_prefix="/api/auth")
 
@@ -196,26 +195,6 @@ def refresh_token():
         return jsonify({"success": False, "msg": "refreshToken 无效或已过期"}), 401
 
 
-def role_required(*required_roles):
-    """
-    装饰器：限制接口必须由特定角色访问。
-    使用：@role_required("admin", "staff")
-    """
-    def wrapper(fn):
-        @wraps(fn)
-        def decorated_view(*args, **kwargs):
-            verify_jwt_in_request()
-            claims = get_jwt() or {}
-            user_roles = claims.get("roles") or claims.get("role") or []
-            if isinstance(user_roles, str):
-                user_roles = [user_roles]
-            if not any(role in user_roles for role in required_roles):
-                return jsonify({"msg": "权限不足"}), 403
-            return fn(*args, **kwargs)
-        return decorated_view
-    return wrapper
-
-
 @auth_bp.post("/register")
 def register():
 
@@ -3,9 +3,9 @@
 订阅与付款相关接口：
 
 当前版本特点：
-- /billing/plan     ：根据 StudentProfile.service_type & ServiceEntitlement 计算当前套餐
-- /billing/invoices ：根据订单表 Order 列出当前用户的付费记录
-- /billing/checkout ：创建一个“全程服务 Pro 套餐”的订单，并立即视为已支付（开发阶段）
+- /billing/plan     ：根据 StudentProfile.service_type & ServiceEntitlement 计算当前套餐（按用户缓存快照）
+- /billing/invoices ：根据订单表 Order 列出当前用户的付费记录（keyset 分页）
+- /billing/checkout ：创建一个“全程服务 Pro 套餐”的订单，并立即经状态机置为已支付（开发阶段）
 
 将来接入真实支付时：
 - /billing/checkout 可以改为创建支付会话（微信/支付宝/Stripe），返回真实的支付链接或二维码内容；
@@ -19,7 +19,13 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 
 from extensions import db
 from models.student_profile import StudentProfile
+from models.user import User
 from models.order import Order, ServiceEntitlement
+from services import order_state
+from services.entitlement_cache import PLAN_FREE, get_snapshot
+from services.entitlement_service import active_filter
+from services.order_history import InvalidCursor, invoices_page, parse_limit
+from services.order_state import PAID, PENDING
 
 billing_bp = Blueprint("billing_bp", __name__, url_prefix="/api")
 
@@ -41,34 +47,15 @@ def _get_profile(user_id):
 
 def _plan_from_state(user_id):
     """
-    根据 ServiceEntitlement + StudentProfile 推断当前套餐：
+    根据 ServiceEntitlement + StudentProfile 推断当前套餐（规则见 services/entitlement_cache._plan）：
     - 若存在 active 的 plan/full 权益 → Pro
-    - 否则看 StudentProfile.service_type：
-        - full -> Pro
-        - diy  -> DIY
-        - 其他/空 -> Free
+    - 否则看 StudentProfile.service_type：full -> Pro，diy -> DIY，其他/空 -> Free
+
+    结果取自按用户缓存的权益快照（与 /api/me/services 共用），支付 / checkout / 权益变更后自动失效。
     """
     if not user_id:
-        return {"name": "Free", "price_str": "¥0"}
-
-    ent = (
-        ServiceEntitlement.query
-        .filter_by(user_id=user_id, kind="plan", code="full", status="active")
-        .first()
-    )
-    if ent:
-        return {"name": "Pro", "price_str": "¥9800"}
-
-    prof = _get_profile(user_id)
-    code = (prof.service_type if prof else None) or "diy"
-    code = code.lower()
-
-    if code == "full":
-        return {"name": "Pro", "price_str": "¥9800"}
-    if code == "diy":
-        return {"name": "DIY", "price_str": "¥0"}
-
-    return {"name": "Free", "price_str": "¥0"}
+        return PLAN_FREE
+    return get_snapshot(user_id)["plan"]
 
 
 @billing_bp.get("/billing/plan")
@@ -84,17 +71,18 @@ def my_plan():
 def invoices():
     """
     账单记录：直接使用订单表 Order 中 status = 'paid' 的记录。
+    ?limit=20&cursor=<上一页返回的 next_cursor>，按 paid_at 倒序 keyset 分页，只查账单用到的列。
     """
     user_id = _current_user_id()
     if not user_id:
-        return jsonify({"items": []})
+        return jsonify({"items": [], "next_cursor": None})
 
-    orders = (
-        Order.query
-        .filter_by(user_id=user_id, status="paid")
-        .order_by(Order.paid_at.desc().nullslast(), Order.created_at.desc())
-        .all()
-    )
+    try:
+        orders, next_cursor = invoices_page(
+            user_id, limit=parse_limit(request.args.get("limit")), cursor=request.args.get("cursor"),
+        )
+    except InvalidCursor:
+        return jsonify({"error": "INVALID_CURSOR"}), 400
 
     items = []
     for o in orders:
@@ -111,7 +99,7 @@ def invoices():
             }
         )
 
-    return jsonify({"items": items})
+    return jsonify({"items": items, "next_cursor": next_cursor})
 
 
 @billing_bp.post("/billing/checkout")
@@ -123,6 +111,7 @@ def checkout():
     当前版本：
     - 不接真实支付渠道，直接创建一个已支付订单 + plan 类型的 ServiceEntitlement
     - 更新 StudentProfile.service_type = 'full'
+    - 已有生效中的 Pro 权益时直接返回原订单（幂等；同一用户的并发 checkout 通过锁用户行串行化）
     - 返回一个站内跳转链接 /user/billing?plan=pro&status=success
 
     请求体示例：
@@ -142,44 +131,67 @@ def checkout():
     now = datetime.utcnow()
     amount = Decimal("9800.00")  # 这里仅作示意，单位：CNY 元，未来可从配置或产品表读取
 
-    # 创建订单（视为内部渠道 manual，并直接标记已支付）
+    # 创建订单（视为内部渠道 manual），随后经状态机 pending -> paid
     order = Order(
         user_id=user_id,
-        status="paid",
+        status=PENDING,
         channel="manual",
         currency="CNY",
         total_amount=amount,
         description="GoAbroady Pro - 全程留学服务",
         created_at=now,
-        paid_at=now,
     )
+    # 同一用户的 checkout 串行化，"查已有权益 -> 发放" 之间不会被并发请求插入：
+    # - 先锁用户行（MySQL / PostgreSQL 的 SELECT ... FOR UPDATE；要在插入订单之前，
+    #   否则订单外键检查持有的用户行共享锁会和 FOR UPDATE 互相等待）
+    # - 再 flush 订单：SQLite 忽略 FOR UPDATE，在这里拿到写锁，并发请求阻塞在各自的 flush 上
+    # 下面的权益查询用加锁读，读到已提交的最新数据
+    db.session.query(User.id).filter(User.id == user_id).with_for_update().scalar()
     db.session.add(order)
     db.session.flush()
 
-    # 创建 plan 类型的权益记录
-    ent = ServiceEntitlement(
-        user_id=user_id,
-        kind="plan",
-        code="full",
-        product_id=None,
-        source_order_id=order.id,
-        remaining_uses=None,
-        valid_from=now,
-        valid_to=None,
-        status="active",
+    # 已有生效中的 Pro 权益：直接返回原订单，重复点击不会重复下单 / 发放权益
+    existing = (
+        db.session.query(ServiceEntitlement.source_order_id)
+        .filter_by(user_id=user_id, kind="plan", code="full")
+        .filter(*active_filter())
+        .with_for_update()
+        .first()
     )
-    db.session.add(ent)
-
-    # 更新学生档案
-    profile = _get_profile(user_id)
-    if not profile:
-        profile = StudentProfile(user_id=user_id)
-        db.session.add(profile)
-    profile.service_type = "full"
-    if hasattr(profile, "updated_at"):
-        profile.updated_at = now
-
-    db.session.commit()
+    if existing:
+        db.session.rollback()
+        return jsonify(
+            {
+                "checkout_url": "/user/billing?plan=pro&status=success",
+                "order_id": existing[0],
+            }
+        )
+
+    def grant_plan(_ids):
+        # 创建 plan 类型的权益记录
+        ent = ServiceEntitlement(
+            user_id=user_id,
+            kind="plan",
+            code="full",
+            product_id=None,
+            source_order_id=order.id,
+            remaining_uses=None,
+            valid_from=now,
+            valid_to=None,
+            status="active",
+        )
+        db.session.add(ent)
+
+        # 更新学生档案
+        profile = _get_profile(user_id)
+        if not profile:
+            profile = StudentProfile(user_id=user_id)
+            db.session.add(profile)
+        profile.service_type = "full"
+        if hasattr(profile, "updated_at"):
+            profile.updated_at = now
+
+    order_state.transition(PAID, [order.id], values={"paid_at": now}, before_commit=grant_plan)
 
     return jsonify(
         {
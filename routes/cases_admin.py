@@ -1,27 +1,10 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt
 from extensions import db
 from models.case_study import CaseStudy
+from services.rbac import role_required
 
 cases_admin_bp = Blueprint("cases_admin", __name__, url_prefix="/api/admin")
 
-def has_role(required, roles):
-    if isinstance(roles, str): roles = [roles]
-    s = set([r.lower() for r in roles or []])
-    return any(r in s for r in [x.lower() for x in required])
-
-def role_required(*required_roles):
-    def deco(fn):
-        def wrapper(*args, **kwargs):
-            claims = get_jwt() or {}
-            roles = claims.get("roles") or claims.get("role") or []
-            if not has_role(required_roles, roles):
-                return jsonify({"code":"FORBIDDEN","message":"insufficient role"}), 403
-            return fn(*args, **kwargs)
-        wrapper.__name__ = fn.__name__
-        return jwt_required()(wrapper)
-    return deco
-
 @cases_admin_bp.get("/cases")
 @role_required("admin","superadmin","staff")
 def admin_list_cases():
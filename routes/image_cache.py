@@ -13,6 +13,7 @@ from flask import Blueprint, send_file, request, current_app, jsonify
 
 # 你的 Program 模型（按你的项目结构）
 from models.program import Program
+from services import unsplash_service
 
 image_cache_bp = Blueprint("image_cache", __name__)
 
@@ -73,56 +74,16 @@ def _normalize_unsplash_image_url(url: str, w: int, h: int) -> str:
 def _unsplash_api_random(query: str, orientation: str = "landscape") -> str | None:
     """
     官方 API - 随机图，返回 direct URL（regular/full）
-    需要环境变量：UNSPLASH_ACCESS_KEY
+    需要环境变量：UNSPLASH_ACCESS_KEY；缓存与限速见 services/unsplash_service.py
     """
-    key = os.getenv("UNSPLASH_ACCESS_KEY")
-    if not key:
-        return None
-    try:
-        r = requests.get(
-            "https://api.unsplash.com/photos/random",
-            params={"query": query, "orientation": orientation, "content_filter": "high"},
-            headers={"Accept-Version": "v1", "Authorization": f"Client-ID {key}"},
-            timeout=(CONNECT_TIMEOUT, DOWNLOAD_TIMEOUT),
-        )
-        if r.status_code != 200:
-            logging.warning("unsplash random non-200: %s %s", r.status_code, r.text[:180])
-            return None
-        data = r.json()
-        if isinstance(data, list) and data:
-            data = data[0]
-        urls = (data.get("urls") or {})
-        return urls.get("regular") or urls.get("full")
-    except Exception as e:
-        logging.warning("unsplash random error: %s", e)
-        return None
+    return unsplash_service.random_photo(query, orientation=orientation)
 
 def _unsplash_api_search_deterministic(query: str, seed: int, orientation: str = "landscape") -> str | None:
     """
     官方 API - search + seed 选第 N 张，保证同一 seed 稳定
+    （同一 query 的结果列表只请求一次，之后走本地缓存）
     """
-    key = os.getenv("UNSPLASH_ACCESS_KEY")
-    if not key:
-        return None
-    try:
-        r = requests.get(
-            "https://api.unsplash.com/search/photos",
-            params={"query": query, "orientation": orientation, "per_page": 30, "content_filter": "high"},
-            headers={"Accept-Version": "v1", "Authorization": f"Client-ID {key}"},
-            timeout=(CONNECT_TIMEOUT, DOWNLOAD_TIMEOUT),
-        )
-        if r.status_code != 200:
-            logging.warning("unsplash search non-200: %s %s", r.status_code, r.text[:180])
-            return None
-        results = (r.json() or {}).get("results") or []
-        if not results:
-            return None
-        idx = seed % len(results)
-        urls = (results[idx].get("urls") or {})
-        return urls.get("regular") or urls.get("full")
-    except Exception as e:
-        logging.warning("unsplash search error: %s", e)
-        return None
+    return unsplash_service.search_deterministic(query, seed=seed, orientation=orientation)
 
 def _unsplash_source_url(query: str, w=1600, h=900, sig=None) -> str:
     """
@@ -149,13 +110,15 @@ def _unsplash_provider_urls(query: str, w: int, h: int, seed: int, orientation:
     """
     urls: list[str] = []
 
-    # 1) random
+    # 先做 search（结果列表会被缓存），random 随后可直接从缓存取，不再额外消耗配额
+    api_search = _unsplash_api_search_deterministic(query, seed=seed, orientation=orientation)
     api_random = _unsplash_api_random(query, orientation=orientation)
+
+    # 1) random
     if api_random:
         urls.append(_normalize_unsplash_image_url(api_random, w, h))
 
     # 2) deterministic search
-    api_search = _unsplash_api_search_deterministic(query, seed=seed, orientation=orientation)
     if api_search:
         urls.append(_normalize_unsplash_image_url(api_search, w, h))
 
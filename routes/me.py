@@ -2,8 +2,11 @@
 from __future__ import annotations
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from sqlalchemy import desc
+from datetime import datetime
+from sqlalchemy import desc, or_, and_
+from sqlalchemy.orm import load_only
 from extensions import db
+from services.feed_service import FEED_PROFILE_FIELDS, enqueue_user
 
 # 动态导入模型
 try:
@@ -21,6 +24,11 @@ try:
 except ImportError:
     AssessmentResult = None
 
+try:
+    from models.recommendation_feed import RecommendationFeed
+except ImportError:
+    RecommendationFeed = None
+
 bp_me = Blueprint("me", __name__, url_prefix="/api")
 
 def _current_user_id() -> int | None:
@@ -110,11 +118,13 @@ def put_profile():
             if "avatar" in data: user.avatar = data["avatar"]
 
     # 更新 Profile 表
+    prof, before = None, {}
     if StudentProfile:
         prof = db.session.query(StudentProfile).filter_by(user_id=uid).first()
         if not prof:
             prof = StudentProfile(user_id=uid)
             db.session.add(prof)
+        before = {k: getattr(prof, k, None) for k in FEED_PROFILE_FIELDS}
 
         allowed_fields = [
             "gpa", "gpa_scale", "ielts", "toefl", "gre", 
@@ -129,6 +139,10 @@ def put_profile():
 
     try:
         db.session.commit()
+        # 影响推荐的字段有变化 -> 后台重算推荐流。
+        # 请求里的值可能是字符串（"3.5"），提交后 prof 已过期，这里重新读到的是数据库转换后的类型，再与旧值比较
+        if prof is not None and any(getattr(prof, k, None) != v for k, v in before.items()):
+            enqueue_user(uid)
         return jsonify({"msg": "保存成功"})
     except Exception as e:
         db.session.rollback()
@@ -137,39 +151,96 @@ def put_profile():
 # ========== 3) 评估结果 (合并自 profile.py) ==========
 
 # 列表接口 (从 profile.py 迁移过来)
+# 只返回摘要列；results / input_payload 大字段不加载，改由详情接口按 id 获取
+HISTORY_DEFAULT_LIMIT = 20
+HISTORY_MAX_LIMIT = 100
+
+def _encode_cursor(x) -> str:
+    return f"{x.created_at.isoformat()}|{x.id}"
+
+def _decode_cursor(raw: str):
+    try:
+        ts, rid = raw.rsplit("|", 1)
+        return datetime.fromisoformat(ts), int(rid)
+    except Exception:
+        return None
+
+def _assessment_summary(x) -> dict:
+    return {
+        "id": x.id,
+        "created_at": x.created_at.isoformat() if x.created_at else None,
+        "top": {
+            "program_id": x.top_program_id,
+            "title": x.top_program_title,
+            "university": x.top_university,
+            "country": x.top_country,
+            "city": x.top_city,
+        },
+        "prob": x.prob,
+        "low": x.prob_low,
+        "high": x.prob_high,
+        "risks": x.risks or [],
+        "improvements": x.improvements or [],
+    }
+
 @bp_me.get("/me/assessment-results")
 @jwt_required()
 def list_assessment_results():
+    """
+    评估历史（摘要）：?limit=20&cursor=<上一页返回的 next_cursor>
+    按 (created_at, id) 倒序做 keyset 分页，不用 OFFSET。
+    """
     uid = _current_user_id()
     if not uid: return jsonify({"msg": "Unauthorized"}), 401
     
-    if not AssessmentResult: return jsonify({"items": []})
-
-    limit = int(request.args.get("limit", 20))
-    q = AssessmentResult.query.filter_by(user_id=uid).order_by(AssessmentResult.created_at.desc())
-    items = q.limit(limit).all()
-
-    def to_dict(x):
-        return {
-            "id": x.id,
-            "created_at": x.created_at.isoformat() if x.created_at else None,
-            "top": {
-                "program_id": x.top_program_id,
-                "title": x.top_program_title,
-                "university": x.top_university,
-                "country": x.top_country,
-                "city": x.top_city,
-            },
-            "prob": x.prob,
-            "low": x.prob_low,
-            "high": x.prob_high,
-            "risks": x.risks or [],
-            "improvements": x.improvements or [],
-            "results": x.results,
-            "input": x.input_payload,
-        }
-
-    return jsonify({"items": [to_dict(i) for i in items]})
+    if not AssessmentResult: return jsonify({"items": [], "next_cursor": None})
+
+    try:
+        limit = int(request.args.get("limit", HISTORY_DEFAULT_LIMIT))
+    except (TypeError, ValueError):
+        limit = HISTORY_DEFAULT_LIMIT
+    limit = max(1, min(limit, HISTORY_MAX_LIMIT))
+
+    A = AssessmentResult
+    q = (
+        A.query
+        .options(load_only(
+            A.id, A.created_at, A.top_program_id, A.top_program_title, A.top_university,
+            A.top_country, A.top_city, A.prob, A.prob_low, A.prob_high, A.risks, A.improvements,
+        ))
+        .filter(A.user_id == uid)
+    )
+
+    cursor = request.args.get("cursor")
+    if cursor:
+        parsed = _decode_cursor(cursor)
+        if parsed is None:
+            return jsonify({"msg": "invalid cursor"}), 400
+        ts, rid = parsed
+        q = q.filter(or_(A.created_at < ts, and_(A.created_at == ts, A.id < rid)))
+
+    # created_at 有默认值，不需要 NULLS LAST；(created_at DESC, id DESC) 直接走 (user_id, created_at, id) 索引倒序扫描
+    rows = q.order_by(A.created_at.desc(), A.id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return jsonify({
+        "items": [_assessment_summary(i) for i in rows],
+        "next_cursor": _encode_cursor(rows[-1]) if has_more and rows else None,
+    })
+
+# 详情接口：单条评估的完整 Top-K 结果与原始入参
+@bp_me.get("/me/assessment-results/<int:rid>")
+@jwt_required()
+def get_assessment_result(rid: int):
+    uid = _current_user_id()
+    if not uid: return jsonify({"msg": "Unauthorized"}), 401
+    if not AssessmentResult: return jsonify({"msg": "Not Found"}), 404
+
+    x = AssessmentResult.query.filter_by(id=rid, user_id=uid).first()
+    if not x:
+        return jsonify({"msg": "Not Found"}), 404
+    return jsonify({**_assessment_summary(x), "results": x.results, "input": x.input_payload})
 
 # 最新结果接口 (保留原 me.py 逻辑，兼容 /me/assessments/latest)
 @bp_me.get("/me/assessments/latest")
@@ -203,6 +274,21 @@ def latest_assessment():
         "prob": prob, "results": results, "top": top, "input": payload
     })
 
+# 预计算推荐流：后台按画像刷新，这里只读一行
+@bp_me.get("/me/recommendations")
+@jwt_required()
+def my_recommendations():
+    uid = _current_user_id()
+    if not uid: return jsonify({"error": "UNAUTHORIZED"}), 401
+    if not RecommendationFeed: return jsonify({"results": [], "pending": False})
+
+    feed = RecommendationFeed.query.filter_by(user_id=uid).first()
+    if not feed:
+        # 还没算过：排队计算，前端稍后重试
+        queued = enqueue_user(uid)
+        return jsonify({"results": [], "pending": queued}), 202
+    return jsonify({**feed.to_dict(), "pending": False})
+
 # 兼容旧路由：为了保险起见，增加一个 alias 指向同一个函数
 # 如果前端有的地方用了 /api/me/assessment-results/latest
 @bp_me.get("/me/assessment-results/latest")
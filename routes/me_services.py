@@ -6,15 +6,13 @@ GET /api/me/services
 依赖：
 - ServiceEntitlement：记录用户已开通的单项服务或套餐
 - Product：补充展示 title、slug 等信息
+二者由 services/entitlement_cache 一次加载并按用户缓存。
 """
 
 from flask import Blueprint, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 
-from extensions import db
-from models.order import ServiceEntitlement
-from models.product import Product
-from models.student_profile import StudentProfile
+from services.entitlement_cache import get_snapshot
 
 me_services_bp = Blueprint("me_services_bp", __name__, url_prefix="/api/me")
 
@@ -59,41 +57,5 @@ def my_services():
     if not user_id:
         return jsonify({"items": []})
 
-    # 关联产品，拿到显示用名称
-    rows = (
-        db.session.query(ServiceEntitlement, Product)
-        .outerjoin(Product, ServiceEntitlement.product_id == Product.id)
-        .filter(ServiceEntitlement.user_id == user_id)
-        .order_by(ServiceEntitlement.created_at.desc())
-        .all()
-    )
-
-    items = []
-    for ent, prod in rows:
-        # 只展示 active/有效 的权益（如果你想展示历史记录，也可以去掉这个判断）
-        if ent.status not in ("active", None):
-            continue
-
-        title = None
-        if prod is not None and prod.title:
-            title = prod.title
-        elif ent.code:
-            title = ent.code
-        else:
-            title = "已开通服务"
-
-        items.append(
-            {
-                "id": ent.id,
-                "kind": ent.kind,
-                "code": ent.code,
-                "product_id": ent.product_id,
-                "title": title,
-                "status": ent.status or "active",
-                "remaining_uses": ent.remaining_uses,
-                "valid_from": ent.valid_from.isoformat() if ent.valid_from else None,
-                "valid_to": ent.valid_to.isoformat() if ent.valid_to else None,
-            }
-        )
-
-    return jsonify({"items": items})
+    # 与 /api/billing/plan 共用按用户缓存的权益快照（services/entitlement_cache）
+    return jsonify({"items": get_snapshot(user_id)["services"]})
@@ -1,5 +1,4 @@
 # routes/order.py
-from datetime import datetime
 from decimal import Decimal
 
 from flask import Blueprint, jsonify, request
@@ -7,7 +6,10 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 
 from extensions import db
 from models.product import Product
-from models.order import Order, OrderItem, ServiceEntitlement
+from models.order import Order, OrderItem
+from services.order_history import InvalidCursor, orders_page, parse_limit
+from services.order_state import PENDING
+from services.payment_service import mark_order_paid_by_id
 
 orders_bp = Blueprint("orders_bp", __name__, url_prefix="/api")
 
@@ -73,7 +75,7 @@ def create_order():
 
     order = Order(
         user_id=user_id,
-        status="pending",
+        status=PENDING,
         channel=channel,
         currency="CNY",
         total_amount=amount,
@@ -105,18 +107,26 @@ def create_order():
 @orders_bp.get("/orders")
 @jwt_required()
 def list_my_orders():
-    """列出当前用户的订单（按时间倒序）"""
+    """
+    列出当前用户的订单（按时间倒序，keyset 分页）：
+    ?limit=20&cursor=<上一页返回的 next_cursor>&summary=1
+
+    - summary=1：不返回 items，只查订单摘要列（1 条 SQL）
+    - 否则按页大小选择 joined / selectin 加载明细（见 services/order_history）
+    """
     user_id = _current_user_id()
     if not user_id:
-        return jsonify({"items": []})
+        return jsonify({"items": [], "next_cursor": None})
 
-    q = (
-        Order.query
-        .filter_by(user_id=user_id)
-        .order_by(Order.created_at.desc())
-    )
-    items = [o.to_dict() for o in q.all()]
-    return jsonify({"items": items})
+    limit = parse_limit(request.args.get("limit"))
+    summary = request.args.get("summary", "").lower() in ("1", "true", "yes")
+    try:
+        rows, next_cursor = orders_page(user_id, limit=limit, cursor=request.args.get("cursor"), summary=summary)
+    except InvalidCursor:
+        return jsonify({"error": "INVALID_CURSOR"}), 400
+
+    items = [o.to_summary_dict() if summary else o.to_dict() for o in rows]
+    return jsonify({"items": items, "next_cursor": next_cursor})
 
 
 @orders_bp.get("/orders/<int:order_id>")
@@ -140,7 +150,7 @@ def mock_pay(order_id: int):
     """
     模拟支付成功（开发阶段使用）：
 
-    - 将订单状态设为 paid，记录 paid_at
+    - 将订单状态设为 paid，记录 paid_at（已支付则直接返回，幂等）
     - 为该订单对应的每个产品，创建一条 ServiceEntitlement（kind='product'）
     - 将来接入真实支付时，可以由支付平台回调触发同样的逻辑
     """
@@ -148,32 +158,10 @@ def mock_pay(order_id: int):
     if not user_id:
         return jsonify({"error": "UNAUTHORIZED"}), 401
 
-    order = Order.query.filter_by(id=order_id, user_id=user_id).first()
-    if not order:
+    exists = db.session.query(Order.id).filter_by(id=order_id, user_id=user_id).scalar()
+    if not exists:
         return jsonify({"error": "NOT_FOUND"}), 404
 
-    if order.status == "paid":
-        # 已支付则直接返回
-        return jsonify(order.to_dict())
-
-    now = datetime.utcnow()
-    order.status = "paid"
-    order.paid_at = now
-
-    # 为每个订单项生成服务权益（单项服务）
-    for item in order.items:
-        ent = ServiceEntitlement(
-            user_id=user_id,
-            kind="product",
-            code=item.product_slug,
-            product_id=item.product_id,
-            source_order_id=order.id,
-            remaining_uses=None,
-            valid_from=now,
-            valid_to=None,
-            status="active",
-        )
-        db.session.add(ent)
-
-    db.session.commit()
-    return jsonify(order.to_dict())
+    # 条件 UPDATE pending -> paid；并发重复点击只有一次改到行，权益只发一次（见 services/order_state）
+    mark_order_paid_by_id(order_id)
+    return jsonify(Order.query.get(order_id).to_dict())
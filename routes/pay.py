@@ -5,7 +5,7 @@ import json
 import logging
 import traceback
 from datetime import datetime
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity 
 
 from extensions import db
@@ -13,64 +13,24 @@ from models.user import User
 from models.order import Order 
 
 # --- 支付 SDK ---
-from wechatpayv3 import WeChatPay, WeChatPayType
-from alipay.aop.api.AlipayClientConfig import AlipayClientConfig
-from alipay.aop.api.DefaultAlipayClient import DefaultAlipayClient
+from wechatpayv3 import WeChatPayType
 from alipay.aop.api.domain.AlipayTradePrecreateModel import AlipayTradePrecreateModel
 from alipay.aop.api.request.AlipayTradePrecreateRequest import AlipayTradePrecreateRequest
 from alipay.aop.api.request.AlipayTradeQueryRequest import AlipayTradeQueryRequest
 from alipay.aop.api.domain.AlipayTradeQueryModel import AlipayTradeQueryModel
 
-# --- 短信服务 ---
-from services.sms_service import send_payment_success_sms
+# --- 支付结果落库 / 事件 / 对账 ---
+from services import pay_events, pay_reconciler
+from services.order_no import next_order_no
+from services.payment_service import PAID, PENDING, mark_order_paid, order_status
+
+# --- 支付宝 / 微信客户端：每个 worker 构建一次并缓存，密钥/证书变化时自动重建 ---
+from services.pay_clients import get_alipay_client, get_wxpay_client
 
 pay_bp = Blueprint('pay', __name__, url_prefix='/api/pay')
 logger = logging.getLogger(__name__)
 
-# ==================== 1. 支付宝客户端初始化 ====================
-def get_alipay_client():
-    try:
-        app_id = os.getenv('ALIPAY_APPID')
-        private_key = os.getenv('ALIPAY_PRIVATE_KEY')
-        public_key = os.getenv('ALIPAY_PUBLIC_KEY')
-
-        if not all([app_id, private_key, public_key]):
-            logger.error("支付宝配置缺失")
-            return None
-
-        config = AlipayClientConfig()
-        config.app_id = app_id
-        config.app_private_key = private_key
-        config.alipay_public_key = public_key
-        config.endpoint = os.getenv('ALIPAY_GATEWAY', "https://openapi.alipay.com/gateway.do")
-        config.sign_type = "RSA2"
-        
-        # 修复点：参数名必须是 alipay_client_config
-        return DefaultAlipayClient(alipay_client_config=config)
-    except Exception as e:
-        logger.error(f"支付宝初始化失败: {e}")
-        return None
-
-# ==================== 2. 微信客户端初始化 ====================
-def get_wxpay_client():
-    try:
-        private_key_path = os.getenv('WX_PRIVATE_KEY_PATH', './cert/apiclient_key.pem')
-        if not os.path.exists(private_key_path): return None
-        with open(private_key_path, 'r') as f: private_key = f.read()
-        return WeChatPay(
-            wechatpay_type=WeChatPayType.NATIVE,
-            mchid=os.getenv('WX_MCHID'),
-            private_key=private_key,
-            cert_serial_no=os.getenv('WX_CERT_SERIAL_NO'),
-            apiv3_key=os.getenv('WX_APIV3_KEY'),
-            appid=os.getenv('WX_APPID'),
-            notify_url=os.getenv('WX_NOTIFY_URL'),
-            cert_dir='./cert',
-            logger=logger
-        )
-    except: return None
-
-# ==================== 3. 下单接口 (保存数据库) ====================
+# ==================== 1. 下单接口 (保存数据库) ====================
 @pay_bp.route('/prepare', methods=['POST'])
 @jwt_required(optional=True) 
 def prepare_pay():
@@ -81,8 +41,8 @@ def prepare_pay():
 
     if amount_yuan <= 0: return jsonify({'msg': '金额异常'}), 400
 
-    # 生成订单号
-    out_trade_no = f"ORD{int(time.time() * 1000)}"
+    # 生成订单号（Snowflake 风格，多 worker 同一毫秒也不冲突，见 services/order_no.py）
+    out_trade_no = next_order_no()
     
     # 获取商品描述
     items = data.get('items', [])
@@ -100,7 +60,8 @@ def prepare_pay():
                     out_trade_no=out_trade_no,
                     product_name=product_name,
                     amount=float(amount_yuan),
-                    status='PENDING'
+                    channel=channel,
+                    status=PENDING
                 )
                 db.session.add(new_order)
                 db.session.commit()
@@ -108,8 +69,10 @@ def prepare_pay():
             else:
                 logger.warning(f"用户ID {user_id} 不存在，跳过存库")
         except Exception as e:
-            logger.error(f"订单入库失败 (不影响支付): {e}")
+            # 订单没入库就不向渠道下单：否则用户付了款，回调 / 对账都找不到这笔订单
+            logger.error(f"订单入库失败: {e}")
             db.session.rollback()
+            return jsonify({'msg': '下单失败，请重试'}), 500
 
     # === 支付宝下单 ===
     if channel == 'alipay':
@@ -169,57 +132,122 @@ def prepare_pay():
 
     return jsonify({'msg': '不支持的渠道'}), 400
 
-# ==================== 4. 查单接口 (修复 404 + 触发短信) ====================
+# ==================== 2. 查单 / 等待支付结果 ====================
+# 上游查单只由后台对账线程做（services/pay_reconciler.py，限速）；这里只读本地状态，
+# 未支付时把订单登记给对账线程。前端优先用 stream(SSE) / wait(长轮询)，被回调或对账结果即时唤醒。
+PAY_WAIT_MAX = int(os.getenv('PAY_WAIT_MAX', '25'))            # 长轮询最长挂起秒数
+PAY_STREAM_MAX = int(os.getenv('PAY_STREAM_MAX', '300'))       # SSE 连接最长保持秒数
+PAY_DB_RECHECK = float(os.getenv('PAY_DB_RECHECK', '3'))       # 等待期间回查数据库的间隔（跨进程兜底）
+
+
+def _paid_json(paid: bool):
+    return {'paid': paid, 'status': 'SUCCESS' if paid else 'NOTPAY'}
+
+
+def _wait_status(order_no: str, timeout: float) -> str | None:
+    """等到订单离开 pending（已支付 / 已取消）或超时，返回最后看到的状态；期间每 PAY_DB_RECHECK 秒回查一次数据库。"""
+    deadline = time.monotonic() + max(timeout, 0)
+    while True:
+        status = order_status(order_no)
+        db.session.rollback()   # 释放连接，下次回查拿到新快照
+        if status != PENDING:
+            return status
+        pay_reconciler.watch(order_no)
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return status
+        ev = pay_events.wait(order_no, min(PAY_DB_RECHECK, remaining))
+        if ev and ev.get('status') == PAID:
+            return PAID
+
+
 @pay_bp.route('/query', methods=['GET'])
 def query_order():
-    """ 前端轮询查单，如果在本地开发收不到回调，这里也可以触发更新 """
+    """ 兼容旧前端的轮询接口：只查本地状态，不再同步调用微信查单 """
     order_no = request.args.get('order_no')
     if not order_no:
         return jsonify({'paid': False})
-
-    # 1. 查本地数据库 (如果回调先到了，这里直接返回成功)
-    order = Order.query.filter_by(out_trade_no=order_no).first()
-    if order and order.status == 'PAID':
-        return jsonify({'paid': True, 'status': 'SUCCESS'})
-
-    # 2. 如果本地未支付，去微信官方查 (作为兜底)
-    is_paid = False
-    wxpay = get_wxpay_client()
-    if wxpay:
-        try:
-            code, result = wxpay.query(out_trade_no=order_no)
-            if isinstance(result, str): result = json.loads(result)
-            
-            # 微信返回支付成功
-            if code == 200 and result.get('trade_state') == 'SUCCESS':
-                is_paid = True
-        except: pass
-    
-    # 支付宝查单逻辑 (略)
-
-    # 3. 如果查到已支付，更新数据库并补发短信
-    if is_paid:
-        if order and order.status != 'PAID':
-            order.status = 'PAID'
-            order.pay_time = datetime.now()
-            db.session.commit()
-            logger.info(f"✅ [查单] 订单 {order_no} 已支付，更新状态")
-            
-            # 🔥 触发短信 (国阳云)
-            user = User.query.get(order.user_id)
-            # 只有当用户绑定了手机号时才发送
-            if user and user.phone:
-                logger.info(f"🚀 准备发送短信给: {user.phone}")
-                send_payment_success_sms(user.phone, order_no, order.product_name)
-            else:
-                logger.warning(f"用户 {user.id if user else 'Unknown'} 未绑定手机号，无法发送短信")
-        
-        return jsonify({'paid': True, 'status': 'SUCCESS'})
-
+    status = order_status(order_no)
+    if status is None:
+        return jsonify({'msg': '订单不存在'}), 404
+    if status == PAID:
+        return jsonify(_paid_json(True))
+    if status == PENDING:
+        pay_reconciler.watch(order_no)
     return jsonify({'paid': False})
 
-# ==================== 5. 回调通知 (支付宝) ====================
+
+@pay_bp.route('/status/<string:order_no>/wait', methods=['GET'])
+def wait_order(order_no):
+    """ 长轮询：已支付立即返回；否则最多挂起 timeout 秒（默认/上限 PAY_WAIT_MAX） """
+    try:
+        timeout = min(float(request.args.get('timeout', PAY_WAIT_MAX)), PAY_WAIT_MAX)
+    except ValueError:
+        timeout = PAY_WAIT_MAX
+    if order_status(order_no) is None:
+        return jsonify({'msg': '订单不存在'}), 404
+    return jsonify(_paid_json(_wait_status(order_no, timeout) == PAID))
+
+
+@pay_bp.route('/status/<string:order_no>/stream', methods=['GET'])
+def stream_order(order_no):
+    """ SSE：支付成功推 paid 事件、订单被取消推 closed 事件后关闭；每 15 秒一个心跳注释 """
+    if order_status(order_no) is None:
+        return jsonify({'msg': '订单不存在'}), 404
+
+    def gen():
+        deadline = time.monotonic() + PAY_STREAM_MAX
+        yield 'retry: 3000\n\n'
+        while time.monotonic() < deadline:
+            status = _wait_status(order_no, min(15, deadline - time.monotonic()))
+            if status == PAID:
+                yield f"event: paid\ndata: {json.dumps(_paid_json(True))}\n\n"
+                return
+            if status != PENDING:
+                yield f"event: closed\ndata: {json.dumps({'paid': False, 'status': 'CLOSED'})}\n\n"
+                return
+            yield ': keep-alive\n\n'
+        yield f"event: timeout\ndata: {json.dumps(_paid_json(False))}\n\n"
+
+    return Response(stream_with_context(gen()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+# ==================== 3. 回调通知 (支付宝) ====================
 @pay_bp.route('/notify/alipay', methods=['POST'])
 def notify_alipay():
-    # ... (保持原样即可)
-    return 'success'
\ No newline at end of file
+    """ 支付宝异步通知：RSA2 验签（除 sign / sign_type 外按 key 排序拼接）后落库；返回 success 表示已处理 """
+    from alipay.aop.api.util.SignatureUtils import verify_with_rsa
+
+    params = request.form.to_dict()
+    sign = params.pop('sign', None)
+    params.pop('sign_type', None)
+    public_key = os.getenv('ALIPAY_PUBLIC_KEY')
+    if not sign or not public_key:
+        return 'fail'
+    message = '&'.join(f"{k}={params[k]}" for k in sorted(params) if params[k] != '')
+    try:
+        verify_with_rsa(public_key, message.encode('utf-8'), sign)
+    except Exception as e:
+        logger.warning(f"支付宝通知验签失败: {e}")
+        return 'fail'
+    if params.get('app_id') != os.getenv('ALIPAY_APPID'):
+        return 'fail'
+
+    if params.get('trade_status') in ('TRADE_SUCCESS', 'TRADE_FINISHED') and params.get('out_trade_no'):
+        mark_order_paid(params['out_trade_no'], trade_no=params.get('trade_no'), source='notify-alipay')
+    return 'success'
+
+# ==================== 4. 回调通知 (微信) ====================
+@pay_bp.route('/notify/wechat', methods=['POST'])
+def notify_wechat():
+    """ 微信支付结果通知：验签 + 解密后落库，唤醒等待该订单的 SSE / 长轮询 """
+    wxpay = get_wxpay_client()
+    if not wxpay:
+        return jsonify({'code': 'FAIL', 'message': '微信配置错误'}), 500
+    result = wxpay.callback(request.headers, request.get_data())
+    if not result or result.get('event_type') != 'TRANSACTION.SUCCESS':
+        return jsonify({'code': 'FAIL', 'message': 'invalid notify'}), 400
+    resource = result.get('resource') or {}
+    if resource.get('trade_state') == 'SUCCESS' and resource.get('out_trade_no'):
+        mark_order_paid(resource['out_trade_no'], trade_no=resource.get('transaction_id'), source='notify-wechat')
+    return jsonify({'code': 'SUCCESS', 'message': '成功'})
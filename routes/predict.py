@@ -1,7 +1,10 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy.orm import joinedload
 from models.program import Program, ProgramRequirement
 from models.student_profile import StudentProfile
+from models.recommender.pseudo import InputPref
+from services.assessment_service import features_from_profile, score_programs
 
 predict_bp = Blueprint("predict", __name__)
 
@@ -11,6 +14,12 @@ def _float(v, default=None):
     except Exception:
         return default
 
+def _int(v, default=None):
+    try:
+        return int(v)
+    except Exception:
+        return default
+
 @predict_bp.post("/api/programs/<int:pid>/predict")
 @jwt_required()
 def predict_program(pid):
@@ -57,3 +66,71 @@ def predict_program(pid):
         "percent": int(round(prob*100)),
         "explain": "基于你与最低申请要求（GPA/IELTS/GRE）的差距做的初步估算；仅供参考，不代表录取承诺。"
     })
+
+
+# 单次批量请求的项目数上限（对比页一般 ≤ 20）
+BATCH_MAX_PROGRAMS = 100
+
+@predict_bp.post("/api/programs/predict-batch")
+@jwt_required()
+def predict_batch():
+    """
+    批量预测录取概率（对比页使用）：
+      入参：{ "program_ids": [1, 2, 3, ...] }
+      - 学生画像只查一次；项目 + requirements 一次 JOIN 查询取回
+      - 与评估服务共用同一打分引擎（services.assessment_service.score_programs）
+    返回：{ user_id, items: [{program_id, prob, percent, low, high, risks, improvements}], missing: [...] }
+    """
+    ident = get_jwt_identity()
+    uid = ident.get("id") if isinstance(ident, dict) else _int(ident)
+    if not uid:
+        return jsonify({"msg": "Unauthorized"}), 401
+
+    data = request.get_json(silent=True) or {}
+    raw_ids = data.get("program_ids") or data.get("ids") or []
+    if not isinstance(raw_ids, list):
+        return jsonify({"msg": "program_ids 必须是数组"}), 400
+    ids = list(dict.fromkeys(i for i in (_int(x) for x in raw_ids) if i is not None))
+    if not ids:
+        return jsonify({"msg": "program_ids 不能为空"}), 400
+    if len(ids) > BATCH_MAX_PROGRAMS:
+        return jsonify({"msg": f"单次最多 {BATCH_MAX_PROGRAMS} 个项目"}), 400
+
+    profile = StudentProfile.query.filter_by(user_id=uid).first()
+    if not profile:
+        return jsonify({"msg": "请先完善学生画像"}), 400
+
+    programs = (
+        Program.query
+        .options(joinedload(Program.requirements))
+        .filter(Program.id.in_(ids))
+        .all()
+    )
+    pref = InputPref(
+        system_recommend=False,
+        preferred_regions=[], preferred_schools=[], preferred_programs=[],
+        features=features_from_profile(profile),
+    )
+    by_id = {p.id: (s, expl) for p, s, expl in score_programs(programs, pref)}
+
+    items = []
+    for pid in ids:
+        if pid not in by_id:
+            continue
+        s, expl = by_id[pid]
+        items.append({
+            "program_id": pid,
+            "prob": s,
+            "percent": int(round(s * 100)),
+            "low": expl.get("low"),
+            "high": expl.get("high"),
+            "risks": expl.get("risks") or [],
+            "improvements": expl.get("improvements") or [],
+        })
+
+    return jsonify({
+        "user_id": uid,
+        "items": items,
+        "missing": [pid for pid in ids if pid not in by_id],
+        "explain": "基于你与最低申请要求（GPA/IELTS/GRE）的差距做的初步估算；仅供参考，不代表录取承诺。",
+    })
@@ -3,6 +3,7 @@ from flask import Blueprint, request, jsonify
 from sqlalchemy import or_, and_, func
 from extensions import db
 from models.product import Product
+from compression import cache_compressed
 
 public_product_bp = Blueprint("product_public", __name__, url_prefix="/api")
 
@@ -140,6 +141,7 @@ def product_facets():
     })
 
 @public_product_bp.get("/products/<slug_or_id>")
+@cache_compressed
 def product_detail(slug_or_id):
     """
     详情接口：返回 to_public_dict()（包含图集、卖点、包含/不含、流程、FAQ、plans 等）
@@ -3,6 +3,7 @@ from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required
 from sqlalchemy.exc import IntegrityError
 from extensions import db
+from services.feed_service import enqueue_catalog_refresh
 import json
 
 from models.program import Program, ProgramRequirement
@@ -70,6 +71,7 @@ def create_program():
         db.session.rollback()
         return jsonify({"msg": "slug 已存在或字段非法", "error": str(e)}), 400
 
+    enqueue_catalog_refresh()
     return jsonify({"msg": "created", "program": p.to_dict()}), 201
 
 @admin_program_bp.put("/<int:pid>")
@@ -97,6 +99,7 @@ def update_program(pid):
             ))
 
     db.session.commit()
+    enqueue_catalog_refresh()
     return jsonify({"msg": "updated", "program": p.to_dict()}), 200
 
 @admin_program_bp.delete("/<int:pid>")
@@ -105,6 +108,7 @@ def delete_program(pid):
     p = Program.query.get_or_404(pid)
     db.session.delete(p)
     db.session.commit()
+    enqueue_catalog_refresh()
     return jsonify({"msg": "deleted"}), 200
 
 @admin_program_bp.post("/<int:pid>/publish")
@@ -113,6 +117,7 @@ def publish_program(pid):
     p = Program.query.get_or_404(pid)
     p.status = "published"
     db.session.commit()
+    enqueue_catalog_refresh()
     return jsonify({"msg": "ok", "status": p.status})
 
 @admin_program_bp.post("/<int:pid>/unpublish")
@@ -121,4 +126,5 @@ def unpublish_program(pid):
     p = Program.query.get_or_404(pid)
     p.status = "draft"
     db.session.commit()
+    enqueue_catalog_refresh()
     return jsonify({"msg": "ok", "status": p.status})
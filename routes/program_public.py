@@ -2,6 +2,7 @@
 from flask import Blueprint, jsonify, request
 from sqlalchemy import or_
 from models.program import Program
+from compression import cache_compressed
 import json
 
 public_program_bp = Blueprint("public_program", __name__, url_prefix="/api")
@@ -167,6 +168,7 @@ def get_public_programs():
     })
 
 @public_program_bp.get("/programs/<string:slug>")
+@cache_compressed
 def get_public_program_detail(slug: str):
     p = Program.query.filter_by(slug=slug).first()
     if not p:
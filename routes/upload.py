@@ -3,8 +3,7 @@ import time
 from flask import Blueprint, request, jsonify, current_app
 from werkzeug.utils import secure_filename
 from flask_jwt_extended import jwt_required
-# 如果你还需要保留原来的 role_required，请保留引入
-from routes.auth import role_required 
+from services.rbac import role_required
 
 upload_bp = Blueprint("upload", __name__)
 
@@ -3,7 +3,7 @@ import re
 from sqlalchemy.orm import joinedload
 from models.program import Program, ProgramRequirement
 from models.recommender.pseudo import Candidate, InputPref
-from services.recommender_provider import score_candidate
+from services.recommender_provider import score_candidates
 
 _gpa_num_re = re.compile(r"([\d\.]+)\s*/\s*([\d\.]+)")
 _num_re = re.compile(r"^\s*([\d\.]+)\s*$")
@@ -96,6 +96,35 @@ def _apply_filters(base_q, filters: Dict[str, Any]):
         q = q.filter(Program.degree_level.in_(filters["degree_level"]))
     return q
 
+def features_from_profile(prof) -> Dict[str, Any]:
+    """StudentProfile -> 模型特征（GPA 按 gpa_scale 统一换算成 4 分制）。"""
+    if prof is None:
+        return {}
+    gpa = _as_float(getattr(prof, "gpa", None))
+    scale = _as_float(getattr(prof, "gpa_scale", None)) or 4.0
+    if gpa is not None and scale > 0 and scale != 4.0:
+        gpa = round(gpa / scale * 4.0, 3)
+    return {
+        "gpa": gpa,
+        "ielts": _as_float(getattr(prof, "ielts", None)),
+        "gre": _as_float(getattr(prof, "gre", None)),
+    }
+
+def _build_pref(features: Dict[str, Any] | None, preferences: Dict[str, Any] | None) -> InputPref:
+    preferences = preferences or {}
+    return InputPref(
+        system_recommend=bool(preferences.get("system_recommend", True)),
+        preferred_regions=list(preferences.get("regions") or []),
+        preferred_schools=list(preferences.get("schools") or []),
+        preferred_programs=list(preferences.get("programs") or []),
+        features=features or {},
+    )
+
+def score_programs(programs: List[Program], pref: InputPref) -> List[Tuple[Program, float, Dict[str, Any]]]:
+    """对一组已加载 requirements 的 Program 整批打分，返回 [(program, score, explain), ...]（保持输入顺序）。"""
+    cands = [_program_to_candidate(p) for p in programs]
+    return [(p, s, expl) for p, (s, expl) in zip(programs, score_candidates(cands, pref))]
+
 def recommend_programs(
     features: Dict[str, Any],
     preferences: Dict[str, Any] | None = None,
@@ -125,21 +154,9 @@ def recommend_programs(
                     filters = relaxed
                     break
 
-    # 2) 转候选 + 打分
-    cands = [_program_to_candidate(p) for p in programs]
-    pref = InputPref(
-        system_recommend=bool(preferences.get("system_recommend", True)),
-        preferred_regions=list(preferences.get("regions") or []),
-        preferred_schools=list(preferences.get("schools") or []),
-        preferred_programs=list(preferences.get("programs") or []),
-        features=features or {},
-    )
-
-    scored: List[Tuple[Program, float, Dict[str, Any]]] = []
-    for p, c in zip(programs, cands):
-        s, expl = score_candidate(c, pref)
-        scored.append((p, s, expl))
-
+    # 2) 转候选 + 打分（整批打分，学习模型后端会一次性向量化推理）
+    pref = _build_pref(features, preferences)
+    scored = score_programs(programs, pref)
 
     scored.sort(key=lambda t: t[1], reverse=True)
     top = scored[:topk] if scored else []
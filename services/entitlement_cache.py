@@ -0,0 +1,218 @@
+# services/entitlement_cache.py
+"""
+用户权益 / 套餐快照缓存：/api/billing/plan 与 /api/me/services 共用一次加载。
+
+快照 = {"plan": {...}, "services": [...]}：
+- 一条 ServiceEntitlement ⟕ Product 查询得到当前有效的权益（过滤条件见 entitlement_service.active_filter）；
+  没有生效中的 plan/full 权益时再查一次 StudentProfile.service_type
+- 进程内 LRU（ENTITLEMENT_CACHE_MAX 个用户），TTL = ENTITLEMENT_CACHE_TTL 秒
+
+失效（事务提交后执行，避免并发读在提交前把旧数据重新填回缓存）：
+- Session 事件：flush 了 ServiceEntitlement 的增删改、或 StudentProfile.service_type 变化 -> 失效该用户
+  （checkout、mock-pay 发放权益都走这里）
+- 订单进入 paid（services/order_state 钩子）-> 失效下单用户
+- 批量 UPDATE 等绕过 ORM flush 的写入需调用 invalidate(user_ids)
+加载期间若发生过任何失效，本次结果不写回缓存（全局 epoch 比较）。
+跨进程：设置 ENTITLEMENT_CACHE_REDIS_URL（默认沿用 PAY_EVENTS_REDIS_URL）时通过 Redis 广播失效；
+未配置时其他 worker 最多在 TTL 内看到旧快照。
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from prometheus_client import Counter
+from sqlalchemy import event, inspect
+
+from extensions import RoutingSession, db
+from models.order import Order, ServiceEntitlement
+from models.product import Product
+from models.student_profile import StudentProfile
+from services import order_state
+
+logger = logging.getLogger(__name__)
+
+TTL = float(os.getenv("ENTITLEMENT_CACHE_TTL", "15"))
+MAX_USERS = int(os.getenv("ENTITLEMENT_CACHE_MAX", "10000"))
+REDIS_URL = os.getenv("ENTITLEMENT_CACHE_REDIS_URL", os.getenv("PAY_EVENTS_REDIS_URL", ""))
+CHANNEL = "entitlements:invalidate"
+
+CACHE_LOOKUPS = Counter("app_entitlement_cache_total", "Entitlement snapshot cache lookups", ["result"])
+
+PLAN_PRO = {"name": "Pro", "price_str": "¥9800"}
+PLAN_DIY = {"name": "DIY", "price_str": "¥0"}
+PLAN_FREE = {"name": "Free", "price_str": "¥0"}
+
+_lock = threading.Lock()
+_data: "OrderedDict[int, tuple[float, dict]]" = OrderedDict()
+_epoch = 0
+_redis = None
+_sub_thread: threading.Thread | None = None
+
+
+def _service_item(ent: ServiceEntitlement, prod: Product | None) -> dict:
+    if prod is not None and prod.title:
+        title = prod.title
+    elif ent.code:
+        title = ent.code
+    else:
+        title = "已开通服务"
+    return {
+        "id": ent.id,
+        "kind": ent.kind,
+        "code": ent.code,
+        "product_id": ent.product_id,
+        "title": title,
+        "status": ent.status or "active",
+        "remaining_uses": ent.remaining_uses,
+        "valid_from": ent.valid_from.isoformat() if ent.valid_from else None,
+        "valid_to": ent.valid_to.isoformat() if ent.valid_to else None,
+    }
+
+
+def _plan(user_id: int, has_full: bool) -> dict:
+    """
+    - 若存在 active 的 plan/full 权益 → Pro
+    - 否则看 StudentProfile.service_type：full -> Pro，diy/空 -> DIY，其他 -> Free
+    """
+    if has_full:
+        return PLAN_PRO
+    code = db.session.query(StudentProfile.service_type).filter_by(user_id=user_id).scalar()
+    code = (code or "diy").lower()
+    if code == "full":
+        return PLAN_PRO
+    if code == "diy":
+        return PLAN_DIY
+    return PLAN_FREE
+
+
+def load_snapshot(user_id: int) -> dict:
+    from services.entitlement_service import active_filter
+
+    # 只取当前有效的权益：有效期 / 次数过滤在 SQL 里做（ix_service_entitlements_validity）
+    rows = (
+        db.session.query(ServiceEntitlement, Product)
+        .outerjoin(Product, ServiceEntitlement.product_id == Product.id)
+        .filter(ServiceEntitlement.user_id == user_id, *active_filter())
+        .order_by(ServiceEntitlement.created_at.desc())
+        .all()
+    )
+    services = [_service_item(ent, prod) for ent, prod in rows]
+    has_full = any(ent.kind == "plan" and ent.code == "full" for ent, _ in rows)
+    return {"plan": _plan(user_id, has_full), "services": services}
+
+
+def get_snapshot(user_id: int) -> dict:
+    now = time.monotonic()
+    with _lock:
+        hit = _data.get(user_id)
+        if hit and now - hit[0] < TTL:
+            _data.move_to_end(user_id)
+            CACHE_LOOKUPS.labels("hit").inc()
+            return hit[1]
+        epoch = _epoch
+    CACHE_LOOKUPS.labels("miss").inc()
+    snap = load_snapshot(user_id)
+    with _lock:
+        if epoch == _epoch:
+            _data[user_id] = (now, snap)
+            _data.move_to_end(user_id)
+            while len(_data) > MAX_USERS:
+                _data.popitem(last=False)
+    return snap
+
+
+def _invalidate_local(user_ids) -> None:
+    global _epoch
+    with _lock:
+        _epoch += 1
+        for uid in user_ids:
+            _data.pop(uid, None)
+
+
+def invalidate(user_ids) -> None:
+    """失效若干用户的快照（本进程 + 配置了 Redis 时广播给其他 worker）。"""
+    user_ids = {int(u) for u in user_ids if u is not None}
+    if not user_ids:
+        return
+    _invalidate_local(user_ids)
+    if _redis is not None:
+        try:
+            _redis.publish(CHANNEL, json.dumps(sorted(user_ids)))
+        except Exception as e:
+            logger.warning("entitlement cache redis publish failed: %s", e)
+
+
+def clear() -> None:
+    global _epoch
+    with _lock:
+        _epoch += 1
+        _data.clear()
+
+
+# ========= 自动失效 =========
+@event.listens_for(RoutingSession, "after_flush")
+def _collect_dirty_users(session, flush_context):
+    users = session.info.setdefault("entitlement_dirty", set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, ServiceEntitlement):
+            users.add(obj.user_id)
+        elif isinstance(obj, StudentProfile) and (
+            obj in session.new or obj in session.deleted
+            or inspect(obj).attrs.service_type.history.has_changes()
+        ):
+            users.add(obj.user_id)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _invalidate_after_commit(session):
+    users = session.info.pop("entitlement_dirty", None)
+    if users:
+        invalidate(users)
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _drop_dirty_users(session):
+    session.info.pop("entitlement_dirty", None)
+
+
+@order_state.on_enter(order_state.PAID, after_commit=True)
+def _invalidate_paid(order_ids: list[int]) -> None:
+    invalidate(uid for (uid,) in db.session.query(Order.user_id).filter(Order.id.in_(order_ids)))
+
+
+# ========= 跨进程广播 =========
+def _subscriber() -> None:
+    while True:
+        try:
+            pubsub = _redis.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(CHANNEL)
+            for msg in pubsub.listen():
+                try:
+                    _invalidate_local(json.loads(msg["data"]))
+                except Exception:
+                    continue
+        except Exception as e:
+            logger.warning("entitlement cache redis subscriber error, retry in 3s: %s", e)
+            time.sleep(3)
+
+
+def init_entitlement_cache(subscribe: bool = True) -> None:
+    """create_app 中调用：配置了 Redis 时连接发布端；subscribe=True 时再启动失效订阅线程（每进程一次）。"""
+    global _redis, _sub_thread
+    if not REDIS_URL or _sub_thread is not None:
+        return
+    if _redis is None:
+        try:
+            import redis
+        except ImportError:
+            logger.warning("ENTITLEMENT_CACHE_REDIS_URL 已设置但未安装 redis，权益缓存失效仅在本进程内生效")
+            return
+        _redis = redis.Redis.from_url(REDIS_URL)
+    if subscribe:
+        _sub_thread = threading.Thread(target=_subscriber, name="entitlement-cache", daemon=True)
+        _sub_thread.start()
\ No newline at end of file
@@ -0,0 +1,183 @@
+# services/entitlement_service.py
+"""
+服务权益（ServiceEntitlement）的有效性判断、次数扣减与过期清理。
+
+状态：active | expired（valid_to 已过）| exhausted（remaining_uses 用完）
+
+- active_filter(now)：读接口把有效性过滤下推到 SQL（走 ix_service_entitlements_validity：
+  user_id, status, valid_to），不再加载全部历史后在 Python 里筛
+- consume(user_id, code, uses=1)：原子扣次数，一条条件 UPDATE
+      SET remaining_uses = remaining_uses - :n,
+          status = CASE WHEN remaining_uses - :n <= 0 THEN 'exhausted' ELSE status END
+      WHERE id = :id AND status = 'active' AND remaining_uses >= :n AND 未过期
+  并发消费同一条权益不会扣成负数；remaining_uses 为 NULL 表示不限次数，只校验有效性
+- 后台清理线程：每 ENTITLEMENT_SWEEP_INTERVAL 秒把到期 / 用完但仍为 active 的行分批
+  （ENTITLEMENT_SWEEP_BATCH）置为 expired / exhausted（走 ix_service_entitlements_sweep），
+  多 worker 时只有拿到 instance/entitlement-sweep.lock 的进程执行
+
+批量 UPDATE 不经过 ORM flush，改动后显式失效 services/entitlement_cache 中对应用户的快照。
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import case, or_, update
+
+from config import INSTANCE_DIR
+from extensions import db
+from models.order import ServiceEntitlement
+from services import entitlement_cache
+
+logger = logging.getLogger(__name__)
+
+ACTIVE = "active"
+EXPIRED = "expired"
+EXHAUSTED = "exhausted"
+
+SWEEP_ENABLED = os.getenv("ENTITLEMENT_SWEEP_ENABLED", "1") == "1"
+SWEEP_INTERVAL = float(os.getenv("ENTITLEMENT_SWEEP_INTERVAL", "300"))
+SWEEP_BATCH = int(os.getenv("ENTITLEMENT_SWEEP_BATCH", "500"))
+LOCK_PATH = os.path.join(INSTANCE_DIR, "entitlement-sweep.lock")
+
+E = ServiceEntitlement
+
+_app = None
+_thread: threading.Thread | None = None
+_lock = threading.Lock()
+_lock_file = None
+
+
+def active_filter(now: datetime | None = None) -> tuple:
+    """当前有效的权益：status='active'、未过期、次数未用完（NULL = 不限）。"""
+    now = now or datetime.utcnow()
+    return (
+        E.status == ACTIVE,
+        or_(E.valid_to.is_(None), E.valid_to > now),
+        or_(E.remaining_uses.is_(None), E.remaining_uses > 0),
+    )
+
+
+# ========= 扣次数 =========
+def consume(user_id: int, code: str, *, kind: str = "product", uses: int = 1) -> bool:
+    """
+    为 user_id 消费一次 (kind, code) 权益，成功返回 True 并提交。
+    多条可用时优先扣最早到期的；不限次数的权益直接返回 True。
+    """
+    if uses < 1:
+        raise ValueError("uses must be >= 1")
+    now = datetime.utcnow()
+    candidates = (
+        db.session.query(E.id, E.remaining_uses)
+        .filter(E.user_id == user_id, E.kind == kind, E.code == code, *active_filter(now))
+        # 不限期（valid_to 为 NULL）的排在最后；不用 NULLS LAST（MySQL 不支持）
+        .order_by(E.valid_to.is_(None), E.valid_to, E.id)
+        .all()
+    )
+    for ent_id, remaining in candidates:
+        if remaining is None:
+            db.session.rollback()
+            return True
+        if remaining < uses:
+            continue
+        changed = db.session.execute(
+            update(E)
+            .where(
+                E.id == ent_id,
+                E.status == ACTIVE,
+                E.remaining_uses >= uses,
+                or_(E.valid_to.is_(None), E.valid_to > now),
+            )
+            # status 放在前面：MySQL 按顺序执行 SET，后面的表达式会看到已扣减的值
+            .ordered_values(
+                (E.status, case((E.remaining_uses - uses <= 0, EXHAUSTED), else_=E.status)),
+                (E.remaining_uses, E.remaining_uses - uses),
+                (E.updated_at, now),
+            )
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if changed:
+            db.session.commit()
+            entitlement_cache.invalidate([user_id])
+            return True
+        # 被并发请求抢先扣完，换下一条
+    db.session.rollback()
+    return False
+
+
+# ========= 过期清理 =========
+def sweep_once(batch: int = SWEEP_BATCH) -> dict:
+    """把到期 / 用完但仍为 active 的权益分批置为 expired / exhausted（需在 app context 内）。"""
+    now = datetime.utcnow()
+    stale = (E.status == ACTIVE, or_(E.valid_to <= now, E.remaining_uses <= 0))
+    stats = {EXPIRED: 0, EXHAUSTED: 0}
+    while True:
+        rows = db.session.query(E.id, E.user_id).filter(*stale).limit(batch).all()
+        if not rows:
+            break
+        ids = [r[0] for r in rows]
+        # 两条 UPDATE 各自带完整条件，rowcount 就是实际改动的行数（期间被并发 consume 改过的行不会被误计）；
+        # 次数用完优先于过期
+        for to, cond in ((EXHAUSTED, E.remaining_uses <= 0), (EXPIRED, E.valid_to <= now)):
+            stats[to] += db.session.execute(
+                update(E)
+                .where(E.id.in_(ids), E.status == ACTIVE, cond)
+                .values(status=to, updated_at=now)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+        db.session.commit()
+        entitlement_cache.invalidate({r[1] for r in rows})
+        if len(rows) < batch:
+            break
+    if stats[EXPIRED] or stats[EXHAUSTED]:
+        logger.info("权益清理：%s", stats)
+    return stats
+
+
+def _try_leader() -> bool:
+    global _lock_file
+    if _lock_file is not None:
+        return True
+    try:
+        import fcntl
+    except ImportError:
+        return True
+    f = open(LOCK_PATH, "a+")
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return False
+    _lock_file = f
+    logger.info("pid %s 负责权益过期清理", os.getpid())
+    return True
+
+
+def init_entitlement_sweeper(app) -> None:
+    """在 create_app() 中调用：记录 app 并启动清理线程（每进程一次）。"""
+    global _app, _thread
+    if not SWEEP_ENABLED:
+        return
+    with _lock:
+        _app = app
+        if _thread is None or not _thread.is_alive():
+            _thread = threading.Thread(target=_worker, name="entitlement-sweep", daemon=True)
+            _thread.start()
+
+
+def _worker() -> None:
+    while True:
+        time.sleep(SWEEP_INTERVAL)
+        if not _try_leader():
+            continue
+        with _app.app_context():
+            try:
+                sweep_once()
+            except Exception:
+                db.session.rollback()
+                logger.exception("权益过期清理失败")
+            finally:
+                db.session.remove()
@@ -0,0 +1,131 @@
+# services/feed_service.py
+"""
+预计算推荐流（RecommendationFeed）的后台刷新。
+
+触发点：
+- routes/me.py put_profile：gpa / ielts / gre / target_country 变化 -> enqueue_user(uid)
+- routes/program_admin.py 增删改、上下架                        -> enqueue_catalog_refresh()
+
+实现：进程内队列 + 单个守护线程（每个 gunicorn worker 各一份）。
+同一用户在队列里只排一次（去重），重算结果 upsert 到 recommendation_feeds，
+读接口 /api/me/recommendations 按 user_id 唯一索引直接取，O(1)。
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict
+import logging
+import os
+import queue
+import threading
+
+from extensions import db
+
+logger = logging.getLogger(__name__)
+
+# 影响推荐结果的画像字段
+FEED_PROFILE_FIELDS = ("gpa", "gpa_scale", "ielts", "gre", "target_country")
+FEED_TOPK = int(os.getenv("FEED_TOPK", "10"))
+FEED_WORKER_ENABLED = os.getenv("FEED_WORKER_ENABLED", "1") == "1"
+
+_CATALOG = -1  # 队列中的特殊任务：项目库变更，刷新所有已有 feed
+
+_queue: "queue.Queue[int]" = queue.Queue()
+_pending: set[int] = set()
+_pending_lock = threading.Lock()
+_app = None
+_thread: threading.Thread | None = None
+
+
+def init_feed_worker(app) -> None:
+    """在 create_app() 中调用：记录 app 并启动后台线程（每进程一次）。"""
+    global _app, _thread
+    if not FEED_WORKER_ENABLED:
+        return
+    with _pending_lock:
+        _app = app
+        if _thread is None or not _thread.is_alive():
+            _thread = threading.Thread(target=_worker, name="feed-refresh", daemon=True)
+            _thread.start()
+
+
+def _put(job: int) -> bool:
+    if _app is None:
+        return False
+    with _pending_lock:
+        if job in _pending:
+            return False
+        _pending.add(job)
+    _queue.put(job)
+    return True
+
+
+def enqueue_user(user_id: int | None) -> bool:
+    """排队重算某个用户的推荐；已在队列中则忽略。"""
+    if not user_id:
+        return False
+    return _put(int(user_id))
+
+
+def enqueue_catalog_refresh() -> bool:
+    """项目库变更：排队刷新所有已有 feed 的用户。"""
+    return _put(_CATALOG)
+
+
+def _profile_filters(prof) -> Dict[str, Any]:
+    country = (getattr(prof, "target_country", None) or "").strip() if prof else ""
+    return {"country": [country]} if country else {}
+
+
+def recompute_user(user_id: int):
+    """同步重算并保存某个用户的推荐流（需在 app context 内调用）。"""
+    from models.recommendation_feed import RecommendationFeed
+    from models.student_profile import StudentProfile
+    from services.assessment_service import features_from_profile, recommend_programs
+
+    prof = StudentProfile.query.filter_by(user_id=user_id).first()
+    features = features_from_profile(prof)
+    filters = _profile_filters(prof)
+    out = recommend_programs(features=features, filters=filters, topk=FEED_TOPK)
+
+    feed = RecommendationFeed.query.filter_by(user_id=user_id).first()
+    if feed is None:
+        feed = RecommendationFeed(user_id=user_id)
+        db.session.add(feed)
+    feed.results = out.get("results") or []
+    feed.features = features
+    feed.filters = (out.get("meta") or {}).get("applied_filters") or filters
+    feed.topk = FEED_TOPK
+    feed.computed_at = datetime.utcnow()
+    db.session.commit()
+    return feed
+
+
+def _refresh_catalog() -> None:
+    from models.recommendation_feed import RecommendationFeed
+
+    uids = [uid for (uid,) in db.session.query(RecommendationFeed.user_id).all()]
+    for uid in uids:
+        enqueue_user(uid)
+    logger.info("项目库变更，已排队刷新 %d 个用户的推荐", len(uids))
+
+
+def _worker() -> None:
+    while True:
+        job = _queue.get()
+        with _pending_lock:
+            _pending.discard(job)
+        try:
+            with _app.app_context():
+                try:
+                    if job == _CATALOG:
+                        _refresh_catalog()
+                    else:
+                        recompute_user(job)
+                except Exception:
+                    db.session.rollback()
+                    logger.exception("推荐刷新失败: job=%s", job)
+                finally:
+                    db.session.remove()
+        finally:
+            _queue.task_done()
@@ -0,0 +1,89 @@
+# services/order_history.py
+"""
+订单 / 账单列表的 keyset 分页（GET /api/orders、GET /api/billing/invoices）。
+
+- 按 (created_at | paid_at 倒序, id 倒序) 翻页，不用 OFFSET；游标 = "<iso 时间>|<id>"
+  走 ix_orders_user_created / ix_orders_user_status_paid 倒序扫描（不用 NULLS LAST：MySQL 不支持，且会让索引无法直接提供排序）
+  - created_at 有默认值；账单只列 paid_at 非空的已支付订单（状态机置 paid 时总会写 paid_at）
+- 明细（Order.items）加载策略按页选择：
+  - summary 模式：只取摘要列，不加载明细，1 条 SQL
+  - 页大小 <= ORDERS_JOINED_MAX：joinedload，1 条 SQL（小页 JOIN 的行膨胀可以忽略）
+  - 更大的页：selectinload，2 条 SQL（订单一条 + 明细 IN 一条），避免 LIMIT 子查询 + JOIN 的行膨胀
+"""
+from __future__ import annotations
+
+import os
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import joinedload, load_only, noload, selectinload
+
+from models.order import Order
+from services.order_state import PAID
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+JOINED_MAX = int(os.getenv("ORDERS_JOINED_MAX", "10"))
+
+SUMMARY_COLUMNS = (
+    Order.id, Order.status, Order.channel, Order.currency, Order.out_trade_no, Order.trade_no,
+    Order.product_name, Order.description, Order.amount, Order.total_amount,
+    Order.created_at, Order.paid_at, Order.pay_time,
+)
+INVOICE_COLUMNS = (Order.id, Order.description, Order.total_amount, Order.created_at, Order.paid_at)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def parse_limit(raw, default: int = DEFAULT_LIMIT) -> int:
+    try:
+        limit = int(raw if raw is not None else default)
+    except (TypeError, ValueError):
+        limit = default
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def encode_cursor(ts: datetime, rid: int) -> str:
+    return f"{ts.isoformat()}|{rid}"
+
+
+def decode_cursor(raw: str):
+    try:
+        ts, rid = raw.rsplit("|", 1)
+        return datetime.fromisoformat(ts), int(rid)
+    except Exception:
+        raise InvalidCursor(raw)
+
+
+def _page(q, col, limit: int, cursor: str | None):
+    """按 (col DESC, id DESC) 取一页（col 不能为 NULL），返回 (rows, next_cursor)。"""
+    if cursor:
+        ts, rid = decode_cursor(cursor)
+        q = q.filter(or_(col < ts, and_(col == ts, Order.id < rid)))
+    rows = q.order_by(col.desc(), Order.id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(getattr(rows[-1], col.key), rows[-1].id) if has_more and rows else None
+    return rows, next_cursor
+
+
+def orders_page(user_id: int, *, limit: int, cursor: str | None = None, summary: bool = False):
+    q = Order.query.filter(Order.user_id == user_id)
+    if summary:
+        q = q.options(load_only(*SUMMARY_COLUMNS), noload(Order.items))
+    elif limit <= JOINED_MAX:
+        q = q.options(joinedload(Order.items))
+    else:
+        q = q.options(selectinload(Order.items))
+    return _page(q, Order.created_at, limit, cursor)
+
+
+def invoices_page(user_id: int, *, limit: int, cursor: str | None = None):
+    q = (
+        Order.query
+        .options(load_only(*INVOICE_COLUMNS), noload(Order.items))
+        .filter(Order.user_id == user_id, Order.status == PAID, Order.paid_at.isnot(None))
+    )
+    return _page(q, Order.paid_at, limit, cursor)
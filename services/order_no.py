@@ -0,0 +1,115 @@
+# services/order_no.py
+"""
+商户订单号生成（Snowflake 风格，k-sortable，不依赖数据库协调）。
+
+63 位整数 = 41 位毫秒时间戳（自 EPOCH 起，约 69 年）| 10 位 worker id | 12 位序号
+- worker id = ORDER_NO_NODE_ID（4 位，多机部署时每台机器配不同值）<< 6 | 本机槽位（6 位）
+- 本机槽位：在 instance/order-no/ 下对 slot-<n>.lock 做非阻塞 flock，拿到哪个用哪个，进程存活期间一直持有；
+  同机并发进程不会拿到同一槽位，进程退出后锁自动释放。fork 出的子进程（pid 变化）重新申请
+- 同一毫秒内序号递增，用满 4096 个后借用下一毫秒；时钟回拨时沿用上次的毫秒数，保证单进程内单调递增
+
+格式：ORD + 19 位零填充十进制 = 22 字符（微信 out_trade_no 6~32 位、支付宝 ≤64 位），按字符串排序即按时间排序。
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+
+from config import INSTANCE_DIR
+
+logger = logging.getLogger(__name__)
+
+EPOCH_MS = 1704067200000            # 2024-01-01 00:00:00 UTC
+NODE_BITS, SLOT_BITS, SEQ_BITS = 4, 6, 12
+WORKER_BITS = NODE_BITS + SLOT_BITS
+MAX_SEQ = (1 << SEQ_BITS) - 1
+PREFIX = "ORD"
+DIGITS = 19
+SLOT_DIR = os.path.join(INSTANCE_DIR, "order-no")
+
+NODE_ID = int(os.getenv("ORDER_NO_NODE_ID", "0"))
+if not 0 <= NODE_ID < (1 << NODE_BITS):
+    raise ValueError(f"ORDER_NO_NODE_ID must be in [0, {(1 << NODE_BITS) - 1}]")
+
+
+class OrderNoGenerator:
+    def __init__(self, node_id: int = NODE_ID, slot_dir: str = SLOT_DIR):
+        self.node_id = node_id
+        self.slot_dir = slot_dir
+        self._lock = threading.Lock()
+        self._pid = None
+        self._slot = None
+        self._slot_file = None
+        self._last_ms = -1
+        self._seq = 0
+
+    def _acquire_slot(self) -> int:
+        try:
+            import fcntl
+        except ImportError:                  # 无 flock（Windows 开发环境）：退化为 pid 取模
+            return os.getpid() % (1 << SLOT_BITS)
+        os.makedirs(self.slot_dir, exist_ok=True)
+        for slot in range(1 << SLOT_BITS):
+            f = open(os.path.join(self.slot_dir, f"slot-{slot}.lock"), "a+")
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                f.close()
+                continue
+            self._slot_file = f
+            return slot
+        raise RuntimeError(f"no free order-no slot in {self.slot_dir} (max {1 << SLOT_BITS} processes per node)")
+
+    def _ensure_worker(self) -> None:
+        if self._pid == os.getpid():
+            return
+        # fork 后子进程与父进程共享已打开的锁文件描述，必须重新打开并申请
+        self._slot_file = None
+        self._slot = self._acquire_slot()
+        self._pid = os.getpid()
+        self._last_ms, self._seq = -1, 0
+        logger.info("order-no worker id = node %d / slot %d (pid %s)", self.node_id, self._slot, self._pid)
+
+    @property
+    def worker_id(self) -> int:
+        with self._lock:
+            self._ensure_worker()
+            return (self.node_id << SLOT_BITS) | self._slot
+
+    def next_id(self) -> int:
+        with self._lock:
+            self._ensure_worker()
+            ms = max(int(time.time() * 1000) - EPOCH_MS, self._last_ms)
+            if ms == self._last_ms:
+                self._seq += 1
+                if self._seq > MAX_SEQ:
+                    ms, self._seq = ms + 1, 0
+            else:
+                self._seq = 0
+            self._last_ms = ms
+            worker = (self.node_id << SLOT_BITS) | self._slot
+            return (ms << (WORKER_BITS + SEQ_BITS)) | (worker << SEQ_BITS) | self._seq
+
+    def next_order_no(self, prefix: str = PREFIX) -> str:
+        return f"{prefix}{self.next_id():0{DIGITS}d}"
+
+
+def parse(order_no: str) -> dict:
+    """拆解订单号（排查用）：{"ts_ms", "node", "slot", "seq"}。"""
+    n = int(order_no.lstrip("ABCDEFGHIJKLMNOPQRSTUVWXYZ"))
+    worker = (n >> SEQ_BITS) & ((1 << WORKER_BITS) - 1)
+    return {
+        "ts_ms": (n >> (WORKER_BITS + SEQ_BITS)) + EPOCH_MS,
+        "node": worker >> SLOT_BITS,
+        "slot": worker & ((1 << SLOT_BITS) - 1),
+        "seq": n & MAX_SEQ,
+    }
+
+
+generator = OrderNoGenerator()
+
+
+def next_order_no(prefix: str = PREFIX) -> str:
+    return generator.next_order_no(prefix)
@@ -0,0 +1,121 @@
+# services/order_state.py
+"""
+订单状态机：所有订单状态变更都走 transition()，不再对 ORM 对象读-改-写。
+
+状态统一为小写：pending | paid | cancelled | refunded
+（早期 routes/pay.py 写入的 'PENDING' / 'PAID' 由迁移 f2c8d6a4b1e9 统一转小写）。
+
+transition(to, keys=...) 只发一条条件 UPDATE：
+    UPDATE orders SET status=:to, ... WHERE <key> IN (...) AND status IN TRANSITIONS[to]
+并以真正改到的行（RETURNING / 先 SELECT ... FOR UPDATE）为准执行副作用：
+- on_enter(status) 注册的钩子：同一事务内、commit 前执行（发放权益、写发件箱）
+- on_enter(status, after_commit=True)：commit 后执行（发布支付事件、唤醒发件箱）
+并发的回调 / 轮询 / 对账同时确认同一笔订单时，只有一方改到行，副作用只执行一次。
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import datetime
+from typing import Callable, Iterable
+
+from sqlalchemy import update
+
+from extensions import db
+from models.order import Order, OrderItem, ServiceEntitlement
+
+PENDING = "pending"
+PAID = "paid"
+CANCELLED = "cancelled"
+REFUNDED = "refunded"
+
+# 目标状态 -> 允许的来源状态
+# 超时取消后用户仍完成了支付（上游确认已付款）时允许 cancelled -> paid
+TRANSITIONS: dict[str, tuple[str, ...]] = {
+    PAID: (PENDING, CANCELLED),
+    CANCELLED: (PENDING,),
+    REFUNDED: (PAID,),
+}
+
+Hook = Callable[[list[int]], None]
+_hooks: dict[str, list[Hook]] = defaultdict(list)
+_after_commit: dict[str, list[Hook]] = defaultdict(list)
+
+
+def normalize(status: str | None) -> str | None:
+    return status.lower() if status else status
+
+
+def on_enter(status: str, *, after_commit: bool = False):
+    """注册进入某状态时的副作用钩子，参数为本次真正改变状态的订单 id 列表。"""
+    def deco(fn: Hook) -> Hook:
+        (_after_commit if after_commit else _hooks)[status].append(fn)
+        return fn
+    return deco
+
+
+def _update_returning_ids(cond: tuple, values: dict) -> list[int]:
+    stmt = update(Order).where(*cond).values(**values).execution_options(synchronize_session=False)
+    if getattr(db.engine.dialect, "update_returning", False):
+        return [r[0] for r in db.session.execute(stmt.returning(Order.id))]
+    # MySQL 等：先锁住候选行再按 id 更新
+    ids = [r[0] for r in db.session.query(Order.id).filter(*cond).with_for_update()]
+    if ids:
+        db.session.execute(update(Order).where(Order.id.in_(ids)).values(**values)
+                           .execution_options(synchronize_session=False))
+    return ids
+
+
+def transition(
+    to: str,
+    keys: Iterable,
+    *,
+    key=Order.id,
+    values: dict | None = None,
+    before_commit: Hook | None = None,
+) -> list[int]:
+    """
+    把 key IN keys 且处于允许来源状态的订单置为 to，并提交事务（调用方此前加入 session 的改动一并提交）。
+    返回本次真正改变状态的订单 id；已处于目标状态或不允许的来源状态的订单不受影响。
+    """
+    if to not in TRANSITIONS:
+        raise ValueError(f"unknown order status: {to}")
+    keys = list(keys)
+    ids: list[int] = []
+    if keys:
+        vals = {"status": to, "updated_at": datetime.utcnow(), **(values or {})}
+        # 同时匹配大写：滚动发布期间旧 worker 仍可能写入 'PENDING'
+        allowed = TRANSITIONS[to] + tuple(st.upper() for st in TRANSITIONS[to])
+        ids = _update_returning_ids((key.in_(keys), Order.status.in_(allowed)), vals)
+    if ids:
+        for hook in _hooks[to]:
+            hook(ids)
+        if before_commit:
+            before_commit(ids)
+    db.session.commit()
+    for hook in _after_commit[to] if ids else ():
+        hook(ids)
+    return ids
+
+
+@on_enter(PAID)
+def _grant_item_entitlements(order_ids: list[int]) -> None:
+    """按订单明细为每个产品发放一条 kind='product' 的权益（原 mock_pay 逻辑）。"""
+    now = datetime.utcnow()
+    rows = (
+        db.session.query(Order.id, Order.user_id, OrderItem.product_id, OrderItem.product_slug)
+        .join(OrderItem, OrderItem.order_id == Order.id)
+        .filter(Order.id.in_(order_ids))
+        .all()
+    )
+    for order_id, user_id, product_id, slug in rows:
+        db.session.add(ServiceEntitlement(
+            user_id=user_id,
+            kind="product",
+            code=slug,
+            product_id=product_id,
+            source_order_id=order_id,
+            remaining_uses=None,
+            valid_from=now,
+            valid_to=None,
+            status="active",
+        ))
@@ -0,0 +1,179 @@
+# services/outbox.py
+"""
+事务型发件箱（outbox_messages）的写入与投递。
+
+写入：业务代码在自己的事务里调用 enqueue(kind, key, payload)，随业务 commit 一起落库；
+      idempotency_key 冲突时忽略（INSERT ... ON CONFLICT DO NOTHING / INSERT IGNORE），
+      同一业务事件最多投递一次。
+投递：每个进程一个守护线程，每 OUTBOX_POLL 秒（或 wake() 后立即）领取一批：
+      - 领取 = 条件 UPDATE 把 pending / 租约过期的 sending 行改成 sending 并写入本批 claim_token，
+        多 worker 并发领取不会拿到同一行；进程崩溃后租约（OUTBOX_LEASE 秒）到期由其他 worker 接手
+      - 一批消息在线程池（OUTBOX_CONCURRENCY）里并发调用 HANDLERS[kind]，不占数据库连接
+      - 结果批量落库：成功的一条 UPDATE 置 sent；失败的按 OUTBOX_RETRY_BASE * 2^(attempts-1)
+        退避（上限 1 小时），超过 OUTBOX_MAX_ATTEMPTS 次置 failed
+处理函数返回 False 或抛异常表示失败需重试，其余返回值视为已完成。
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict
+
+from prometheus_client import Counter
+
+from extensions import db
+from models.outbox import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_ENABLED = os.getenv("OUTBOX_ENABLED", "1") == "1"
+POLL = float(os.getenv("OUTBOX_POLL", "2"))
+BATCH = int(os.getenv("OUTBOX_BATCH", "50"))
+CONCURRENCY = int(os.getenv("OUTBOX_CONCURRENCY", "4"))
+LEASE = int(os.getenv("OUTBOX_LEASE", "120"))
+RETRY_BASE = int(os.getenv("OUTBOX_RETRY_BASE", "30"))
+MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+
+OUTBOX_MESSAGES = Counter("app_outbox_messages_total", "Outbox delivery attempts", ["kind", "result"])
+
+HANDLERS: Dict[str, Callable[[dict], Any]] = {}
+
+_wake = threading.Event()
+_lock = threading.Lock()
+_app = None
+_thread: threading.Thread | None = None
+_pool: ThreadPoolExecutor | None = None
+
+
+def handler(kind: str):
+    """注册某类消息的投递函数：@outbox.handler("sms.payment_success")"""
+    def deco(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return deco
+
+
+def enqueue(kind: str, key: str, payload: dict) -> None:
+    """在调用方的事务里写入一条消息（不 commit）；key 已存在时忽略。"""
+    row = {"kind": kind, "idempotency_key": key, "payload": payload, "status": "pending",
+           "attempts": 0, "next_attempt_at": datetime.utcnow(), "created_at": datetime.utcnow()}
+    table = OutboxMessage.__table__
+    dialect = db.engine.dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table).values(row).on_conflict_do_nothing(index_elements=["idempotency_key"])
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table).values(row).on_conflict_do_nothing(index_elements=["idempotency_key"])
+    else:
+        stmt = table.insert().values(row).prefix_with("IGNORE")
+    db.session.execute(stmt)
+
+
+def wake() -> None:
+    """业务事务提交后调用：让本进程的投递线程立即领取，而不是等下一个 OUTBOX_POLL。"""
+    _wake.set()
+
+
+def _claim(limit: int) -> list[OutboxMessage]:
+    now = datetime.utcnow()
+    due = (OutboxMessage.status.in_(("pending", "sending")), OutboxMessage.next_attempt_at <= now)
+    ids = [r[0] for r in db.session.query(OutboxMessage.id).filter(*due)
+           .order_by(OutboxMessage.next_attempt_at.asc()).limit(limit)]
+    if not ids:
+        db.session.rollback()
+        return []
+    token = uuid.uuid4().hex
+    OutboxMessage.query.filter(OutboxMessage.id.in_(ids), *due).update({
+        "status": "sending",
+        "claim_token": token,
+        "next_attempt_at": now + timedelta(seconds=LEASE),
+        "attempts": OutboxMessage.attempts + 1,
+    }, synchronize_session=False)
+    db.session.commit()
+    return OutboxMessage.query.filter_by(claim_token=token).all()
+
+
+def _deliver(kind: str, payload: dict) -> str | None:
+    """在线程池里执行；返回 None 表示成功，否则为错误信息。"""
+    fn = HANDLERS.get(kind)
+    if fn is None:
+        return f"no handler for {kind}"
+    try:
+        return "handler returned False" if fn(payload or {}) is False else None
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+
+
+def drain_once(limit: int = BATCH) -> dict:
+    """领取并投递一批消息（需在 app context 内），返回本批统计。"""
+    msgs = _claim(limit)
+    if not msgs:
+        return {"claimed": 0, "sent": 0, "retry": 0, "failed": 0}
+    jobs = [(m.id, m.kind, m.attempts, m.payload) for m in msgs]
+    db.session.rollback()   # 投递期间不占连接
+    if _pool is not None:
+        errors = list(_pool.map(lambda j: _deliver(j[1], j[3]), jobs))
+    else:
+        errors = [_deliver(j[1], j[3]) for j in jobs]
+
+    now = datetime.utcnow()
+    sent = [j[0] for j, err in zip(jobs, errors) if err is None]
+    if sent:
+        OutboxMessage.query.filter(OutboxMessage.id.in_(sent)).update(
+            {"status": "sent", "sent_at": now, "claim_token": None, "last_error": None},
+            synchronize_session=False,
+        )
+    retry = failed = 0
+    for (mid, kind, attempts, _), err in zip(jobs, errors):
+        OUTBOX_MESSAGES.labels(kind, "sent" if err is None else "error").inc()
+        if err is None:
+            continue
+        give_up = attempts >= MAX_ATTEMPTS
+        delay = min(RETRY_BASE * 2 ** max(attempts - 1, 0), 3600)
+        OutboxMessage.query.filter(OutboxMessage.id == mid).update({
+            "status": "failed" if give_up else "pending",
+            "next_attempt_at": now + timedelta(seconds=delay),
+            "claim_token": None,
+            "last_error": err[:500],
+        }, synchronize_session=False)
+        if give_up:
+            failed += 1
+            logger.error("发件箱消息 %s(%s) 已重试 %d 次，放弃：%s", mid, kind, attempts, err)
+        else:
+            retry += 1
+            logger.warning("发件箱消息 %s(%s) 投递失败，%ds 后重试：%s", mid, kind, delay, err)
+    db.session.commit()
+    return {"claimed": len(jobs), "sent": len(sent), "retry": retry, "failed": failed}
+
+
+def init_outbox(app) -> None:
+    """在 create_app() 中调用：记录 app 并启动投递线程（每进程一次）。"""
+    global _app, _thread, _pool
+    if not OUTBOX_ENABLED:
+        return
+    with _lock:
+        _app = app
+        if _thread is None or not _thread.is_alive():
+            _pool = ThreadPoolExecutor(max_workers=CONCURRENCY, thread_name_prefix="outbox")
+            _thread = threading.Thread(target=_worker, name="outbox", daemon=True)
+            _thread.start()
+
+
+def _worker() -> None:
+    while True:
+        _wake.wait(POLL)
+        _wake.clear()
+        with _app.app_context():
+            try:
+                while drain_once()["claimed"] >= BATCH:
+                    pass
+            except Exception:
+                db.session.rollback()
+                logger.exception("发件箱投递失败")
+            finally:
+                db.session.remove()
@@ -0,0 +1,177 @@
+# services/pay_clients.py
+"""
+支付 SDK 客户端注册表：每个 worker 进程只构建一次，配置/密钥变化时自动重建。
+
+原来 routes/pay.py 在每次 prepare / query 都会：
+- 支付宝：新建 AlipayClientConfig + DefaultAlipayClient，重新解析 RSA 密钥
+- 微信：重新读 apiclient_key.pem、解析私钥、扫描 cert 目录加载平台证书
+  （目录里没有有效平台证书时还会联网下载）
+
+现在：
+- 客户端按"配置指纹"缓存；指纹 = 相关环境变量 + 密钥文件 / 证书目录的 (mtime, size)
+- 指纹最多每 PAY_KEY_CHECK_INTERVAL 秒检查一次（stat 几个文件），文件被替换（证书轮换）后自动热加载
+- 记录构建时的 pid：gunicorn preload 后 fork 出的 worker 会各自重建，不共享连接池
+- 构建失败（抛异常或返回 None，如平台证书下载失败、配置缺失）时不记录指纹：保留旧客户端（若有），
+  并在下个检查周期重试，网络 / 配置恢复后无需重启
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+CHECK_INTERVAL = float(os.getenv("PAY_KEY_CHECK_INTERVAL", "5"))
+
+
+def _file_sig(path: str | None):
+    if not path:
+        return None
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _dir_sig(path: str | None):
+    if not path or not os.path.isdir(path):
+        return None
+    try:
+        names = sorted(n for n in os.listdir(path) if n.lower().endswith(".pem"))
+    except OSError:
+        return None
+    return tuple((n, _file_sig(os.path.join(path, n))) for n in names)
+
+
+class ManagedClient:
+    """一个按指纹缓存、可热加载的 SDK 客户端。"""
+
+    def __init__(self, name: str, fingerprint: Callable[[], tuple], build: Callable[[], object]):
+        self.name = name
+        self._fingerprint = fingerprint
+        self._build = build
+        self._lock = threading.Lock()
+        self._client = None
+        self._fp = None
+        self._pid = None
+        self._checked_at = 0.0
+        self.builds = 0
+
+    def get(self):
+        now = time.monotonic()
+        if self._pid == os.getpid() and now - self._checked_at < CHECK_INTERVAL:
+            return self._client
+        with self._lock:
+            if self._pid == os.getpid() and now - self._checked_at < CHECK_INTERVAL:
+                return self._client
+            fp = self._fingerprint()
+            if fp != self._fp or self._pid != os.getpid():
+                self._rebuild(fp)
+            self._checked_at = time.monotonic()
+            return self._client
+
+    def _rebuild(self, fp) -> None:
+        t0 = time.perf_counter()
+        try:
+            client = self._build()
+        except Exception as e:
+            logger.error("%s 客户端初始化失败: %s", self.name, e)
+            client = None
+        if client is None:
+            # 不记录指纹：下个检查周期（CHECK_INTERVAL 秒后）即使配置 / 证书没变也会重试
+            if self._client is not None and self._pid == os.getpid():
+                logger.warning("%s 客户端重建失败，继续使用旧客户端", self.name)
+            else:
+                self._client, self._fp, self._pid = None, None, os.getpid()
+            return
+        if self._client is not None:
+            logger.info("%s 配置/密钥变化，已重建客户端", self.name)
+        self._client, self._fp, self._pid = client, fp, os.getpid()
+        self.builds += 1
+        logger.info("%s 客户端构建耗时 %.1fms", self.name, (time.perf_counter() - t0) * 1000)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._client = self._fp = self._pid = None
+            self._checked_at = 0.0
+
+
+# ========= 支付宝 =========
+_ALIPAY_ENV = ("ALIPAY_APPID", "ALIPAY_PRIVATE_KEY", "ALIPAY_PUBLIC_KEY", "ALIPAY_GATEWAY")
+
+
+def _alipay_fp() -> tuple:
+    return tuple(os.getenv(k) for k in _ALIPAY_ENV)
+
+
+def build_alipay_client():
+    from alipay.aop.api.AlipayClientConfig import AlipayClientConfig
+    from alipay.aop.api.DefaultAlipayClient import DefaultAlipayClient
+
+    app_id = os.getenv('ALIPAY_APPID')
+    private_key = os.getenv('ALIPAY_PRIVATE_KEY')
+    public_key = os.getenv('ALIPAY_PUBLIC_KEY')
+    if not all([app_id, private_key, public_key]):
+        logger.error("支付宝配置缺失")
+        return None
+
+    config = AlipayClientConfig()
+    config.app_id = app_id
+    config.app_private_key = private_key
+    config.alipay_public_key = public_key
+    config.endpoint = os.getenv('ALIPAY_GATEWAY', "https://openapi.alipay.com/gateway.do")
+    config.sign_type = "RSA2"
+    return DefaultAlipayClient(alipay_client_config=config)
+
+
+# ========= 微信支付 =========
+_WX_ENV = ("WX_MCHID", "WX_CERT_SERIAL_NO", "WX_APIV3_KEY", "WX_APPID", "WX_NOTIFY_URL")
+
+
+def _wx_key_path() -> str:
+    return os.getenv('WX_PRIVATE_KEY_PATH', './cert/apiclient_key.pem')
+
+
+def _wx_cert_dir() -> str:
+    return os.getenv('WX_CERT_DIR', './cert')
+
+
+def _wxpay_fp() -> tuple:
+    return (tuple(os.getenv(k) for k in _WX_ENV), _file_sig(_wx_key_path()), _dir_sig(_wx_cert_dir()))
+
+
+def build_wxpay_client():
+    from wechatpayv3 import WeChatPay, WeChatPayType
+
+    private_key_path = _wx_key_path()
+    if not os.path.exists(private_key_path):
+        return None
+    with open(private_key_path, 'r') as f:
+        private_key = f.read()
+    return WeChatPay(
+        wechatpay_type=WeChatPayType.NATIVE,
+        mchid=os.getenv('WX_MCHID'),
+        private_key=private_key,
+        cert_serial_no=os.getenv('WX_CERT_SERIAL_NO'),
+        apiv3_key=os.getenv('WX_APIV3_KEY'),
+        appid=os.getenv('WX_APPID'),
+        notify_url=os.getenv('WX_NOTIFY_URL'),
+        cert_dir=_wx_cert_dir(),
+        logger=logging.getLogger("routes.pay"),
+    )
+
+
+alipay_client = ManagedClient("支付宝", _alipay_fp, build_alipay_client)
+wxpay_client = ManagedClient("微信支付", _wxpay_fp, build_wxpay_client)
+
+
+def get_alipay_client() -> Optional[object]:
+    return alipay_client.get()
+
+
+def get_wxpay_client() -> Optional[object]:
+    return wxpay_client.get()
@@ -0,0 +1,93 @@
+# services/pay_events.py
+"""
+支付状态事件（发布/订阅），用于唤醒 /api/pay/status/* 的 SSE / 长轮询连接。
+
+- 本地：进程内 Condition + 最近事件表（按 out_trade_no，LRU 上限 PAY_EVENTS_KEEP）
+- 跨进程：设置 PAY_EVENTS_REDIS_URL（且装了 redis 包）时，publish 同时写 Redis 频道 pay:<out_trade_no>，
+  每个 worker 起一个订阅线程把 Redis 消息转成本地事件；未配置时只在本进程内生效，
+  等待方另有定时回查数据库兜底（见 routes/pay.py）
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("PAY_EVENTS_REDIS_URL", "")
+KEEP = int(os.getenv("PAY_EVENTS_KEEP", "2000"))
+CHANNEL_PREFIX = "pay:"
+
+_cond = threading.Condition()
+_last: "OrderedDict[str, dict]" = OrderedDict()
+_redis = None
+_sub_thread: threading.Thread | None = None
+
+
+def _publish_local(out_trade_no: str, payload: dict) -> None:
+    with _cond:
+        _last.pop(out_trade_no, None)
+        _last[out_trade_no] = payload
+        while len(_last) > KEEP:
+            _last.popitem(last=False)
+        _cond.notify_all()
+
+
+def publish(out_trade_no: str, status: str, **extra) -> None:
+    """订单状态变化后调用（回调、对账线程）。"""
+    payload = {"out_trade_no": out_trade_no, "status": status, "ts": time.time(), **extra}
+    _publish_local(out_trade_no, payload)
+    if _redis is not None:
+        try:
+            _redis.publish(CHANNEL_PREFIX + out_trade_no, json.dumps(payload))
+        except Exception as e:
+            logger.warning("pay event redis publish failed: %s", e)
+
+
+def last_event(out_trade_no: str) -> dict | None:
+    with _cond:
+        return _last.get(out_trade_no)
+
+
+def wait(out_trade_no: str, timeout: float) -> dict | None:
+    """阻塞等待该订单的事件，最多 timeout 秒；超时返回 None。"""
+    with _cond:
+        _cond.wait_for(lambda: out_trade_no in _last, timeout=timeout)
+        return _last.get(out_trade_no)
+
+
+def _subscriber() -> None:
+    while True:
+        try:
+            pubsub = _redis.pubsub(ignore_subscribe_messages=True)
+            pubsub.psubscribe(CHANNEL_PREFIX + "*")
+            for msg in pubsub.listen():
+                try:
+                    payload = json.loads(msg["data"])
+                    _publish_local(payload["out_trade_no"], payload)
+                except Exception:
+                    continue
+        except Exception as e:
+            logger.warning("pay event redis subscriber error, retry in 3s: %s", e)
+            time.sleep(3)
+
+
+def init_pay_events(subscribe: bool = True) -> None:
+    """create_app 中调用：配置了 Redis 时连接发布端；subscribe=True 时再启动订阅线程（每进程一次）。"""
+    global _redis, _sub_thread
+    if not REDIS_URL or _sub_thread is not None:
+        return
+    if _redis is None:
+        try:
+            import redis
+        except ImportError:
+            logger.warning("PAY_EVENTS_REDIS_URL 已设置但未安装 redis，支付事件仅在本进程内生效")
+            return
+        _redis = redis.Redis.from_url(REDIS_URL)
+    if subscribe:
+        _sub_thread = threading.Thread(target=_subscriber, name="pay-events", daemon=True)
+        _sub_thread.start()
\ No newline at end of file
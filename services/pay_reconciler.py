@@ -0,0 +1,378 @@
+# services/pay_reconciler.py
+"""
+支付对账后台线程：上游查单（微信 / 支付宝）只在这里发生，客户端轮询 / 长轮询永远不直接打上游。
+
+两类任务，每 PAY_RECONCILE_TICK 秒一轮：
+1) 关注队列（优先）：routes/pay.py 的 query / wait / stream 对未支付订单调用 watch(out_trade_no)
+   - 同一订单两次上游查询至少间隔 PAY_RECONCILE_MIN_INTERVAL 秒，每轮最多 PAY_RECONCILE_PER_TICK 单
+   - 关注超过 PAY_WATCH_TTL 秒没有再被 watch 的订单自动移除（用户关掉了支付页）
+2) 定时扫描（每 PAY_RECONCILE_SCAN_INTERVAL 秒，多 worker 时只有拿到文件锁的进程执行）：
+   - 按下单时长分桶扫 pending 订单，越新的订单查得越勤（见 BUCKETS）
+   - 超过 PAY_ORDER_EXPIRE_AFTER 秒仍未支付：最后查一次上游，上游明确答复未支付 / 订单不存在才批量置为 cancelled
+   - 上游查询出错的订单按 PAY_RECONCILE_RETRY_BASE * 2^连续出错次数 退避（上限 PAY_RECONCILE_MAX_BACKOFF），
+     连续出错 PAY_RECONCILE_MAX_ERRORS 次后不再自动查询（记 error 日志，待人工处理或进程重启）
+
+上游查询走有界线程池（PAY_RECONCILE_CONCURRENCY；对账线程未启动时串行），结果回到对账线程后批量落库
+（payment_service.mark_orders_paid / expire_orders）。
+
+指标：app_pay_reconcile_queries_total{channel,result}、app_pay_reconcile_cycle_seconds、
+app_pay_reconcile_oldest_pending_seconds（最老未支付订单的时长，即对账滞后）。
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import and_, or_
+
+from config import INSTANCE_DIR
+
+logger = logging.getLogger(__name__)
+
+TICK = float(os.getenv("PAY_RECONCILE_TICK", "2"))
+MIN_INTERVAL = float(os.getenv("PAY_RECONCILE_MIN_INTERVAL", "5"))
+PER_TICK = int(os.getenv("PAY_RECONCILE_PER_TICK", "20"))
+WATCH_TTL = float(os.getenv("PAY_WATCH_TTL", "600"))
+ENABLED = os.getenv("PAY_RECONCILE_ENABLED", "1") == "1"
+
+SCAN_INTERVAL = float(os.getenv("PAY_RECONCILE_SCAN_INTERVAL", "10"))
+BATCH = int(os.getenv("PAY_RECONCILE_BATCH", "200"))
+CONCURRENCY = int(os.getenv("PAY_RECONCILE_CONCURRENCY", "8"))
+EXPIRE_AFTER = int(os.getenv("PAY_ORDER_EXPIRE_AFTER", str(2 * 3600)))
+RETRY_BASE = float(os.getenv("PAY_RECONCILE_RETRY_BASE", "30"))
+MAX_BACKOFF = float(os.getenv("PAY_RECONCILE_MAX_BACKOFF", "1800"))
+MAX_ERRORS = int(os.getenv("PAY_RECONCILE_MAX_ERRORS", "8"))
+LOCK_PATH = os.path.join(INSTANCE_DIR, "pay-reconcile.lock")
+
+# (最小下单时长秒, 最大下单时长秒, 同一订单的查询间隔秒)
+BUCKETS = [
+    (0, 120, 10),
+    (120, 900, 60),
+    (900, EXPIRE_AFTER, 600),
+]
+
+RECONCILE_QUERIES = Counter(
+    "app_pay_reconcile_queries_total", "Upstream payment queries made by the reconciler", ["channel", "result"],
+)
+RECONCILE_CYCLE = Histogram(
+    "app_pay_reconcile_cycle_seconds", "Duration of one reconcile scan",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+RECONCILE_LAG = Gauge(
+    "app_pay_reconcile_oldest_pending_seconds", "Age of the oldest pending order seen by the last scan",
+    multiprocess_mode="max",
+)
+
+# out_trade_no -> {"seen": 最近一次 watch 时间, "checked": 最近一次上游查询时间}
+_watched: dict[str, dict] = {}
+_lock = threading.Lock()
+# 定时扫描：out_trade_no -> {"at": 最近一次上游查询（monotonic）, "errors": 连续出错次数}
+_checks: dict[str, dict] = {}
+_app = None
+_thread: threading.Thread | None = None
+_pool: ThreadPoolExecutor | None = None
+_lock_file = None
+
+
+def init_pay_reconciler(app) -> None:
+    """在 create_app() 中调用：记录 app 并启动对账线程（每进程一次）。"""
+    global _app, _thread, _pool
+    if not ENABLED:
+        return
+    with _lock:
+        _app = app
+        if _thread is None or not _thread.is_alive():
+            _pool = ThreadPoolExecutor(max_workers=CONCURRENCY, thread_name_prefix="pay-query")
+            _thread = threading.Thread(target=_worker, name="pay-reconcile", daemon=True)
+            _thread.start()
+
+
+def watch(out_trade_no: str) -> None:
+    if not out_trade_no:
+        return
+    now = time.monotonic()
+    with _lock:
+        item = _watched.setdefault(out_trade_no, {"seen": now, "checked": 0.0})
+        item["seen"] = now
+
+
+def unwatch(out_trade_no: str) -> None:
+    with _lock:
+        _watched.pop(out_trade_no, None)
+
+
+def _due() -> list[str]:
+    now = time.monotonic()
+    out = []
+    with _lock:
+        for no, item in list(_watched.items()):
+            if now - item["seen"] > WATCH_TTL:
+                _watched.pop(no, None)
+            elif now - item["checked"] >= MIN_INTERVAL and len(out) < PER_TICK:
+                item["checked"] = now
+                out.append(no)
+    return out
+
+
+# ========= 上游查询（在线程池里执行，不碰数据库）=========
+# 只有上游明确答复"未支付 / 已关闭 / 订单不存在"才算未支付；其余（鉴权失败、5xx、系统繁忙、支付中）一律抛异常，
+# 走 _query 的出错退避，绝不能因此把已支付的过期订单取消
+WX_UNPAID_STATES = ("NOTPAY", "CLOSED", "REVOKED", "PAYERROR")
+ALIPAY_UNPAID_STATES = ("WAIT_BUYER_PAY", "TRADE_CLOSED")
+
+
+def query_wechat(out_trade_no: str) -> tuple[bool, str | None]:
+    from services.pay_clients import get_wxpay_client
+
+    wxpay = get_wxpay_client()
+    if not wxpay:
+        raise RuntimeError("wechat client unavailable")
+    code, result = wxpay.query(out_trade_no=out_trade_no)
+    if isinstance(result, str):
+        try:
+            result = json.loads(result)
+        except ValueError:
+            result = {"message": result[:200]}
+    result = result or {}
+    if code == 200:
+        state = result.get("trade_state")
+        if state == "SUCCESS":
+            return True, result.get("transaction_id")
+        if state in WX_UNPAID_STATES:
+            return False, None
+    elif code == 404 and result.get("code") == "ORDER_NOT_EXIST":
+        return False, None
+    raise RuntimeError(f"wechat query undetermined: http {code} {result.get('code') or result.get('trade_state')}")
+
+
+def query_alipay(out_trade_no: str) -> tuple[bool, str | None]:
+    from alipay.aop.api.domain.AlipayTradeQueryModel import AlipayTradeQueryModel
+    from alipay.aop.api.request.AlipayTradeQueryRequest import AlipayTradeQueryRequest
+    from services.pay_clients import get_alipay_client
+
+    client = get_alipay_client()
+    if not client:
+        raise RuntimeError("alipay client unavailable")
+    model = AlipayTradeQueryModel()
+    model.out_trade_no = out_trade_no
+    resp = json.loads(client.execute(AlipayTradeQueryRequest(biz_model=model)))
+    body = resp.get("alipay_trade_query_response") or {}
+    code, status = body.get("code"), body.get("trade_status")
+    if code == "10000":
+        if status in ("TRADE_SUCCESS", "TRADE_FINISHED"):
+            return True, body.get("trade_no")
+        if status in ALIPAY_UNPAID_STATES:
+            return False, None
+    elif code == "40004" and body.get("sub_code") == "ACQ.TRADE_NOT_EXIST":
+        return False, None
+    raise RuntimeError(f"alipay query undetermined: {code} {body.get('sub_code') or status}")
+
+
+def _query(out_trade_no: str, channel: str | None):
+    ch = "alipay" if channel == "alipay" else "wechat"   # 早期订单没有记录 channel，按原逻辑查微信
+    try:
+        paid, trade_no = (query_alipay if ch == "alipay" else query_wechat)(out_trade_no)
+    except Exception as e:
+        RECONCILE_QUERIES.labels(ch, "error").inc()
+        logger.warning("对账查询失败 %s(%s): %s", out_trade_no, ch, e)
+        return out_trade_no, None, None
+    RECONCILE_QUERIES.labels(ch, "paid" if paid else "unpaid").inc()
+    return out_trade_no, paid, trade_no
+
+
+def _query_many(items: list[tuple[str, str | None]]) -> list[tuple[str, bool | None, str | None]]:
+    """并发查询 [(out_trade_no, channel)]，返回 [(out_trade_no, paid|None(出错), trade_no)]。"""
+    if not items:
+        return []
+    if _pool is None:   # 对账线程未启动（PAY_RECONCILE_ENABLED=0 / 命令行调用）
+        return [_query(*it) for it in items]
+    return list(_pool.map(lambda it: _query(*it), items))
+
+
+# ========= 单订单退避 =========
+def _next_due(no: str, every: float) -> float:
+    """该订单下一次允许查询上游的 monotonic 时间；放弃自动查询的返回 inf。"""
+    st = _checks.get(no)
+    if st is None:
+        return 0.0
+    if st["errors"] >= MAX_ERRORS:
+        return float("inf")
+    if st["errors"]:
+        every = max(every, min(RETRY_BASE * 2 ** (st["errors"] - 1), MAX_BACKOFF))
+    return st["at"] + every
+
+
+def _record(results, mono: float) -> None:
+    for no, ok, _ in results:
+        st = _checks.setdefault(no, {"at": 0.0, "errors": 0})
+        st["at"] = mono
+        if ok is None:
+            st["errors"] += 1
+            if st["errors"] == MAX_ERRORS:
+                logger.error("订单 %s 上游查询连续失败 %d 次，停止自动对账，请人工核对", no, MAX_ERRORS)
+        else:
+            st["errors"] = 0
+
+
+# ========= 关注队列 =========
+def reconcile_watched(nos: list[str]) -> None:
+    """处理关注队列中到期的订单（需在 app context 内）。"""
+    from extensions import db
+    from models.order import Order
+    from services import pay_events
+    from services.order_state import normalize
+    from services.payment_service import PAID, PENDING, mark_orders_paid
+
+    rows = db.session.query(Order.out_trade_no, Order.status, Order.channel) \
+        .filter(Order.out_trade_no.in_(nos)).all()
+    todo = []
+    for no, status, channel in rows:
+        status = normalize(status)
+        if status == PAID:
+            # 可能是别的 worker 收到了回调：补发一次本地事件，唤醒本进程的等待方
+            pay_events.publish(no, PAID, source="db")
+            unwatch(no)
+        elif status == PENDING:
+            # 关注队列同样遵守出错退避，避免上游故障时每 MIN_INTERVAL 秒重查
+            if time.monotonic() >= _next_due(no, 0):
+                todo.append((no, channel))
+        else:
+            unwatch(no)
+    db.session.rollback()
+    results = _query_many(todo)
+    _record(results, time.monotonic())
+    paid = {no: trade_no for no, ok, trade_no in results if ok}
+    mark_orders_paid(paid, source="reconcile")
+    for no in paid:
+        unwatch(no)
+
+
+# ========= 定时扫描 =========
+def _try_leader() -> bool:
+    """多 worker 时只有一个进程做定时扫描：持有 instance/pay-reconcile.lock 的进程。"""
+    global _lock_file
+    if _lock_file is not None:
+        return True
+    try:
+        import fcntl
+    except ImportError:
+        return True
+    f = open(LOCK_PATH, "a+")
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return False
+    _lock_file = f
+    logger.info("pid %s 负责支付定时对账", os.getpid())
+    return True
+
+
+def _collect_due(q, every: float, mono: float, limit: int) -> list[tuple[str, str | None]]:
+    """按 (created_at, id) 升序键集翻页，跳过未到查询时间 / 退避中 / 已放弃的订单，凑满 limit 条或扫完为止。
+
+    不能先 LIMIT 再过滤：最老的一批订单一旦全部在退避或已放弃，会永远占满每一页，更新的订单再也轮不到。
+    """
+    from models.order import Order
+
+    out: list[tuple[str, str | None]] = []
+    last = None
+    while len(out) < limit:
+        page = q
+        if last is not None:
+            page = page.filter(or_(Order.created_at > last[0],
+                                   and_(Order.created_at == last[0], Order.id > last[1])))
+        rows = page.order_by(Order.created_at.asc(), Order.id.asc()).limit(BATCH).all()
+        for oid, no, channel, created_at in rows:
+            if mono >= _next_due(no, every):
+                out.append((no, channel))
+                if len(out) >= limit:
+                    break
+        if len(rows) < BATCH:
+            break
+        last = (rows[-1][3], rows[-1][0])
+    return out
+
+
+def scan_once() -> dict:
+    """按时长分桶扫一轮 pending 订单（需在 app context 内），返回本轮统计。"""
+    from extensions import db
+    from models.order import Order
+    from services.payment_service import PENDING, expire_orders, mark_orders_paid
+
+    t0 = time.perf_counter()
+    now_dt = datetime.utcnow()
+    mono = time.monotonic()
+    base = db.session.query(Order.id, Order.out_trade_no, Order.channel, Order.created_at) \
+        .filter(Order.status == PENDING, Order.out_trade_no.isnot(None))
+
+    oldest = base.with_entities(Order.created_at).order_by(Order.created_at.asc()).limit(1).scalar()
+    RECONCILE_LAG.set((now_dt - oldest).total_seconds() if oldest else 0)
+
+    due: list[tuple[str, str | None]] = []
+    for lo, hi, every in BUCKETS:
+        if len(due) >= BATCH:
+            break
+        due += _collect_due(base.filter(
+            Order.created_at > now_dt - timedelta(seconds=hi),
+            Order.created_at <= now_dt - timedelta(seconds=lo),
+        ), every, mono, BATCH - len(due))
+
+    # 过期订单：正常情况下查一次就被支付或取消；查询出错的按退避重试，放弃的留给人工
+    stale = _collect_due(base.filter(Order.created_at <= now_dt - timedelta(seconds=EXPIRE_AFTER)),
+                         SCAN_INTERVAL, mono, BATCH)
+    db.session.rollback()
+
+    results = _query_many(due + stale)
+    _record(results, mono)
+    paid = {no: trade_no for no, ok, trade_no in results if ok}
+    stale_nos = {no for no, _ in stale}
+    # 最后一次查询也确认未支付（出错的不算）才过期
+    expire = [no for no, ok, _ in results if ok is False and no in stale_nos]
+
+    changed = mark_orders_paid(paid, source="reconcile")
+    expired = expire_orders(expire)
+    for no in list(paid) + expire:
+        _checks.pop(no, None)
+    if len(_checks) > 10 * BATCH:
+        keep = 2 * max(BUCKETS[-1][2], MAX_BACKOFF)
+        for no, st in list(_checks.items()):
+            if mono - st["at"] > keep:
+                _checks.pop(no, None)
+
+    cost = time.perf_counter() - t0
+    RECONCILE_CYCLE.observe(cost)
+    stats = {
+        "queried": len(results), "errors": sum(1 for _, ok, _ in results if ok is None),
+        "paid": len(changed), "expired": expired, "seconds": round(cost, 3),
+    }
+    if results:
+        logger.info("支付对账：%s", stats)
+    return stats
+
+
+def _worker() -> None:
+    from extensions import db
+
+    last_scan = 0.0
+    while True:
+        time.sleep(TICK)
+        with _app.app_context():
+            try:
+                batch = _due()
+                if batch:
+                    reconcile_watched(batch)
+                if time.monotonic() - last_scan >= SCAN_INTERVAL and _try_leader():
+                    last_scan = time.monotonic()
+                    scan_once()
+            except Exception:
+                db.session.rollback()
+                logger.exception("支付对账失败")
+            finally:
+                db.session.remove()
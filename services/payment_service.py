@@ -0,0 +1,124 @@
+# services/payment_service.py
+"""
+支付结果落库（回调 / 对账线程 / 开发环境 mock 支付共用），状态变更统一走 services/order_state。
+
+mark_order(s)_paid 用条件 UPDATE（status IN ('pending','cancelled')）置为已支付：
+微信回调、支付宝回调、后台对账可能同时确认同一笔订单，只有真正改到行的那一方
+执行副作用（order_state 钩子）：
+- 同一事务内：发放权益、写入支付成功短信（发件箱，key = sms:pay:<out_trade_no>）
+- 提交后：发布支付事件（唤醒 SSE / 长轮询）、唤醒发件箱投递线程
+短信由 services/outbox 的后台线程投递，支付链路不等短信网关。
+"""
+from __future__ import annotations
+
+import logging
+from datetime import datetime
+
+from sqlalchemy import bindparam
+
+from extensions import db
+from models.order import Order
+from models.user import User
+from services import order_state, outbox, pay_events
+from services.order_state import CANCELLED, PAID, PENDING
+from services.sms_service import send_payment_success_sms
+
+logger = logging.getLogger(__name__)
+
+SMS_PAYMENT_SUCCESS = "sms.payment_success"
+
+
+@outbox.handler(SMS_PAYMENT_SUCCESS)
+def _send_payment_sms(payload: dict):
+    return send_payment_success_sms(payload.get("phone"), payload["order_no"],
+                                    payload.get("product_name") or "留学服务")
+
+
+def order_status(out_trade_no: str) -> str | None:
+    """只查状态列（轮询/长轮询用，不加载整行和 items）。"""
+    return order_state.normalize(
+        db.session.query(Order.status).filter(Order.out_trade_no == out_trade_no).scalar()
+    )
+
+
+def _trade_nos(order_ids: list[int]) -> list[str]:
+    return [no for (no,) in db.session.query(Order.out_trade_no)
+            .filter(Order.id.in_(order_ids), Order.out_trade_no.isnot(None))]
+
+
+@order_state.on_enter(PAID)
+def _enqueue_paid_sms(order_ids: list[int]) -> None:
+    rows = (
+        db.session.query(Order.out_trade_no, Order.product_name, Order.user_id, User.phone)
+        .outerjoin(User, User.id == Order.user_id)
+        .filter(Order.id.in_(order_ids), Order.out_trade_no.isnot(None))
+        .all()
+    )
+    for no, product_name, user_id, phone in rows:
+        if not phone:
+            logger.warning(f"用户 {user_id} 未绑定手机号，无法发送短信")
+            continue
+        outbox.enqueue(SMS_PAYMENT_SUCCESS, f"sms:pay:{no}",
+                       {"phone": phone, "order_no": no, "product_name": product_name})
+
+
+@order_state.on_enter(PAID, after_commit=True)
+def _publish_paid(order_ids: list[int]) -> None:
+    for no in _trade_nos(order_ids):
+        logger.info(f"✅ 订单 {no} 已支付，更新状态")
+        pay_events.publish(no, PAID)
+    outbox.wake()
+
+
+@order_state.on_enter(CANCELLED, after_commit=True)
+def _publish_cancelled(order_ids: list[int]) -> None:
+    for no in _trade_nos(order_ids):
+        pay_events.publish(no, CANCELLED)
+
+
+def _paid_values() -> dict:
+    # pay_time 沿用 routes/pay.py 的本地时间，paid_at 沿用 orders / billing 的 UTC
+    return {"pay_time": datetime.now(), "paid_at": datetime.utcnow()}
+
+
+def mark_order_paid(out_trade_no: str, *, trade_no: str | None = None, source: str = "") -> bool:
+    """把订单置为已支付；本次调用确实改变了状态时返回 True。"""
+    return bool(mark_orders_paid({out_trade_no: trade_no}, source=source))
+
+
+def mark_order_paid_by_id(order_id: int) -> bool:
+    """按订单 id 置为已支付（/api/orders/<id>/mock-pay）。"""
+    return bool(order_state.transition(PAID, [order_id], values=_paid_values()))
+
+
+def mark_orders_paid(paid: dict[str, str | None], *, source: str = "") -> list[int]:
+    """批量置为已支付：paid = {out_trade_no: 上游流水号}；返回本次真正改变状态的订单 id。"""
+    if not paid:
+        return []
+
+    def fill_trade_no(_ids):
+        rows = [{"b_no": no, "b_tn": tn} for no, tn in paid.items() if tn]
+        if rows:
+            table = Order.__table__
+            db.session.execute(
+                table.update()
+                .where(table.c.out_trade_no == bindparam("b_no"), table.c.trade_no.is_(None))
+                .values(trade_no=bindparam("b_tn")),
+                rows,
+            )
+
+    ids = order_state.transition(PAID, paid.keys(), key=Order.out_trade_no,
+                                 values=_paid_values(), before_commit=fill_trade_no)
+    if ids:
+        logger.info("[%s] %d 笔订单置为已支付", source or "pay", len(ids))
+    return ids
+
+
+def expire_orders(nos: list[str]) -> int:
+    """把仍为 pending 的订单批量置为 cancelled（超时未支付），并发布事件结束等待方。"""
+    if not nos:
+        return 0
+    changed = order_state.transition(CANCELLED, nos, key=Order.out_trade_no)
+    if changed:
+        logger.info("⌛ %d 笔订单超时未支付，已取消", len(changed))
+    return len(changed)
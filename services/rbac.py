@@ -0,0 +1,218 @@
+# services/rbac.py
+"""
+统一的角色 / 权限校验（替代 routes/auth、admin_manage、cases_admin 里各自的装饰器）。
+
+- 角色来自 JWT claims（"roles" 列表，兼容旧 token 的 "role" 字符串），每个请求只解析一次，
+  结果挂在 flask.g 上；角色名统一小写，superadmin 隐含 admin、staff（与登录签发时一致）
+- 角色 -> 权限映射：一条 roles ⟕ role_permissions ⟕ permissions 查询编译成
+  {role: frozenset(permission code)}，带版本号常驻内存；权限判断是集合查找，不再每请求 JOIN
+- 失效：roles / permissions / role_permissions 通过 ORM flush 发生变化并提交后版本号 +1，
+  下次校验时重新编译；配置 RBAC_REDIS_URL（默认沿用 PAY_EVENTS_REDIS_URL）时通过 Redis 广播给其他 worker，
+  未配置时其他 worker 最多 RBAC_MAP_TTL 秒后重新加载
+- 绕过 ORM 的写入（原生 SQL、migration 脚本）需调用 invalidate()
+
+用法：
+    @role_required("admin", "staff")          # 任一角色即可
+    @permission_required("orders.refund")     # 任一权限即可
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from functools import wraps
+
+from flask import g, jsonify
+from flask_jwt_extended import get_jwt, verify_jwt_in_request
+from sqlalchemy import event, select
+
+from extensions import RoutingSession, db
+from models.rbac import Permission, Role, role_permissions
+
+logger = logging.getLogger(__name__)
+
+TTL = float(os.getenv("RBAC_MAP_TTL", "60"))
+REDIS_URL = os.getenv("RBAC_REDIS_URL", os.getenv("PAY_EVENTS_REDIS_URL", ""))
+CHANNEL = "rbac:invalidate"
+
+# 高权限角色隐含的角色（routes/auth._normalize_roles 签发 token 时同样展开）
+IMPLIED_ROLES = {"superadmin": ("admin", "staff")}
+
+_lock = threading.Lock()
+_version = 0          # 每次失效 +1
+_built = None         # (version, loaded_at, {role: frozenset(codes)})
+_redis = None
+_sub_thread: threading.Thread | None = None
+
+
+# ========= 角色 -> 权限映射 =========
+def _compile() -> dict[str, frozenset[str]]:
+    rows = db.session.execute(
+        select(Role.name, Permission.code)
+        .select_from(Role)
+        .outerjoin(role_permissions, role_permissions.c.role_id == Role.id)
+        .outerjoin(Permission, Permission.id == role_permissions.c.permission_id)
+    ).all()
+    perms: dict[str, set[str]] = {}
+    for name, code in rows:
+        bucket = perms.setdefault(name.lower(), set())
+        if code:
+            bucket.add(code)
+    return {name: frozenset(codes) for name, codes in perms.items()}
+
+
+def snapshot() -> tuple[int, dict[str, frozenset[str]]]:
+    """返回 (版本号, {role: 权限集合})，过期或失效时重新编译（需在 app context 内）。"""
+    global _built
+    built = _built
+    if built is not None and built[0] == _version and time.monotonic() - built[1] < TTL:
+        return built[0], built[2]
+    with _lock:
+        built = _built
+        if built is not None and built[0] == _version and time.monotonic() - built[1] < TTL:
+            return built[0], built[2]
+        version = _version
+        mapping = _compile()
+        _built = (version, time.monotonic(), mapping)
+        logger.debug("rbac map v%s: %d roles", version, len(mapping))
+        return version, mapping
+
+
+def permissions_for(roles) -> frozenset[str]:
+    _, mapping = snapshot()
+    out: set[str] = set()
+    for r in roles:
+        out |= mapping.get(r, frozenset())
+    return frozenset(out)
+
+
+def invalidate(broadcast: bool = True) -> None:
+    """角色 / 权限变更后调用：本进程版本号 +1，配置了 Redis 时广播给其他 worker。"""
+    _bump()
+    if broadcast and _redis is not None:
+        try:
+            _redis.publish(CHANNEL, "1")
+        except Exception as e:
+            logger.warning("rbac redis publish failed: %s", e)
+
+
+def _bump() -> None:
+    global _version
+    with _lock:
+        _version += 1
+
+
+# ========= 当前请求的角色 / 权限 =========
+def normalize_roles(raw) -> frozenset[str]:
+    if isinstance(raw, str):
+        raw = [raw]
+    roles = {str(r).lower() for r in raw or [] if r}
+    for r in list(roles):
+        roles.update(IMPLIED_ROLES.get(r, ()))
+    return frozenset(roles)
+
+
+def current_roles() -> frozenset[str]:
+    """当前请求 JWT 中的角色（需已通过 verify_jwt_in_request），每请求解析一次。"""
+    roles = g.get("_rbac_roles")
+    if roles is None:
+        claims = get_jwt() or {}
+        roles = g._rbac_roles = normalize_roles(claims.get("roles") or claims.get("role"))
+    return roles
+
+
+def current_permissions() -> frozenset[str]:
+    perms = g.get("_rbac_perms")
+    if perms is None:
+        perms = g._rbac_perms = permissions_for(current_roles())
+    return perms
+
+
+def has_role(*need: str) -> bool:
+    roles = current_roles()
+    return any(r.lower() in roles for r in need)
+
+
+def has_permission(*need: str) -> bool:
+    perms = current_permissions()
+    return any(p in perms for p in need)
+
+
+def _forbidden():
+    # 兼容三套旧装饰器的响应字段（msg / code / message）
+    return jsonify({"code": "FORBIDDEN", "msg": "权限不足", "message": "权限不足"}), 403
+
+
+def _guard(check):
+    def deco(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            verify_jwt_in_request()
+            if not check():
+                return _forbidden()
+            return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+
+def role_required(*roles: str):
+    """装饰器：需要登录且拥有任一角色。使用：@role_required("admin", "staff")"""
+    return _guard(lambda: has_role(*roles))
+
+
+def permission_required(*codes: str):
+    """装饰器：需要登录且角色映射出的权限包含任一 code。使用：@permission_required("orders.refund")"""
+    return _guard(lambda: has_permission(*codes))
+
+
+# ========= 自动失效 =========
+@event.listens_for(RoutingSession, "after_flush")
+def _collect_changes(session, flush_context):
+    if session.info.get("rbac_dirty"):
+        return
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, (Role, Permission)):
+            session.info["rbac_dirty"] = True
+            return
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _invalidate_after_commit(session):
+    if session.info.pop("rbac_dirty", False):
+        invalidate()
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _drop_changes(session):
+    session.info.pop("rbac_dirty", None)
+
+
+# ========= 跨进程广播 =========
+def _subscriber() -> None:
+    while True:
+        try:
+            pubsub = _redis.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(CHANNEL)
+            for _ in pubsub.listen():
+                _bump()
+        except Exception as e:
+            logger.warning("rbac redis subscriber error, retry in 3s: %s", e)
+            time.sleep(3)
+
+
+def init_rbac(subscribe: bool = True) -> None:
+    """create_app 中调用：配置了 Redis 时连接发布端；subscribe=True 时再启动失效订阅线程（每进程一次）。"""
+    global _redis, _sub_thread
+    if not REDIS_URL or _sub_thread is not None:
+        return
+    if _redis is None:
+        try:
+            import redis
+        except ImportError:
+            logger.warning("RBAC_REDIS_URL 已设置但未安装 redis，角色权限变更仅在本进程内立即生效")
+            return
+        _redis = redis.Redis.from_url(REDIS_URL)
+    if subscribe:
+        _sub_thread = threading.Thread(target=_subscriber, name="rbac", daemon=True)
+        _sub_thread.start()
\ No newline at end of file
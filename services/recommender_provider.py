@@ -2,35 +2,127 @@
 """
 统一的推荐模型入口。
 
-当前使用 PseudoRecommender（规则 + 伪随机），
-未来如果切换为深度学习 / 神经网络，只需要在本文件中
-替换 get_recommender() / score_candidate() 的实现，
-业务层（assessment_service 等）代码无需修改。
+当前内置两种后端（RECOMMENDER_BACKEND）：
+- pseudo ：PseudoRecommender（规则 + 确定性轻噪声），默认
+- joblib ：JoblibRecommender，加载 RECOMMENDER_MODEL_PATH 指向的 sklearn/joblib 模型文件
+
+新增后端只需 register_backend(name, factory)，业务层（assessment_service 等）代码无需修改。
+模型在 create_app() 时通过 warm_recommender() 预加载，并记录加载耗时与内存占用；
+加载过程有锁保护，多线程下只会构造一次。
+
+批量打分请使用 score_candidates()：后端若实现 score_many() 则整批向量化推理，
+并受 RECOMMENDER_LATENCY_BUDGET_MS 约束，超时部分用规则模型兜底。
 """
 from __future__ import annotations
 
-from typing import Tuple, Dict, Any
+from typing import Tuple, Dict, Any, Callable, List, Protocol, Sequence
+import logging
 import os
+import threading
+import time
 
 from models.recommender.pseudo import PseudoRecommender, Candidate, InputPref
 
-# 全局单例，避免每次请求都重新构造模型对象（后续可换成加载大模型等）
-_model: PseudoRecommender | None = None
+logger = logging.getLogger(__name__)
 
 
-def get_recommender() -> PseudoRecommender:
-    """根据环境变量选择具体模型，目前仅支持 'pseudo'。"""
-    global _model
-    if _model is not None:
-        return _model
+class Recommender(Protocol):
+    """模型后端需要实现的最小接口。"""
+    name: str
+
+    def score(self, cand: Candidate, pref: InputPref) -> Tuple[float, Dict[str, Any]]: ...
+
+
+def _load_joblib() -> Recommender:
+    from models.recommender.joblib_model import JoblibRecommender
+
+    path = os.getenv("RECOMMENDER_MODEL_PATH", "")
+    if not path or not os.path.exists(path):
+        raise FileNotFoundError(f"RECOMMENDER_MODEL_PATH 不存在: {path!r}")
+    return JoblibRecommender(path)
+
 
+# 后端注册表：name -> 无参工厂
+_BACKENDS: Dict[str, Callable[[], Recommender]] = {
+    "pseudo": PseudoRecommender,
+    "joblib": _load_joblib,
+}
+
+# 批量推理的耗时预算（毫秒），<=0 表示不限制
+LATENCY_BUDGET_MS = float(os.getenv("RECOMMENDER_LATENCY_BUDGET_MS", "50"))
+
+# 全局单例，避免每次请求都重新构造/加载模型
+_model: Recommender | None = None
+_lock = threading.Lock()
+
+
+def register_backend(name: str, factory: Callable[[], Recommender]) -> None:
+    """注册一个模型后端；已加载的单例不受影响（需 reset_recommender 后生效）。"""
+    _BACKENDS[name.lower()] = factory
+
+
+def _rss_bytes() -> int | None:
+    """当前进程常驻内存（字节），取不到时返回 None。"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except Exception:
+        pass
+    try:
+        import resource
+        # Linux 上 ru_maxrss 单位为 KB（峰值，仅作参考）
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except Exception:
+        return None
+
+
+def _build() -> Recommender:
     backend = os.getenv("RECOMMENDER_BACKEND", "pseudo").lower()
-    if backend == "pseudo":
-        _model = PseudoRecommender()
-    else:
+    factory = _BACKENDS.get(backend)
+    if factory is None:
         # 兜底：未知配置时仍然使用伪模型，避免线上报错
-        _model = PseudoRecommender()
-    return _model
+        logger.warning("未知 RECOMMENDER_BACKEND=%s，回退到 pseudo", backend)
+        backend, factory = "pseudo", PseudoRecommender
+
+    rss0 = _rss_bytes()
+    t0 = time.perf_counter()
+    try:
+        model = factory()
+    except Exception:
+        if backend == "pseudo":
+            raise
+        logger.exception("推荐模型 %s 加载失败，回退到 pseudo", backend)
+        backend, model = "pseudo", PseudoRecommender()
+    cost_ms = (time.perf_counter() - t0) * 1000
+    rss1 = _rss_bytes()
+
+    mem = f"{(rss1 - rss0) / 1048576:+.1f}MB (rss {rss1 / 1048576:.1f}MB)" if rss0 and rss1 else "n/a"
+    logger.info("推荐模型已加载: backend=%s cost=%.1fms mem=%s", backend, cost_ms, mem)
+    return model
+
+
+def get_recommender() -> Recommender:
+    """根据环境变量选择具体模型；首次调用时加载（双重检查锁）。"""
+    global _model
+    model = _model
+    if model is not None:
+        return model
+    with _lock:
+        if _model is None:
+            _model = _build()
+        return _model
+
+
+def warm_recommender() -> Recommender:
+    """启动时预加载模型，避免首个请求承担加载耗时。"""
+    return get_recommender()
+
+
+def reset_recommender() -> None:
+    """丢弃当前单例（切换后端/热更新模型文件后调用）。"""
+    global _model
+    with _lock:
+        _model = None
 
 
 def score_candidate(cand: Candidate, pref: InputPref) -> Tuple[float, Dict[str, Any]]:
@@ -45,3 +137,34 @@ def score_candidate(cand: Candidate, pref: InputPref) -> Tuple[float, Dict[str,
     """
     model = get_recommender()
     return model.score(cand, pref)
+
+
+_fallback = PseudoRecommender()
+
+
+def score_candidates(
+    cands: Sequence[Candidate],
+    pref: InputPref,
+    budget_ms: float | None = None,
+) -> List[Tuple[float, Dict[str, Any]]]:
+    """批量打分，返回与 cands 等长的 [(score, explain), ...]。
+
+    - 后端实现了 score_many(cands, pref, deadline) 时走向量化路径；
+    - 超出耗时预算未打分的候选，用 PseudoRecommender 兜底（仍然确定性）。
+    """
+    if not cands:
+        return []
+    model = get_recommender()
+    many = getattr(model, "score_many", None)
+    if many is None:
+        return [model.score(c, pref) for c in cands]
+
+    budget = LATENCY_BUDGET_MS if budget_ms is None else budget_ms
+    deadline = time.perf_counter() + budget / 1000.0 if budget and budget > 0 else None
+    out = many(cands, pref, deadline=deadline)
+    missed = [i for i, r in enumerate(out) if r is None]
+    if missed:
+        logger.warning("推荐模型超出耗时预算 %.0fms，%d/%d 个候选使用规则兜底", budget, len(missed), len(cands))
+        for i in missed:
+            out[i] = _fallback.score(cands[i], pref)
+    return out
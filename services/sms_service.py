@@ -24,7 +24,7 @@ def send_payment_success_sms(phone_number, order_no, product_name="留学服务"
 
     if not app_key or not app_secret:
         logger.error("❌ [短信] 配置缺失: 请检查 SMS_APP_KEY 和 SMS_APP_SECRET")
-        return
+        return False
 
     # 2. 构造短信内容
     # 示例：【GoAbroady】您购买的“留学咨询”已支付成功，订单号123456，请登录查看。
@@ -0,0 +1,213 @@
+# services/unsplash_service.py
+"""
+Unsplash 官方 API 的统一上游访问层（routes/image_cache.py 使用）。
+
+1) 查询结果缓存：search/photos 一次返回 30 张，按 (query, orientation) 缓存整个结果列表
+   - 进程内 LRU（UNSPLASH_MEM_CACHE_MAX 个 query）+ 磁盘 JSON（instance/unsplash-cache/），TTL 由 UNSPLASH_CACHE_TTL 控制
+   - 同一 query 的所有 slug/kind 共用一次 search 调用，只在本地按 seed 取第 N 张
+2) 速率控制：令牌桶，状态存在磁盘文件 + 文件锁，同一台机器上所有 gunicorn worker 共享
+   - 容量/补充速率 = UNSPLASH_RATE_PER_HOUR（Demo key 为 50/h）
+   - 拿不到令牌时不阻塞，直接返回 None，由调用方回退到 source/picsum
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+
+from config import INSTANCE_DIR
+
+logger = logging.getLogger(__name__)
+
+API_BASE = "https://api.unsplash.com"
+CACHE_DIR = os.getenv("UNSPLASH_CACHE_DIR") or os.path.join(INSTANCE_DIR, "unsplash-cache")
+CACHE_TTL = int(os.getenv("UNSPLASH_CACHE_TTL", str(7 * 24 * 3600)))   # 秒
+RATE_PER_HOUR = float(os.getenv("UNSPLASH_RATE_PER_HOUR", "50"))
+CONNECT_TIMEOUT = int(os.getenv("IMAGE_DL_CONNECT_TIMEOUT", "8"))
+READ_TIMEOUT = int(os.getenv("IMAGE_DL_TIMEOUT", "20"))
+MEM_CACHE_MAX = int(os.getenv("UNSPLASH_MEM_CACHE_MAX", "512"))
+
+_mem: "OrderedDict[str, tuple[float, list[dict]]]" = OrderedDict()
+_mem_lock = threading.Lock()
+
+
+# ========= 令牌桶（跨进程） =========
+class TokenBucket:
+    """
+    基于文件的令牌桶：{"tokens": float, "ts": float}。
+    有 fcntl 时用 flock 做跨进程互斥；没有（Windows 开发环境）时退化为进程内锁。
+    """
+
+    def __init__(self, path: str, rate_per_hour: float, capacity: float | None = None):
+        self.path = path
+        self.rate = max(rate_per_hour, 0.0) / 3600.0   # 每秒补充
+        self.capacity = capacity if capacity is not None else max(rate_per_hour, 1.0)
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def try_acquire(self, n: float = 1.0) -> bool:
+        with self._lock:
+            with open(self.path, "a+") as f:
+                _flock(f, True)
+                try:
+                    f.seek(0)
+                    try:
+                        state = json.loads(f.read() or "{}")
+                    except ValueError:
+                        state = {}
+                    now = time.time()
+                    tokens = float(state.get("tokens", self.capacity))
+                    ts = float(state.get("ts", now))
+                    tokens = min(self.capacity, tokens + (now - ts) * self.rate)
+                    ok = tokens >= n
+                    if ok:
+                        tokens -= n
+                    f.seek(0)
+                    f.truncate()
+                    f.write(json.dumps({"tokens": tokens, "ts": now}))
+                    f.flush()
+                    return ok
+                finally:
+                    _flock(f, False)
+
+
+def _flock(f, lock: bool) -> None:
+    try:
+        import fcntl
+    except ImportError:
+        return
+    fcntl.flock(f.fileno(), fcntl.LOCK_EX if lock else fcntl.LOCK_UN)
+
+
+_bucket = TokenBucket(os.path.join(CACHE_DIR, "ratelimit.json"), RATE_PER_HOUR)
+
+
+# ========= 查询结果缓存 =========
+def _key(query: str, orientation: str) -> str:
+    return hashlib.md5(f"{query.strip().lower()}|{orientation}".encode("utf-8")).hexdigest()
+
+
+def _disk_path(key: str) -> str:
+    return os.path.join(CACHE_DIR, f"search-{key}.json")
+
+
+def _mem_put(key: str, ts: float, results: list[dict]) -> None:
+    with _mem_lock:
+        _mem[key] = (ts, results)
+        _mem.move_to_end(key)
+        while len(_mem) > MEM_CACHE_MAX:
+            _mem.popitem(last=False)
+
+
+def _cache_get(key: str) -> list[dict] | None:
+    now = time.time()
+    with _mem_lock:
+        hit = _mem.get(key)
+        if hit:
+            _mem.move_to_end(key)
+    if hit and now - hit[0] < CACHE_TTL:
+        return hit[1]
+    try:
+        with open(_disk_path(key), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        ts, results = float(data["ts"]), data["results"]
+        if now - ts < CACHE_TTL:
+            _mem_put(key, ts, results)
+            return results
+    except (OSError, ValueError, KeyError):
+        pass
+    return None
+
+
+def _cache_put(key: str, results: list[dict]) -> None:
+    ts = time.time()
+    _mem_put(key, ts, results)
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        path = _disk_path(key)
+        tmp = f"{path}.{os.getpid()}.part"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"ts": ts, "results": results}, f)
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning("unsplash cache write failed: %s", e)
+
+
+def _api_get(path: str, params: dict) -> dict | list | None:
+    key = os.getenv("UNSPLASH_ACCESS_KEY")
+    if not key:
+        return None
+    if not _bucket.try_acquire():
+        logger.info("unsplash rate limited locally, skip %s", path)
+        return None
+    try:
+        r = requests.get(
+            f"{API_BASE}{path}",
+            params=params,
+            headers={"Accept-Version": "v1", "Authorization": f"Client-ID {key}"},
+            timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+        )
+        if r.status_code != 200:
+            logger.warning("unsplash %s non-200: %s %s", path, r.status_code, r.text[:180])
+            return None
+        return r.json()
+    except Exception as e:
+        logger.warning("unsplash %s error: %s", path, e)
+        return None
+
+
+def _slim(photo: dict) -> dict:
+    urls = photo.get("urls") or {}
+    return {"regular": urls.get("regular"), "full": urls.get("full")}
+
+
+def search_photos(query: str, orientation: str = "landscape") -> list[dict]:
+    """search/photos 结果列表（每项 {regular, full}），命中缓存时不访问上游。"""
+    key = _key(query, orientation)
+    cached = _cache_get(key)
+    if cached is not None:
+        return cached
+    data = _api_get("/search/photos", {
+        "query": query, "orientation": orientation, "per_page": 30, "content_filter": "high",
+    })
+    if data is None:
+        return []
+    results = [_slim(p) for p in ((data or {}).get("results") or []) if isinstance(p, dict)]
+    # 空结果也缓存，避免同一冷门 query 反复打上游
+    _cache_put(key, results)
+    return results
+
+
+def _pick(photo: dict | None) -> str | None:
+    if not photo:
+        return None
+    return photo.get("regular") or photo.get("full")
+
+
+def search_deterministic(query: str, seed: int, orientation: str = "landscape") -> str | None:
+    """search + seed 选第 N 张，保证同一 seed 稳定。"""
+    results = search_photos(query, orientation)
+    if not results:
+        return None
+    return _pick(results[seed % len(results)])
+
+
+def random_photo(query: str, orientation: str = "landscape") -> str | None:
+    """
+    随机图：若该 query 的 search 结果已缓存，直接从中随机取一张（不消耗配额）；
+    否则调用 photos/random。
+    """
+    cached = _cache_get(_key(query, orientation))
+    if cached:
+        return _pick(random.choice(cached))
+    data = _api_get("/photos/random", {"query": query, "orientation": orientation, "content_filter": "high"})
+    if isinstance(data, list) and data:
+        data = data[0]
+    return _pick(_slim(data)) if isinstance(data, dict) else None
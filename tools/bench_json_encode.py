@@ -0,0 +1,118 @@
+# tools/bench_json_encode.py
+# -*- coding: utf-8 -*-
+"""
+JSON 编码基准：Flask 默认 provider（标准库 json） vs json_provider.FastJSONProvider（orjson）。
+
+载荷来自真实模型：
+- 项目详情：Program.to_dict()（十几个 markdown 字段 + requirements）
+- 产品详情：Product.to_public_dict()（detail_html + Decimal 价格）
+库里有数据时取前 --limit 条；没有数据时用模型对象构造等量的合成数据（不落库）。
+
+用法：
+  python tools/bench_json_encode.py
+  python tools/bench_json_encode.py --limit 50 --loops 2000
+"""
+import argparse, os, sys, time
+from datetime import datetime
+from decimal import Decimal
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("FEED_WORKER_ENABLED", "0")
+
+
+def _synthetic_programs(n):
+    from models.program import Program, ProgramRequirement
+
+    md = ("## 项目亮点\n\n" + "- 世界排名前列的院系，课程覆盖机器学习、分布式系统与数据工程。\n" * 30)
+    out = []
+    for i in range(n):
+        p = Program(
+            id=i + 1, slug=f"bench-{i}", title=f"MSc Computer Science {i}", country="UK", city="London",
+            university="Bench University", degree_level="Master", discipline="Computer Science",
+            summary="一年制授课型硕士。" * 5, overview_md=md, intro_md=md, advantages_md=md,
+            highlights_md=md, key_dates_md=md, timeline_md=md, costs_md=md, scholarships_md=md,
+            savings_md=md, destination_md=md, faq_md=md, gallery_images=[f"/static/g{k}.jpg" for k in range(6)],
+            status="published", created_at=datetime.utcnow(), updated_at=datetime.utcnow(),
+        )
+        p.requirements = [ProgramRequirement(req_type="GPA", min_value="3.3/4.0"),
+                          ProgramRequirement(req_type="IELTS", min_value="6.5")]
+        out.append(p)
+    return out
+
+
+def _synthetic_products(n):
+    from models.product import Product
+
+    html = "<p>" + "一对一文书辅导，含头脑风暴、初稿、三轮精修与终稿润色。" * 40 + "</p>"
+    return [
+        Product(id=i + 1, slug=f"bench-prod-{i}", title=f"文书精修 {i}", category="文书", delivery="online",
+                price=Decimal("9800.00"), original_price=Decimal("12800.00"), detail_html=html,
+                is_published=True, created_at=datetime.utcnow(), updated_at=datetime.utcnow())
+        for i in range(n)
+    ]
+
+
+def load_payloads(limit):
+    from sqlalchemy.orm import selectinload
+    from models.program import Program
+    from models.product import Product
+
+    try:
+        programs = Program.query.options(selectinload(Program.requirements)).limit(limit).all()
+        products = Product.query.limit(limit).all()
+    except Exception:
+        programs, products = [], []
+    src = "db"
+    if not programs:
+        programs, src = _synthetic_programs(limit), "synthetic"
+    if not products:
+        products = _synthetic_products(limit)
+    return {
+        "program_detail": [p.to_dict() for p in programs],
+        "product_detail": [p.to_public_dict() for p in products],
+    }, src
+
+
+def bench(fn, payloads, loops):
+    t0 = time.perf_counter()
+    size = 0
+    for _ in range(loops):
+        for obj in payloads:
+            size = len(fn(obj))
+    return (time.perf_counter() - t0) / (loops * len(payloads)) * 1e6, size
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark stdlib vs orjson JSON provider on real payloads")
+    ap.add_argument("--limit", type=int, default=20, help="每类载荷条数")
+    ap.add_argument("--loops", type=int, default=500, help="每类载荷重复次数")
+    ap.add_argument("--app-factory-path", default="app", help="Flask 工厂模块名（如 app）")
+    ap.add_argument("--app-factory-func", default="create_app", help="Flask 工厂函数名（如 create_app）")
+    args = ap.parse_args()
+
+    from flask.json.provider import DefaultJSONProvider
+    import json_provider
+
+    mod = __import__(args.app_factory_path, fromlist=[args.app_factory_func])
+    app = getattr(mod, args.app_factory_func)()
+
+    with app.app_context():
+        groups, src = load_payloads(args.limit)
+        std = DefaultJSONProvider(app)
+        std.ensure_ascii = False
+        fast = json_provider.FastJSONProvider(app)
+
+        print(f"载荷来源：{src}；orjson {'可用' if json_provider.orjson else '不可用（走标准库回退）'}")
+        for name, payloads in groups.items():
+            t_std, size = bench(lambda o: std.dumps(o).encode("utf-8"), payloads, args.loops)
+            t_fast, _ = bench(fast.dumps_bytes, payloads, args.loops)
+            with app.test_request_context():
+                t_resp_std, _ = bench(lambda o: std.response(o).get_data(), payloads, args.loops)
+                t_resp_fast, _ = bench(lambda o: fast.response(o).get_data(), payloads, args.loops)
+            print(f"[{name}] {size / 1024:.1f}KB/条")
+            print(f"  dumps     stdlib {t_std:8.1f} µs   fast {t_fast:8.1f} µs   x{t_std / t_fast:.1f}")
+            print(f"  response  stdlib {t_resp_std:8.1f} µs   fast {t_resp_fast:8.1f} µs   x{t_resp_std / t_resp_fast:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# tools/bench_metrics_overhead.py
+# -*- coding: utf-8 -*-
+"""
+请求指标中间件（metrics.py）的开销基准。
+
+同一进程内分别创建 METRICS_ENABLED=1 / 0 的两个 app，用 test_client 串行打同一组接口，
+对比每请求平均耗时，差值即中间件开销（before/after/teardown 钩子 + 直方图/计数器写入）。
+
+用法：
+  python tools/bench_metrics_overhead.py --requests 5000
+  PROMETHEUS_MULTIPROC_DIR=/tmp/prom python tools/bench_metrics_overhead.py   # 多进程模式（写 mmap 文件）
+"""
+import argparse, os, sys, tempfile, time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+tmp = tempfile.mkdtemp(prefix="metrics-bench-")
+os.environ.setdefault("SQLALCHEMY_DATABASE_URI", f"sqlite:///{tmp}/bench.sqlite3")
+os.environ["FEED_WORKER_ENABLED"] = "0"
+
+URLS = ["/", "/api/programs/stats/country", "/api/does-not-exist"]
+
+
+def build(enabled: bool):
+    from config import Config
+    from app import create_app
+    from extensions import db
+
+    Config.METRICS_ENABLED = enabled
+    app = create_app()
+    with app.app_context():
+        import models.program  # noqa: F401
+        db.create_all(bind_key=None)
+    return app
+
+
+def run(app, n: int) -> float:
+    c = app.test_client()
+    for u in URLS:                      # 预热
+        c.get(u)
+    t0 = time.perf_counter()
+    for i in range(n):
+        c.get(URLS[i % len(URLS)])
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark the request metrics middleware overhead")
+    ap.add_argument("--requests", type=int, default=3000, help="每种模式的请求数")
+    ap.add_argument("--rounds", type=int, default=3, help="轮数，取最小值")
+    args = ap.parse_args()
+
+    on, off = build(True), build(False)
+    best_on = min(run(on, args.requests) for _ in range(args.rounds))
+    best_off = min(run(off, args.requests) for _ in range(args.rounds))
+    print(f"metrics off : {best_off:8.1f} µs/req")
+    print(f"metrics on  : {best_on:8.1f} µs/req")
+    print(f"overhead    : {best_on - best_off:8.1f} µs/req ({(best_on / best_off - 1) * 100:.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# tools/bench_pay_query.py
+# -*- coding: utf-8 -*-
+"""
+/api/pay/query 轮询吞吐基准：每次请求新建微信支付客户端（旧实现） vs services/pay_clients 缓存客户端。
+
+为了可离线运行：
+- 在临时目录生成商户私钥 + 自签名"平台证书"，WeChatPay 初始化时从 cert 目录加载，不联网
+- WeChatPay.query 替换为立即返回 NOTPAY，只测本地开销（客户端构建 + 路由 + DB 查询），不含上游网络耗时
+
+用法：
+  python tools/bench_pay_query.py --requests 500
+"""
+import argparse, os, sys, tempfile, time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+tmp = tempfile.mkdtemp(prefix="pay-bench-")
+os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp}/bench.sqlite3"
+os.environ["FEED_WORKER_ENABLED"] = "0"
+
+
+def _make_keys(cert_dir: str) -> str:
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from cryptography.x509.oid import NameOID
+
+    os.makedirs(cert_dir, exist_ok=True)
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    key_path = os.path.join(cert_dir, "apiclient_key.pem")
+    with open(key_path, "wb") as f:
+        f.write(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                  serialization.NoEncryption()))
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "bench-platform")])
+    now = datetime.utcnow()
+    cert = (x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - timedelta(days=1)).not_valid_after(now + timedelta(days=30))
+            .sign(key, hashes.SHA256()))
+    with open(os.path.join(cert_dir, "platform_cert.pem"), "wb") as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    return key_path
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark /api/pay/query with per-request vs cached SDK clients")
+    ap.add_argument("--requests", type=int, default=300, help="每种模式的请求数")
+    args = ap.parse_args()
+
+    cert_dir = os.path.join(tmp, "cert")
+    os.environ.update({
+        "WX_PRIVATE_KEY_PATH": _make_keys(cert_dir), "WX_CERT_DIR": cert_dir,
+        "WX_MCHID": "1900000001", "WX_CERT_SERIAL_NO": "BENCH", "WX_APPID": "wxbench",
+        "WX_APIV3_KEY": "0" * 32,
+    })
+
+    from wechatpayv3 import WeChatPay
+    WeChatPay.query = lambda self, **kw: (200, {"trade_state": "NOTPAY"})
+
+    from app import create_app
+    from extensions import db
+    import routes.pay as pay
+    from services import pay_clients
+
+    app = create_app()
+    with app.app_context():
+        import models.user  # noqa: F401
+        from models.user import User
+        from models.order import Order
+        db.create_all(bind_key=None)
+        u = User(username="pay-bench", phone="13900000000")
+        u.set_password("pw")
+        db.session.add(u)
+        db.session.flush()
+        db.session.add(Order(user_id=u.id, out_trade_no="ORDBENCH", amount=1.0, status="PENDING"))
+        db.session.commit()
+
+    c = app.test_client()
+
+    def run(label):
+        c.get("/api/pay/query?order_no=ORDBENCH")  # 预热
+        t0 = time.perf_counter()
+        for _ in range(args.requests):
+            r = c.get("/api/pay/query?order_no=ORDBENCH")
+            assert r.status_code == 200, r.status_code
+        cost = time.perf_counter() - t0
+        print(f"[{label:9}] {args.requests / cost:8.1f} req/s   {cost / args.requests * 1000:7.2f} ms/req")
+
+    # 旧实现：每次请求都构建客户端
+    pay.get_wxpay_client = pay_clients.build_wxpay_client
+    run("per-call")
+
+    pay.get_wxpay_client = pay_clients.get_wxpay_client
+    pay_clients.wxpay_client.reset()
+    run("cached")
+    print(f"缓存模式下客户端构建次数：{pay_clients.wxpay_client.builds}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# tools/bench_sqlite_concurrency.py
+# -*- coding: utf-8 -*-
+"""
+SQLite 多进程并发基准：模拟多个 gunicorn worker 同时读写（订单写入 + 列表读取）。
+
+对比两种模式：
+- default：旧配置（SQLAlchemy pysqlite 默认连接参数）：rollback journal、synchronous=FULL，
+           pysqlite 默认 timeout=5 秒的 busy 等待
+- tuned  ：db_engine.apply_sqlite_pragmas（WAL / synchronous=NORMAL / mmap / busy_timeout）
+
+用法：
+  python tools/bench_sqlite_concurrency.py --workers 8 --seconds 5 --write-ratio 0.2
+输出每种模式的总吞吐、读/写次数和 "database is locked" 错误数。
+"""
+import argparse, os, random, sqlite3, sys, tempfile, time
+from multiprocessing import Pool
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def _connect(path: str, tuned: bool, busy_ms: int) -> sqlite3.Connection:
+    # 两种模式都用 isolation_level=None + 显式 BEGIN IMMEDIATE，只有连接参数 / PRAGMA 不同
+    if not tuned:
+        return sqlite3.connect(path, isolation_level=None)   # 不传 timeout：沿用 pysqlite 默认 5 秒
+    from db_engine import apply_sqlite_pragmas
+    conn = sqlite3.connect(path, timeout=busy_ms / 1000.0, isolation_level=None)
+    apply_sqlite_pragmas(conn, busy_timeout_ms=busy_ms, synchronous="NORMAL", mmap_size=256 * 1024 * 1024)
+    return conn
+
+
+def _setup(path: str, rows: int) -> None:
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE orders (id INTEGER PRIMARY KEY, user_id INTEGER, status TEXT, amount REAL, created_at REAL)")
+    conn.execute("CREATE INDEX ix_orders_user ON orders(user_id)")
+    conn.executemany(
+        "INSERT INTO orders (user_id, status, amount, created_at) VALUES (?, 'paid', ?, ?)",
+        [(random.randint(1, 1000), random.random() * 1000, time.time()) for _ in range(rows)],
+    )
+    conn.commit()
+    conn.close()
+
+
+def _worker(args):
+    path, tuned, seconds, write_ratio, busy_ms, seed = args
+    rnd = random.Random(seed)
+    conn = _connect(path, tuned, busy_ms)
+    reads = writes = locked = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        try:
+            if rnd.random() < write_ratio:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute(
+                    "INSERT INTO orders (user_id, status, amount, created_at) VALUES (?, 'pending', ?, ?)",
+                    (rnd.randint(1, 1000), rnd.random() * 1000, time.time()),
+                )
+                conn.execute("COMMIT")
+                writes += 1
+            else:
+                conn.execute(
+                    "SELECT id, status, amount FROM orders WHERE user_id = ? ORDER BY id DESC LIMIT 20",
+                    (rnd.randint(1, 1000),),
+                ).fetchall()
+                reads += 1
+        except sqlite3.OperationalError as e:
+            if "locked" in str(e) or "busy" in str(e):
+                locked += 1
+                try:
+                    conn.execute("ROLLBACK")
+                except sqlite3.OperationalError:
+                    pass
+            else:
+                raise
+    conn.close()
+    return reads, writes, locked
+
+
+def run(mode: str, args) -> None:
+    tuned = mode == "tuned"
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "bench.sqlite3")
+        _setup(path, args.rows)
+        if tuned:
+            _connect(path, True, args.busy_ms).close()  # 先切到 WAL
+        jobs = [(path, tuned, args.seconds, args.write_ratio, args.busy_ms, i) for i in range(args.workers)]
+        t0 = time.perf_counter()
+        with Pool(args.workers) as pool:
+            res = pool.map(_worker, jobs)
+        cost = time.perf_counter() - t0
+    reads = sum(r for r, _, _ in res)
+    writes = sum(w for _, w, _ in res)
+    locked = sum(l for _, _, l in res)
+    print(f"[{mode:7}] ops/s {(reads + writes) / cost:10.0f}  reads {reads:8d}  writes {writes:7d}  locked-errors {locked:6d}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="SQLite multi-process read/write benchmark")
+    ap.add_argument("--workers", type=int, default=8, help="并发进程数（模拟 gunicorn worker）")
+    ap.add_argument("--seconds", type=float, default=5.0, help="每种模式的压测时长（秒）")
+    ap.add_argument("--write-ratio", type=float, default=0.2, help="写操作占比 0~1")
+    ap.add_argument("--rows", type=int, default=20000, help="预置订单行数")
+    ap.add_argument("--busy-ms", type=int, default=5000, help="tuned 模式的 busy_timeout（毫秒）")
+    ap.add_argument("--mode", choices=["default", "tuned", "both"], default="both")
+    args = ap.parse_args()
+
+    for mode in (["default", "tuned"] if args.mode == "both" else [args.mode]):
+        run(mode, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+# tools/check_entitlements.py
+# -*- coding: utf-8 -*-
+"""
+服务权益有效性 / 扣次数 / 过期清理自检。
+
+1) 并发扣次数：--threads 个线程同时对一条 remaining_uses=--uses 的权益各扣 --attempts 次，
+   成功次数恰好等于 --uses，最终 remaining_uses=0、status=exhausted，不出现负数
+2) sweep_once：已过期 -> expired、次数为 0 -> exhausted、有效 / 不限次数的保持 active
+3) /api/me/services 只返回有效权益；快照查询走 ix_service_entitlements_validity
+
+用法：
+  python tools/check_entitlements.py --threads 16 --attempts 10 --uses 50
+全部通过退出码为 0，否则为 1。
+"""
+import argparse, os, shutil, sys, tempfile, threading
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+tmp = tempfile.mkdtemp(prefix="entitlement-check-")
+os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp}/entitlements.sqlite3"
+os.environ["FEED_WORKER_ENABLED"] = "0"
+os.environ["OUTBOX_ENABLED"] = "0"
+os.environ["PAY_RECONCILE_ENABLED"] = "0"
+os.environ["ENTITLEMENT_SWEEP_ENABLED"] = "0"
+
+failures = []
+
+
+def check(name: str, cond: bool, detail="") -> None:
+    print(("✅" if cond else "❌"), name, detail)
+    if not cond:
+        failures.append(name)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Entitlement consume/sweep check")
+    ap.add_argument("--threads", type=int, default=16)
+    ap.add_argument("--attempts", type=int, default=10, help="每个线程尝试扣减的次数")
+    ap.add_argument("--uses", type=int, default=50, help="被并发扣减的权益初始次数")
+    args = ap.parse_args()
+
+    from sqlalchemy import text
+
+    from app import create_app
+    from extensions import db
+    from services import entitlement_cache
+    from services.entitlement_service import consume, sweep_once
+
+    app = create_app()
+    now = datetime.utcnow()
+    with app.app_context():
+        import models.user  # noqa: F401
+        from models.user import User
+        from models.order import ServiceEntitlement as E
+
+        db.create_all(bind_key=None)
+        u = User(username="ent-check", phone="13800000000")
+        u.set_password("pw")
+        db.session.add(u)
+        db.session.flush()
+        uid = u.id
+        rows = {
+            "hot": E(user_id=uid, kind="product", code="mock", status="active", remaining_uses=args.uses),
+            "expired": E(user_id=uid, kind="product", code="essay", status="active", remaining_uses=5,
+                         valid_to=now - timedelta(days=1)),
+            "used_up": E(user_id=uid, kind="product", code="review", status="active", remaining_uses=0),
+            "valid": E(user_id=uid, kind="product", code="review", status="active", remaining_uses=3,
+                       valid_to=now + timedelta(days=30)),
+            "unlimited": E(user_id=uid, kind="plan", code="full", status="active"),
+        }
+        db.session.add_all(rows.values())
+        db.session.commit()
+        ids = {k: v.id for k, v in rows.items()}
+
+    # ---- 1) 并发扣次数 ----
+    ok_count = [0] * args.threads
+    barrier = threading.Barrier(args.threads)
+
+    def worker(i):
+        with app.app_context():
+            barrier.wait()
+            for _ in range(args.attempts):
+                if consume(uid, "mock"):
+                    ok_count[i] += 1
+            db.session.remove()
+
+    ts = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+
+    with app.app_context():
+        hot = db.session.get(E, ids["hot"])
+        check("并发扣减成功次数 = 初始次数", sum(ok_count) == args.uses, f"{sum(ok_count)}/{args.uses}")
+        check("remaining_uses 不为负且归零", hot.remaining_uses == 0, hot.remaining_uses)
+        check("用完后 status=exhausted", hot.status == "exhausted", hot.status)
+        check("不限次数权益可直接消费", consume(uid, "full", kind="plan"))
+        check("无可用权益时返回 False", not consume(uid, "mock"))
+
+        # ---- 2) 过期清理 ----
+        stats = sweep_once(batch=1)
+        status = {k: db.session.get(E, v).status for k, v in ids.items()}
+        check("过期 -> expired", status["expired"] == "expired", status)
+        check("次数为 0 -> exhausted", status["used_up"] == "exhausted", status)
+        check("有效 / 不限次数保持 active", status["valid"] == status["unlimited"] == "active", status)
+        check("清理统计", stats == {"expired": 1, "exhausted": 1}, stats)
+        check("再次清理无改动", sweep_once() == {"expired": 0, "exhausted": 0})
+
+        # ---- 3) 读接口 + 查询计划 ----
+        entitlement_cache.clear()
+        snap = entitlement_cache.load_snapshot(uid)
+        got = sorted(s["id"] for s in snap["services"])
+        check("快照只含有效权益", got == sorted([ids["valid"], ids["unlimited"]]), got)
+        plan = db.session.execute(text(
+            "EXPLAIN QUERY PLAN SELECT id FROM service_entitlements "
+            "WHERE user_id = :u AND status = 'active' AND (valid_to IS NULL OR valid_to > :n)"
+        ), {"u": uid, "n": now}).fetchall()
+        detail = " | ".join(str(r[-1]) for r in plan)
+        check("有效性查询走 ix_service_entitlements_validity", "ix_service_entitlements_validity" in detail, detail)
+
+    c = app.test_client()
+    tok = c.post("/api/auth/login", json={"username": "ent-check", "password": "pw"}).get_json()["accessToken"]
+    r = c.get("/api/me/services", headers={"Authorization": f"Bearer {tok}"})
+    items = r.get_json() if r.status_code == 200 else None
+    if isinstance(items, dict):
+        items = items.get("items", items.get("services"))
+    check("/api/me/services 只返回有效权益", r.status_code == 200 and len(items or []) == 2,
+          f"{r.status_code} {len(items or [])}")
+
+    shutil.rmtree(tmp, ignore_errors=True)
+    if failures:
+        print(f"❌ {len(failures)} 项失败")
+        sys.exit(1)
+    print("✅ 全部通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# tools/check_order_no.py
+# -*- coding: utf-8 -*-
+"""
+订单号生成器多进程唯一性自检 + 吞吐。
+
+- 父进程先用生成器出号，再 fork 出 --procs 个子进程（验证 fork 后重新申请槽位，不沿用父进程的 worker id）
+- 每个子进程尽可能快地生成 --count 个订单号
+- 检查：全局无重复、每个进程内严格递增、长度符合微信（6~32）/ 支付宝（≤64）限制、字符串序与数值序一致
+
+用法：
+  python tools/check_order_no.py --procs 8 --count 200000
+全部通过退出码为 0，否则为 1。
+"""
+import argparse, multiprocessing as mp, os, shutil, sys, tempfile, time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from services.order_no import OrderNoGenerator, parse  # noqa: E402
+
+tmp = tempfile.mkdtemp(prefix="order-no-check-")
+gen = OrderNoGenerator(slot_dir=tmp)
+
+
+def produce(count: int, out_path: str) -> None:
+    t0 = time.perf_counter()
+    nos = [gen.next_order_no() for _ in range(count)]
+    cost = time.perf_counter() - t0
+    with open(out_path, "w") as f:
+        f.write(f"{os.getpid()} {gen.worker_id} {cost}\n")
+        f.write("\n".join(nos))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Multi-process uniqueness check for order numbers")
+    ap.add_argument("--procs", type=int, default=8)
+    ap.add_argument("--count", type=int, default=100000, help="每个进程生成的订单号数量")
+    args = ap.parse_args()
+
+    parent_no = gen.next_order_no()
+    ctx = mp.get_context("fork")
+    paths = [os.path.join(tmp, f"out-{i}.txt") for i in range(args.procs)]
+    procs = [ctx.Process(target=produce, args=(args.count, p)) for p in paths]
+    t0 = time.perf_counter()
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    wall = time.perf_counter() - t0
+
+    failures = []
+
+    def check(name, cond, detail=""):
+        print(("✅" if cond else "❌"), name, detail)
+        if not cond:
+            failures.append(name)
+
+    all_nos, workers, rates, monotonic = [parent_no], set(), [], True
+    for path in paths:
+        with open(path) as f:
+            head, *nos = f.read().split("\n")
+        _, worker, cost = head.split()
+        workers.add(int(worker))
+        rates.append(len(nos) / float(cost))
+        monotonic &= all(a < b for a, b in zip(nos, nos[1:]))
+        monotonic &= all(int(a[3:]) < int(b[3:]) for a, b in zip(nos[:1000], nos[1:1001]))
+        all_nos.extend(nos)
+
+    total = args.procs * args.count + 1
+    check("全局无重复", len(set(all_nos)) == total, f"{len(set(all_nos))}/{total}")
+    check("每进程 worker id 不同（含 fork 前的父进程）",
+          len(workers) == args.procs and gen.worker_id not in workers, sorted(workers))
+    check("进程内严格递增（字符串序 = 数值序）", monotonic)
+    lengths = {len(n) for n in all_nos}
+    check("长度符合渠道限制", all(6 <= n <= 32 for n in lengths), lengths)
+    info = parse(all_nos[-1])
+    check("时间戳可解析", abs(info["ts_ms"] / 1000 - time.time()) < 60, info)
+
+    print(f"单进程 {min(rates):,.0f} ~ {max(rates):,.0f} 个/秒；"
+          f"{args.procs} 进程共 {total:,} 个，墙钟 {wall:.2f}s（{total / wall:,.0f} 个/秒，含进程启动）")
+    shutil.rmtree(tmp, ignore_errors=True)
+    if failures:
+        print(f"❌ {len(failures)} 项失败")
+        sys.exit(1)
+    print("✅ 全部通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# tools/check_order_pagination.py
+# -*- coding: utf-8 -*-
+"""
+订单 / 账单分页自检：SQL 条数 + 翻页完整性。
+
+准备一个有 --orders 个订单（每单 2 条明细、一半已支付）的用户，然后检查：
+1) GET /api/orders?summary=1                    ：1 条 SQL，不含 items
+2) GET /api/orders?limit=<=ORDERS_JOINED_MAX     ：1 条 SQL（joinedload），items 完整
+3) GET /api/orders?limit=50                     ：2 条 SQL（selectinload），items 完整
+4) GET /api/billing/invoices                    ：1 条 SQL
+5) 沿 next_cursor 翻完全部页：不重不漏、严格倒序，每页 SQL 条数不随页码增长
+SQL 条数取自 query_stats 的 X-SQL-Count 响应头。
+
+用法：
+  python tools/check_order_pagination.py --orders 300
+全部通过退出码为 0，否则为 1。
+"""
+import argparse, os, shutil, sys, tempfile
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+tmp = tempfile.mkdtemp(prefix="order-page-check-")
+os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp}/orders.sqlite3"
+os.environ["SQL_STATS_HEADERS"] = "1"
+os.environ["FEED_WORKER_ENABLED"] = "0"
+os.environ["OUTBOX_ENABLED"] = "0"
+os.environ["PAY_RECONCILE_ENABLED"] = "0"
+
+failures = []
+
+
+def check(name: str, cond: bool, detail="") -> None:
+    print(("✅" if cond else "❌"), name, detail)
+    if not cond:
+        failures.append(name)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Order/invoice keyset pagination and query-count check")
+    ap.add_argument("--orders", type=int, default=300)
+    args = ap.parse_args()
+
+    from app import create_app
+    from extensions import db
+    from services.order_history import JOINED_MAX
+
+    app = create_app()
+    with app.app_context():
+        import models.user  # noqa: F401
+        from models.user import User
+        from models.product import Product
+        from models.order import Order, OrderItem
+
+        db.create_all(bind_key=None)
+        u = User(username="page-check", phone="13800000000")
+        u.set_password("pw")
+        db.session.add(u)
+        db.session.add(Product(slug="svc", title="服务", price=100, is_published=True))
+        db.session.flush()
+        base = datetime.utcnow()
+        for i in range(args.orders):
+            # 每 7 单共用一个时间戳，覆盖同一 created_at 下按 id 翻页
+            ts = base - timedelta(minutes=i // 7)
+            paid = i % 2 == 0
+            o = Order(user_id=u.id, status="paid" if paid else "pending", total_amount=Decimal("100.00"),
+                      description=f"订单 {i}", created_at=ts, paid_at=ts if paid else None)
+            db.session.add(o)
+            db.session.flush()
+            for k in range(2):
+                db.session.add(OrderItem(order_id=o.id, product_id=1, product_title="服务", product_slug="svc",
+                                         unit_price=Decimal("50.00"), quantity=1, amount=Decimal("50.00")))
+        db.session.commit()
+
+    c = app.test_client()
+    tok = c.post("/api/auth/login", json={"username": "page-check", "password": "pw"}).get_json()["accessToken"]
+    H = {"Authorization": f"Bearer {tok}"}
+
+    def get(url):
+        r = c.get(url, headers=H)
+        assert r.status_code == 200, (url, r.status_code, r.get_data(as_text=True)[:200])
+        return r.get_json(), int(r.headers.get("X-SQL-Count", -1))
+
+    body, n = get("/api/orders?summary=1&limit=50")
+    check("summary 模式 1 条 SQL", n == 1, f"{n} 条")
+    check("summary 模式不含 items", all("items" not in o for o in body["items"]))
+
+    body, n = get(f"/api/orders?limit={JOINED_MAX}")
+    check(f"limit={JOINED_MAX} joined 加载 1 条 SQL", n == 1, f"{n} 条")
+    check("joined 页 items 完整", all(len(o["items"]) == 2 for o in body["items"]) and len(body["items"]) == JOINED_MAX)
+
+    body, n = get("/api/orders?limit=50")
+    check("limit=50 selectin 加载 2 条 SQL", n == 2, f"{n} 条")
+    check("selectin 页 items 完整", all(len(o["items"]) == 2 for o in body["items"]) and len(body["items"]) == 50)
+
+    body, n = get("/api/billing/invoices")
+    check("账单 1 条 SQL", n == 1, f"{n} 条")
+
+    for label, url, expect_total, per_page_sql in (
+        ("订单", "/api/orders?limit=40", args.orders, 2),
+        ("订单 summary", "/api/orders?summary=1&limit=40", args.orders, 1),
+        ("账单", "/api/billing/invoices?limit=40", (args.orders + 1) // 2, 1),
+    ):
+        ids, counts, cursor = [], set(), None
+        while True:
+            body, n = get(url + (f"&cursor={cursor}" if cursor else ""))
+            counts.add(n)
+            ids.extend(o["id"] for o in body["items"])
+            cursor = body["next_cursor"]
+            if not cursor:
+                break
+        key = [int(str(i).rsplit("_", 1)[-1]) for i in ids]
+        check(f"{label} 翻页不重不漏", len(key) == len(set(key)) == expect_total, f"{len(set(key))}/{expect_total}")
+        check(f"{label} 每页 SQL 条数恒定", counts == {per_page_sql}, counts)
+
+    r = c.get("/api/orders?cursor=bad", headers=H)
+    check("非法游标 400", r.status_code == 400, r.status_code)
+
+    shutil.rmtree(tmp, ignore_errors=True)
+    if failures:
+        print(f"❌ {len(failures)} 项失败")
+        sys.exit(1)
+    print("✅ 全部通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+# tools/check_order_transitions.py
+# -*- coding: utf-8 -*-
+"""
+订单状态机并发自检：多线程同时对同一批订单发起状态变更，验证副作用只执行一次。
+
+检查项：
+1) 并发 mock-pay 同一订单：只有一次 pending -> paid，权益条数 = 订单明细数
+2) 回调 / 对账并发确认同一笔支付订单：只写一条短信发件箱、只发布一次事件
+3) 支付与超时取消并发：订单最终为 paid（cancelled -> paid 允许，paid -> cancelled 不允许）
+4) 历史大写状态 'PAID' / 'PENDING' 经 normalize 后与小写一致
+5) /billing/checkout 重复调用只发放一条 Pro 权益
+6) 同一用户并发 checkout：只有一笔 Pro 订单、一条 Pro 权益，所有请求返回同一订单
+
+用法：
+  python tools/check_order_transitions.py --threads 16 --rounds 20
+全部通过退出码为 0，否则为 1。
+"""
+import argparse, os, shutil, sys, tempfile, threading
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+tmp = tempfile.mkdtemp(prefix="order-state-check-")
+os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp}/orders.sqlite3"
+os.environ["FEED_WORKER_ENABLED"] = "0"
+os.environ["OUTBOX_ENABLED"] = "0"             # 只检查写入，不投递
+os.environ["PAY_RECONCILE_ENABLED"] = "0"
+
+failures = []
+
+
+def check(name: str, cond: bool, detail="") -> None:
+    print(("✅" if cond else "❌"), name, detail)
+    if not cond:
+        failures.append(name)
+
+
+def race(n: int, fn) -> None:
+    """n 个线程在同一时刻开始执行 fn(i)。"""
+    barrier = threading.Barrier(n)
+    errors = []
+
+    def run(i):
+        barrier.wait()
+        try:
+            fn(i)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    if errors:
+        raise errors[0]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Concurrent order state transition check")
+    ap.add_argument("--threads", type=int, default=16, help="每轮并发线程数")
+    ap.add_argument("--rounds", type=int, default=10, help="每项检查重复轮数")
+    args = ap.parse_args()
+
+    from app import create_app
+    from extensions import db
+    from services import order_state, pay_events, payment_service
+
+    app = create_app()
+    with app.app_context():
+        import models.user, models.student_profile  # noqa: F401
+        from models.user import User
+        from models.product import Product
+        from models.order import Order, ServiceEntitlement
+        from models.outbox import OutboxMessage
+
+        db.create_all(bind_key=None)
+        u = User(username="order-check", phone="13800000000")
+        u.set_password("pw")
+        db.session.add(u)
+        for i in range(3):
+            db.session.add(Product(slug=f"svc-{i}", title=f"服务 {i}", price=100 + i, is_published=True))
+        db.session.commit()
+        uid = u.id
+
+    c = app.test_client()
+    tok = c.post("/api/auth/login", json={"username": "order-check", "password": "pw"}).get_json()["accessToken"]
+    H = {"Authorization": f"Bearer {tok}"}
+
+    # 1) 并发 mock-pay
+    dup = 0
+    for r in range(args.rounds):
+        oid = c.post("/api/orders", json={"product_id": 1 + r % 3}, headers=H).get_json()["id"]
+        race(args.threads, lambda i: app.test_client().post(f"/api/orders/{oid}/mock-pay", headers=H))
+        with app.app_context():
+            n = ServiceEntitlement.query.filter_by(source_order_id=oid).count()
+            dup += n != 1
+            status = db.session.query(Order.status).filter_by(id=oid).scalar()
+    check("并发 mock-pay 权益只发一次", dup == 0, f"{dup}/{args.rounds} 轮重复，最后状态 {status}")
+
+    # 2) 并发确认同一笔支付订单
+    published = []
+    orig_publish = pay_events.publish
+    pay_events.publish = lambda no, status, **kw: (published.append((no, status)), orig_publish(no, status, **kw))
+    winners_bad = 0
+    with app.app_context():
+        for r in range(args.rounds):
+            db.session.add(Order(user_id=uid, out_trade_no=f"CHK{r}", amount=1.0, status="PENDING"))
+        db.session.commit()
+    for r in range(args.rounds):
+        wins = []
+
+        def confirm(i, no=f"CHK{r}"):
+            with app.app_context():
+                wins.append(payment_service.mark_order_paid(no, trade_no=f"T{i}", source=f"t{i}"))
+
+        race(args.threads, confirm)
+        winners_bad += sum(wins) != 1
+    with app.app_context():
+        boxes = OutboxMessage.query.filter(OutboxMessage.idempotency_key.like("sms:pay:CHK%")).count()
+    paid_events = [p for p in published if p[1] == order_state.PAID]
+    check("并发确认只有一方改到行", winners_bad == 0, f"{winners_bad}/{args.rounds} 轮不是恰好一个赢家")
+    check("短信发件箱每单一条", boxes == args.rounds, f"{boxes} 条")
+    check("支付事件每单一次", len(paid_events) == args.rounds, f"{len(paid_events)} 次")
+
+    # 3) 支付与超时取消并发
+    with app.app_context():
+        for r in range(args.rounds):
+            db.session.add(Order(user_id=uid, out_trade_no=f"RACE{r}", amount=1.0, status="pending"))
+        db.session.commit()
+    for r in range(args.rounds):
+        def pay_or_expire(i, no=f"RACE{r}"):
+            with app.app_context():
+                if i % 2:
+                    payment_service.mark_order_paid(no, source="race")
+                else:
+                    payment_service.expire_orders([no])
+
+        race(args.threads, pay_or_expire)
+    with app.app_context():
+        final = {s for (s,) in db.session.query(Order.status).filter(Order.out_trade_no.like("RACE%"))}
+    check("支付优先于超时取消", final == {order_state.PAID}, final)
+
+    # 4) 大小写统一
+    check("normalize 统一大小写",
+          order_state.normalize("PAID") == order_state.PAID and order_state.normalize("PENDING") == order_state.PENDING)
+
+    # 5) 重复 checkout
+    a = c.post("/api/billing/checkout", json={"plan": "pro"}, headers=H).get_json()
+    b = c.post("/api/billing/checkout", json={"plan": "pro"}, headers=H).get_json()
+    with app.app_context():
+        plans = ServiceEntitlement.query.filter_by(user_id=uid, kind="plan", code="full").count()
+    check("重复 checkout 只发放一条 Pro 权益", plans == 1 and a["order_id"] == b["order_id"], f"{plans} 条")
+
+    # 6) 并发 checkout（每轮换一个新用户）
+    bad = []
+    for r in range(args.rounds):
+        with app.app_context():
+            nu = User(username=f"checkout-{r}", phone=f"139{r:08d}")
+            nu.set_password("pw")
+            db.session.add(nu)
+            db.session.commit()
+            nuid = nu.id
+        t = c.post("/api/auth/login", json={"username": f"checkout-{r}", "password": "pw"}).get_json()["accessToken"]
+        got = []
+        race(args.threads, lambda i: got.append(app.test_client().post(
+            "/api/billing/checkout", json={"plan": "pro"}, headers={"Authorization": f"Bearer {t}"},
+        )))
+        with app.app_context():
+            plans = ServiceEntitlement.query.filter_by(user_id=nuid, kind="plan", code="full").count()
+            orders = Order.query.filter_by(user_id=nuid, status=order_state.PAID).count()
+        ids = {g.get_json().get("order_id") for g in got if g.status_code == 200}
+        if plans != 1 or orders != 1 or len(ids) != 1 or any(g.status_code != 200 for g in got):
+            bad.append((plans, orders, len(ids), sorted({g.status_code for g in got})))
+    check("并发 checkout 只下一单、只发一条 Pro 权益", not bad, bad[:3])
+
+    shutil.rmtree(tmp, ignore_errors=True)
+    if failures:
+        print(f"❌ {len(failures)} 项失败")
+        sys.exit(1)
+    print("✅ 全部通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# tools/check_pay_clients.py
+# -*- coding: utf-8 -*-
+"""
+支付 SDK 客户端注册表（services/pay_clients.ManagedClient）自检，用假的 build 函数，不依赖支付配置。
+
+1) 首次构建抛异常（如微信平台证书下载失败）：get() 返回 None；配置不变，下个检查周期自动重试并成功
+2) 构建返回 None（配置缺失）：同样在下个检查周期重试
+3) 已有客户端时指纹变化但重建失败：继续使用旧客户端，之后重试成功再切换
+4) 检查周期内不重复构建
+
+用法：
+  python tools/check_pay_clients.py
+全部通过退出码为 0，否则为 1。
+"""
+import os, sys, time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+failures = []
+
+
+def check(name: str, cond: bool, detail="") -> None:
+    print(("✅" if cond else "❌"), name, detail)
+    if not cond:
+        failures.append(name)
+
+
+def main():
+    from services import pay_clients
+    from services.pay_clients import ManagedClient
+
+    pay_clients.CHECK_INTERVAL = 0.05
+
+    def scripted(*steps):
+        """按顺序执行 steps：Exception 实例则抛出，否则作为构建结果返回。"""
+        calls = []
+
+        def build():
+            step = steps[min(len(calls), len(steps) - 1)]
+            calls.append(step)
+            if isinstance(step, Exception):
+                raise step
+            return step
+        return build, calls
+
+    def wait():
+        time.sleep(pay_clients.CHECK_INTERVAL * 1.5)
+
+    # ---- 1) 首次构建抛异常，之后恢复 ----
+    build, calls = scripted(RuntimeError("platform cert download failed"), "client-1")
+    mc = ManagedClient("check-raise", lambda: ("same",), build)
+    check("首次构建失败返回 None", mc.get() is None)
+    check("检查周期内不重试", mc.get() is None and len(calls) == 1, len(calls))
+    wait()
+    got = mc.get()
+    check("配置不变，下个周期重试成功", got == "client-1" and len(calls) == 2, f"{got} / {len(calls)} 次构建")
+    wait()
+    check("成功后指纹不变不再重建", mc.get() == "client-1" and len(calls) == 2, len(calls))
+
+    # ---- 2) 构建返回 None ----
+    build, calls = scripted(None, "client-2")
+    mc = ManagedClient("check-none", lambda: ("same",), build)
+    check("构建返回 None 时 get() 为 None", mc.get() is None)
+    wait()
+    check("返回 None 后下个周期重试成功", mc.get() == "client-2" and len(calls) == 2, len(calls))
+
+    # ---- 3) 重建失败保留旧客户端 ----
+    fp = ["v1"]
+    build, calls = scripted("old", RuntimeError("bad key"), "new")
+    mc = ManagedClient("check-rotate", lambda: (fp[0],), build)
+    check("初始构建", mc.get() == "old")
+    fp[0] = "v2"
+    wait()
+    check("指纹变化、重建失败：继续用旧客户端", mc.get() == "old" and len(calls) == 2, len(calls))
+    wait()
+    check("下个周期重试成功后切换", mc.get() == "new" and len(calls) == 3, len(calls))
+    check("builds 只计成功的构建", mc.builds == 2, mc.builds)
+
+    if failures:
+        print(f"❌ {len(failures)} 项失败")
+        sys.exit(1)
+    print("✅ 全部通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+# tools/check_pay_reconciler.py
+# -*- coding: utf-8 -*-
+"""
+支付对账（services/pay_reconciler.py）自检，上游用假客户端代替，不联网。
+
+1) 上游异常（微信 500 / 401、支付宝 20000 / ACQ.SYSTEM_ERROR）：过期订单一个都不取消，记为出错并退避
+2) 上游明确答复未支付（NOTPAY / 404 ORDER_NOT_EXIST / WAIT_BUYER_PAY / ACQ.TRADE_NOT_EXIST）：过期订单被取消
+3) 上游答复已支付：订单置为 paid
+4) 最老的一批订单已放弃自动查询（连续出错 PAY_RECONCILE_MAX_ERRORS 次）且占满一页 BATCH 时，
+   更新的订单仍会被查询 / 取消，不被饿死（分桶扫描与过期订单两条路径）
+
+用法：
+  python tools/check_pay_reconciler.py
+全部通过退出码为 0，否则为 1。
+"""
+import json, os, shutil, sys, tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+tmp = tempfile.mkdtemp(prefix="pay-reconcile-check-")
+os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp}/reconcile.sqlite3"
+os.environ["FEED_WORKER_ENABLED"] = "0"
+os.environ["OUTBOX_ENABLED"] = "0"
+os.environ["PAY_RECONCILE_ENABLED"] = "0"      # 不起后台线程，直接调用 scan_once
+os.environ["ENTITLEMENT_SWEEP_ENABLED"] = "0"
+
+failures = []
+
+
+def check(name: str, cond: bool, detail="") -> None:
+    print(("✅" if cond else "❌"), name, detail)
+    if not cond:
+        failures.append(name)
+
+
+class FakeWxPay:
+    """wechatpayv3.WeChatPay.query 的替身：返回 (status_code, text)，不抛异常。"""
+    reply = (200, {"trade_state": "NOTPAY"})
+
+    def query(self, out_trade_no=None, **_):
+        code, body = self.reply
+        return code, json.dumps(body)
+
+
+class FakeAlipay:
+    """DefaultAlipayClient.execute 的替身：返回响应 JSON 字符串。"""
+    reply = {"code": "10000", "trade_status": "WAIT_BUYER_PAY"}
+
+    def execute(self, request):
+        return json.dumps({"alipay_trade_query_response": self.reply})
+
+
+def main():
+    from app import create_app
+    from extensions import db
+    from services import pay_clients, pay_reconciler as rec
+
+    wx, ali = FakeWxPay(), FakeAlipay()
+    pay_clients.get_wxpay_client = lambda: wx
+    pay_clients.get_alipay_client = lambda: ali
+
+    app = create_app()
+    with app.app_context():
+        import models.user  # noqa: F401
+        from models.order import Order
+        from models.user import User
+
+        db.create_all(bind_key=None)
+        u = User(username="reconcile-check", phone="13700000000")
+        u.set_password("pw")
+        db.session.add(u)
+        db.session.flush()
+        old = datetime.utcnow() - timedelta(seconds=rec.EXPIRE_AFTER + 60)
+        nos = {"wechat": [f"WXSTALE{i}" for i in range(3)], "alipay": [f"ALISTALE{i}" for i in range(3)]}
+        for ch, items in nos.items():
+            for no in items:
+                db.session.add(Order(user_id=u.id, out_trade_no=no, amount=1.0, status="pending",
+                                     channel=ch, created_at=old))
+        db.session.commit()
+
+        def statuses():
+            db.session.expire_all()
+            return {o.out_trade_no: o.status for o in Order.query.all()}
+
+        def scan(wx_reply, ali_reply):
+            FakeWxPay.reply, FakeAlipay.reply = wx_reply, ali_reply
+            rec._checks.clear()          # 每种场景都从"从未查过"开始，不受上一场景退避影响
+            return rec.scan_once()
+
+        # ---- 1) 上游异常：不能取消 ----
+        for label, wx_reply, ali_reply in (
+            ("HTTP 500 / 20000", (500, {"code": "SYSTEM_ERROR", "message": "系统错误"}),
+             {"code": "20000", "msg": "Service Currently Unavailable", "sub_code": "isp.unknow-error"}),
+            ("HTTP 401 / ACQ.SYSTEM_ERROR", (401, {"code": "SIGN_ERROR", "message": "签名错误"}),
+             {"code": "40004", "msg": "Business Failed", "sub_code": "ACQ.SYSTEM_ERROR"}),
+            ("HTTP 200 USERPAYING", (200, {"trade_state": "USERPAYING"}), {"code": "10000", "trade_status": "UNKNOWN"}),
+        ):
+            stats = scan(wx_reply, ali_reply)
+            st = statuses()
+            check(f"上游 {label}：过期订单不取消", set(st.values()) == {"pending"} and stats["expired"] == 0,
+                  f"{stats} {sorted(set(st.values()))}")
+            check(f"上游 {label}：记为出错", stats["errors"] == 6, stats["errors"])
+            errs = {no: rec._checks.get(no, {}).get("errors") for items in nos.values() for no in items}
+            check(f"上游 {label}：连续出错次数 +1", set(errs.values()) == {1}, errs)
+
+        # ---- 2) 明确未支付：取消 ----
+        stats = scan((404, {"code": "ORDER_NOT_EXIST", "message": "订单不存在"}),
+                     {"code": "40004", "sub_code": "ACQ.TRADE_NOT_EXIST"})
+        st = statuses()
+        check("订单不存在：过期订单被取消", stats["expired"] == 6 and set(st.values()) == {"cancelled"}, stats)
+
+        for o in Order.query.all():
+            o.status = "pending"
+        db.session.commit()
+        stats = scan((200, {"trade_state": "NOTPAY"}), {"code": "10000", "trade_status": "WAIT_BUYER_PAY"})
+        check("NOTPAY / WAIT_BUYER_PAY：过期订单被取消", stats["expired"] == 6, stats)
+
+        # ---- 3) 已支付 ----
+        for o in Order.query.all():
+            o.status = "pending"
+        db.session.commit()
+        stats = scan((200, {"trade_state": "SUCCESS", "transaction_id": "42000001"}),
+                     {"code": "10000", "trade_status": "TRADE_SUCCESS", "trade_no": "2024000001"})
+        st = statuses()
+        check("已支付：订单置为 paid", stats["paid"] == 6 and set(st.values()) == {"paid"}, stats)
+
+        # ---- 4) 放弃的老订单不占满批次 ----
+        rec.BATCH = 3
+        now = datetime.utcnow()
+        blocked, fresh = [], []
+        for i, (age, tag) in enumerate([(rec.EXPIRE_AFTER + 600, "STALE")] * 5 + [(30, "NEW")] * 5):
+            no = f"BATCH{tag}{i}"
+            db.session.add(Order(user_id=u.id, out_trade_no=no, amount=1.0, status="pending", channel="wechat",
+                                 created_at=now - timedelta(seconds=age - i)))
+            (blocked if i % 5 < 3 else fresh).append(no)
+        db.session.commit()
+        FakeWxPay.reply = (200, {"trade_state": "NOTPAY"})
+        rec._checks.clear()
+        for no in blocked:       # 每组里最老的 3 单（恰好一页）已放弃
+            rec._checks[no] = {"at": 0.0, "errors": rec.MAX_ERRORS}
+        stats = rec.scan_once()
+        st = statuses()
+        check("放弃的订单不再查询", all(st[no] == "pending" and rec._checks[no]["at"] == 0.0 for no in blocked),
+              {no: st[no] for no in blocked})
+        check("过期订单：更新的订单仍被取消", all(st[no] == "cancelled" for no in fresh if "STALE" in no),
+              {no: st[no] for no in fresh})
+        check("分桶扫描：更新的订单仍被查询",
+              all(rec._checks.get(no, {}).get("at") for no in fresh if "NEW" in no), stats)
+
+    shutil.rmtree(tmp, ignore_errors=True)
+    if failures:
+        print(f"❌ {len(failures)} 项失败")
+        sys.exit(1)
+    print("✅ 全部通过")
+
+
+if __name__ == "__main__":
+    main()
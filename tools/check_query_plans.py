@@ -0,0 +1,139 @@
+# tools/check_query_plans.py
+# -*- coding: utf-8 -*-
+"""
+热点接口的查询计划回归检查（SQLite EXPLAIN QUERY PLAN）。
+
+做法：临时 SQLite 库 + create_all（模型上声明的索引与迁移 d4a7c2e91f30 一致）+ 少量样本数据，
+用 test_client 调用每个热点接口，抓取期间执行的 SELECT，逐条 EXPLAIN QUERY PLAN；
+若目标表出现不走索引的全表扫描（"SCAN <table>" 且不含 INDEX），判为失败。
+
+用法：
+  python tools/check_query_plans.py            # 全部通过退出码 0，否则 1
+  python tools/check_query_plans.py -v         # 打印每条语句的查询计划
+"""
+import argparse, os, re, sys, tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+tmp = tempfile.mkdtemp(prefix="plan-check-")
+os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp}/plans.sqlite3"
+os.environ["FEED_WORKER_ENABLED"] = "0"
+
+# (接口, 需要检查的表)
+HOT_ENDPOINTS = [
+    ("/api/programs", ["programs"]),
+    ("/api/programs/stats/country", ["programs"]),
+    ("/api/programs/p-1", ["program_requirements"]),
+    ("/api/orders", ["orders"]),
+    ("/api/billing/invoices", ["orders"]),
+    ("/api/billing/plan", ["service_entitlements"]),
+    ("/api/me/services", ["service_entitlements"]),
+    ("/api/me/tasks", ["materials"]),
+]
+
+
+def seed(db):
+    import models.user, models.student_profile, models.program, models.application  # noqa: F401
+    from models.user import User
+    from models.program import Program, ProgramRequirement
+    from models.application import Application, Material
+    from models.order import Order, ServiceEntitlement
+
+    db.create_all(bind_key=None)
+    now = datetime.utcnow()
+    users = []
+    for i in range(20):
+        u = User(username=f"plan-{i}", phone=f"1390000{i:04d}")
+        u.set_password("pw")
+        db.session.add(u)
+        users.append(u)
+    countries = ["UK", "US", "AU", "CA", "HK"]
+    for i in range(200):
+        p = Program(slug=f"p-{i}", title=f"P {i}", country=countries[i % 5], discipline=f"D{i % 7}",
+                    status="published" if i % 3 else "draft", created_at=now - timedelta(days=i))
+        p.requirements = [ProgramRequirement(req_type="GPA", min_value="3.0/4.0"),
+                          ProgramRequirement(req_type="IELTS", min_value="6.5")]
+        db.session.add(p)
+    db.session.flush()
+    for n, u in enumerate(users):
+        for j in range(10):
+            db.session.add(Order(user_id=u.id, status="paid" if j % 2 else "pending", channel="wechat",
+                                 amount=100, created_at=now - timedelta(hours=j),
+                                 paid_at=now - timedelta(hours=j) if j % 2 else None))
+        db.session.add(ServiceEntitlement(user_id=u.id, kind="plan", code="full", status="active"))
+        db.session.add(ServiceEntitlement(user_id=u.id, kind="product", code="essay", status="active",
+                                          remaining_uses=3))
+        a = Application(student_id=u.id, program_id=n + 1)
+        db.session.add(a)
+        db.session.flush()
+        for k in range(5):
+            db.session.add(Material(app_id=a.id, type="cv", due_at=now + timedelta(days=k)))
+    db.session.commit()
+    db.session.execute(db.text("ANALYZE"))
+    db.session.commit()
+
+
+_FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?!.*INDEX)")   # 旧版 SQLite 输出 "SCAN TABLE x"
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Query plan regression check for hot endpoints")
+    ap.add_argument("-v", "--verbose", action="store_true", help="打印每条语句的查询计划")
+    args = ap.parse_args()
+
+    from sqlalchemy import event
+    from app import create_app
+    from extensions import db
+    from services import entitlement_cache
+
+    app = create_app()
+    with app.app_context():
+        seed(db)
+        engine = db.engine
+        engines = list(db.engines.values())   # 含只读 bind：公开目录接口的查询走那里
+
+    captured = []
+
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    for e in engines:
+        event.listen(e, "before_cursor_execute", _capture)
+
+    c = app.test_client()
+    tok = c.post("/api/auth/login", json={"username": "plan-3", "password": "pw"}).get_json()["accessToken"]
+    H = {"Authorization": f"Bearer {tok}"}
+
+    failures = 0
+    for url, tables in HOT_ENDPOINTS:
+        entitlement_cache.clear()   # /billing/plan 与 /me/services 共用快照，逐个接口冷启动才能抓到 SQL
+        captured.clear()
+        r = c.get(url, headers=H)
+        stmts = list(captured)
+        bad = []
+        with engine.connect() as conn:   # 只读 bind 指向同一文件，计划一致
+            raw = conn.connection.dbapi_connection
+            for stmt, params in stmts:
+                plan = [row[3] for row in raw.execute(f"EXPLAIN QUERY PLAN {stmt}", params or ()).fetchall()]
+                if args.verbose:
+                    print(f"   {' '.join(stmt.split())[:140]}")
+                    for line in plan:
+                        print(f"     -> {line}")
+                for line in plan:
+                    m = _FULL_SCAN.match(line)
+                    if m and m.group(1) in tables:
+                        bad.append(line)
+        ok = r.status_code == 200 and stmts and not bad
+        failures += 0 if ok else 1
+        print(("✅" if ok else "❌"), f"{url:32} {r.status_code}  {len(stmts)} SELECT", "; ".join(bad))
+
+    if failures:
+        print(f"❌ {failures} 个接口存在全表扫描或请求失败")
+        sys.exit(1)
+    print("✅ 热点接口全部走索引")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# tools/check_rbac.py
+# -*- coding: utf-8 -*-
+"""
+统一 RBAC（services/rbac.py）自检。
+
+1) 角色校验：admin / staff / superadmin / 大小写 / 旧 "role" 字符串 claims / 普通用户 403 / 未登录 401
+2) 角色 -> 权限映射：编译一次后权限判断不再发 SQL；--checks 次判断的耗时
+3) 通过 PUT /api/admin/roles/<id>/permissions 修改后版本号 +1，新权限立即生效
+
+用法：
+  python tools/check_rbac.py --checks 100000
+全部通过退出码为 0，否则为 1。
+"""
+import argparse, os, shutil, sys, tempfile, time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+tmp = tempfile.mkdtemp(prefix="rbac-check-")
+os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp}/rbac.sqlite3"
+os.environ["FEED_WORKER_ENABLED"] = "0"
+os.environ["OUTBOX_ENABLED"] = "0"
+os.environ["PAY_RECONCILE_ENABLED"] = "0"
+os.environ["ENTITLEMENT_SWEEP_ENABLED"] = "0"
+
+failures = []
+
+
+def check(name: str, cond: bool, detail="") -> None:
+    print(("✅" if cond else "❌"), name, detail)
+    if not cond:
+        failures.append(name)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="RBAC role/permission check")
+    ap.add_argument("--checks", type=int, default=100000, help="计时的权限判断次数")
+    args = ap.parse_args()
+
+    from flask_jwt_extended import create_access_token
+    from sqlalchemy import event
+
+    from app import create_app
+    from extensions import db
+    from services import rbac
+
+    app = create_app()
+    with app.app_context():
+        from models.rbac import Permission, Role
+
+        db.create_all(bind_key=None)
+        perms = [Permission(code=c, name=c) for c in ("orders.read", "orders.refund", "cases.write")]
+        finance = Role(name="Finance", desc="财务")
+        finance.permissions = perms[:1]
+        db.session.add_all(perms + [finance, Role(name="admin")])
+        db.session.commit()
+        finance_id = finance.id
+
+        def token(claims):
+            return {"Authorization": "Bearer " + create_access_token(identity="1", additional_claims=claims)}
+
+        H = {
+            "admin": token({"roles": ["admin"]}),
+            "superadmin": token({"roles": ["superadmin"]}),
+            "staff_upper": token({"roles": ["STAFF"]}),
+            "legacy_role": token({"role": "admin"}),
+            "user": token({"roles": ["user"]}),
+            "finance": token({"roles": ["finance"]}),
+        }
+
+    c = app.test_client()
+    for who, url, expect in (
+        ("admin", "/api/admin/roles", 200),
+        ("superadmin", "/api/admin/roles", 200),
+        ("legacy_role", "/api/admin/roles", 200),
+        ("staff_upper", "/api/admin/roles", 403),
+        ("staff_upper", "/api/admin/cases", 200),
+        ("user", "/api/admin/cases", 403),
+        ("user", "/api/admin/roles", 403),
+    ):
+        r = c.get(url, headers=H[who])
+        check(f"{who:12s} GET {url} -> {expect}", r.status_code == expect, r.status_code)
+    r = c.get("/api/admin/roles")
+    check("未登录 -> 401", r.status_code == 401, r.status_code)
+    body = c.get("/api/admin/roles", headers=H["user"]).get_json()
+    check("403 响应兼容旧字段", {"code", "msg", "message"} <= set(body), body)
+
+    sql = [0]
+
+    def count(*_a, **_k):
+        sql[0] += 1
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        with app.test_request_context(headers=H["finance"]):
+            from flask_jwt_extended import verify_jwt_in_request
+            verify_jwt_in_request()
+            v1, _ = rbac.snapshot()
+            check("finance 拥有 orders.read", rbac.has_permission("orders.read"))
+            check("finance 没有 orders.refund", not rbac.has_permission("orders.refund"))
+            sql[0] = 0
+            roles = rbac.current_roles()
+            t0 = time.perf_counter()
+            for _ in range(args.checks):
+                "orders.read" in rbac.permissions_for(roles)
+            cost = time.perf_counter() - t0
+            check("映射已编译后权限判断 0 条 SQL", sql[0] == 0, f"{sql[0]} 条")
+            print(f"   {args.checks:,} 次权限判断 {cost * 1000:.1f}ms（{cost / args.checks * 1e6:.2f}µs/次）")
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+    r = c.put(f"/api/admin/roles/{finance_id}/permissions", headers=H["admin"],
+              json={"codes": ["orders.read", "orders.refund"]})
+    check("修改角色权限 200", r.status_code == 200, r.status_code)
+    with app.test_request_context(headers=H["finance"]):
+        from flask_jwt_extended import verify_jwt_in_request
+        verify_jwt_in_request()
+        v2, mapping = rbac.snapshot()
+        check("角色编辑后版本号递增", v2 > v1, f"v{v1} -> v{v2}")
+        check("新权限立即生效", rbac.has_permission("orders.refund"), sorted(mapping.get("finance", ())))
+
+    shutil.rmtree(tmp, ignore_errors=True)
+    if failures:
+        print(f"❌ {len(failures)} 项失败")
+        sys.exit(1)
+    print("✅ 全部通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# tools/check_replica_routing.py
+# -*- coding: utf-8 -*-
+"""
+读写分离路由自检：用两个本地 SQLite 文件模拟主库 / 副本（副本是主库的旧快照）。
+
+检查项：
+1) 只读蓝图（/api/programs）的 GET 读副本
+2) 非只读蓝图、写请求始终走主库
+3) 读己之写：写请求后带 cookie 的客户端在窗口内读主库
+4) 复制延迟超过 REPLICA_MAX_LAG_S 时回退主库
+5) 副本查询出错时回退主库并标记副本不可用
+
+用法：
+  python tools/check_replica_routing.py
+全部通过退出码为 0，否则为 1。
+"""
+import os, shutil, sqlite3, sys, tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+tmp = tempfile.mkdtemp(prefix="replica-check-")
+PRIMARY = os.path.join(tmp, "primary.sqlite3")
+REPLICA = os.path.join(tmp, "replica.sqlite3")
+
+# config.py 在 import 时读取环境变量，必须先设置
+os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{PRIMARY}"
+os.environ["DATABASE_REPLICA_URI"] = f"sqlite:///{REPLICA}"
+os.environ["REPLICA_CHECK_INTERVAL"] = "0"     # 每次都探测，便于逐项验证
+os.environ["FEED_WORKER_ENABLED"] = "0"
+
+failures = []
+
+
+def check(name: str, cond: bool, detail="") -> None:
+    print(("✅" if cond else "❌"), name, detail)
+    if not cond:
+        failures.append(name)
+
+
+def main():
+    from app import create_app
+    from extensions import db
+    import db_router
+
+    app = create_app()
+    with app.app_context():
+        import models.user, models.student_profile, models.program  # noqa: F401
+        from models.user import User
+        from models.program import Program
+
+        db.create_all(bind_key=None)
+        u = User(username="replica-check", phone="13800000000")
+        u.set_password("pw")
+        db.session.add(u)
+        for i in range(3):
+            db.session.add(Program(slug=f"rc-{i}", title=f"RC {i}", country="UK", status="published"))
+        db.session.commit()
+        db.engines[None].dispose()
+
+        # 副本 = 此刻的快照；之后主库再多一条，模拟复制延迟
+        shutil.copyfile(PRIMARY, REPLICA)
+        db.session.add(Program(slug="rc-new", title="RC new", country="UK", status="published"))
+        db.session.commit()
+
+    c = app.test_client()
+    total = lambda: c.get("/api/programs").get_json()["total"]
+
+    check("只读蓝图读副本", total() == 3)
+
+    tok = c.post("/api/auth/login", json={"username": "replica-check", "password": "pw"}).get_json()["accessToken"]
+    H = {"Authorization": f"Bearer {tok}"}
+    r = c.put("/api/me/profile", json={"gpa": 3.5}, headers=H)
+    check("写请求走主库", r.status_code == 200, r.status_code)
+    check("写请求下发读己之写 cookie", db_router.RYW_COOKIE in (r.headers.get("Set-Cookie") or ""))
+    check("读己之写窗口内读主库", total() == 4)
+    c.delete_cookie(db_router.RYW_COOKIE)
+    check("窗口外恢复读副本", total() == 3)
+
+    orig = db_router.LAG_PROBES.get("sqlite")
+    db_router.LAG_PROBES["sqlite"] = lambda conn: db_router.MAX_LAG_S + 100
+    check("延迟过大回退主库", total() == 4, db_router.replica_health.snapshot())
+    if orig is None:
+        db_router.LAG_PROBES.pop("sqlite")
+    else:
+        db_router.LAG_PROBES["sqlite"] = orig
+    check("延迟恢复后读副本", total() == 3)
+
+    with app.app_context():
+        db.engines[db_router.READ_BIND].dispose()
+    conn = sqlite3.connect(REPLICA)
+    conn.execute("DROP TABLE programs")
+    conn.commit()
+    conn.close()
+    r = c.get("/api/programs")
+    check("副本出错回退主库", r.status_code == 200 and r.get_json()["total"] == 4, r.status_code)
+    check("副本被标记不可用", "query error" in db_router.replica_health.reason, db_router.replica_health.snapshot())
+
+    shutil.rmtree(tmp, ignore_errors=True)
+    if failures:
+        print(f"❌ {len(failures)} 项失败")
+        sys.exit(1)
+    print("✅ 全部通过")
+
+
+if __name__ == "__main__":
+    main()
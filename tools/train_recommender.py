@@ -0,0 +1,143 @@
+# tools/train_recommender.py
+# -*- coding: utf-8 -*-
+"""
+离线训练学习型录取模型，导出给 RECOMMENDER_BACKEND=joblib 使用。
+
+数据来源：
+- AssessmentResult.input_payload ：用户特征（gpa / ielts / gre，兼容 {features:{...}} 与扁平两种写法）
+- AssessmentResult.results        ：当时给出的 Top-K 卡片（program.id + prob）
+- Program / ProgramRequirement    ：项目最低要求（与线上 _program_to_candidate 同一套解析）
+
+注意：目前库里没有真实录取结果（Application 只有流程阶段，没有 offer / 拒信），
+标签取的是当时伪模型给出的卡片 prob >= --label-threshold，也就是说训练出的模型只是在
+复现现有启发式规则（蒸馏），换来的是更快的推理和可替换的模型文件，并不会比启发式更准；
+留出集 AUC 衡量的是与启发式的一致程度，不是录取预测能力。
+后续有真实 offer 数据时，只需替换 iter_samples() 的标签来源。
+
+导出文件不压缩（joblib 压缩后无法 mmap），线上用 mmap_mode='r' 加载。
+
+用法：
+  python tools/train_recommender.py --out ./instance/recommender.joblib
+  python tools/train_recommender.py --model gbdt --out ./instance/recommender.joblib
+  然后设置：RECOMMENDER_BACKEND=joblib RECOMMENDER_MODEL_PATH=./instance/recommender.joblib
+"""
+import argparse, os, sys, time
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# 训练脚本只读数据库，不启动 create_app() 里的后台线程
+for _flag in ("FEED_WORKER_ENABLED", "PAY_RECONCILE_ENABLED", "OUTBOX_ENABLED", "ENTITLEMENT_SWEEP_ENABLED"):
+    os.environ.setdefault(_flag, "0")
+
+
+def _features_of(payload) -> dict:
+    if not isinstance(payload, dict):
+        return {}
+    f = payload.get("features")
+    return f if isinstance(f, dict) else payload
+
+
+def iter_samples(rows, cand_by_id, threshold: float):
+    """逐条产出 (feature_row, label)。"""
+    from models.recommender.joblib_model import build_feature_row
+
+    for input_payload, results in rows:
+        feats = _features_of(input_payload)
+        if not feats:
+            continue
+        for card in results or []:
+            if not isinstance(card, dict):
+                continue
+            prog = card.get("program") or {}
+            cand = cand_by_id.get(prog.get("id") or card.get("program_id"))
+            prob = card.get("prob")
+            if cand is None or prob is None:
+                continue
+            try:
+                label = int(float(prob) >= threshold)
+            except Exception:
+                continue
+            yield build_feature_row(cand, feats), label
+
+
+def build_estimator(kind: str):
+    if kind == "gbdt":
+        from sklearn.ensemble import HistGradientBoostingClassifier
+        return HistGradientBoostingClassifier(max_depth=4, max_iter=200, learning_rate=0.05)
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler
+    return make_pipeline(StandardScaler(), LogisticRegression(max_iter=1000))
+
+
+def main():
+    ap = argparse.ArgumentParser(
+        description="Train learned admission model from AssessmentResult history. "
+                    "No real admission outcomes are stored yet: labels are the heuristic's own "
+                    "card prob >= --label-threshold, so the model reproduces (distills) the current heuristic.",
+    )
+    ap.add_argument("--out", required=True, help="导出的模型文件路径（.joblib）")
+    ap.add_argument("--model", choices=["logistic", "gbdt"], default="logistic", help="模型类型，默认 logistic（最小体积）")
+    ap.add_argument("--label-threshold", type=float, default=0.5, help="卡片 prob >= 该值记为正样本（伪标签：来自现有启发式，不是真实录取结果）")
+    ap.add_argument("--min-samples", type=int, default=200, help="样本数下限，不足则放弃训练")
+    ap.add_argument("--test-size", type=float, default=0.2, help="留出集比例，用于打印 AUC")
+    ap.add_argument("--app-factory-path", default="app", help="Flask 工厂模块名（如 app）")
+    ap.add_argument("--app-factory-func", default="create_app", help="Flask 工厂函数名（如 create_app）")
+    args = ap.parse_args()
+
+    import numpy as np
+    import joblib
+
+    mod = __import__(args.app_factory_path, fromlist=[args.app_factory_func])
+    app = getattr(mod, args.app_factory_func)()
+
+    with app.app_context():
+        from extensions import db
+        from sqlalchemy.orm import selectinload
+        from models.assessment_result import AssessmentResult
+        from models.program import Program
+        from models.recommender.joblib_model import FEATURE_NAMES
+        from services.assessment_service import _program_to_candidate
+
+        programs = Program.query.options(selectinload(Program.requirements)).all()
+        cand_by_id = {p.id: _program_to_candidate(p) for p in programs}
+
+        rows = db.session.query(AssessmentResult.input_payload, AssessmentResult.results).yield_per(500)
+        X, y = [], []
+        for row, label in iter_samples(rows, cand_by_id, args.label_threshold):
+            X.append(row); y.append(label)
+
+    print(f"样本数 {len(X)}（正样本 {sum(y)}），项目数 {len(cand_by_id)}")
+    if len(X) < args.min_samples or len(set(y)) < 2:
+        print("❌ 样本不足或只有单一类别，放弃训练", file=sys.stderr)
+        sys.exit(1)
+
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.int64)
+
+    from sklearn.model_selection import train_test_split
+    from sklearn.metrics import roc_auc_score
+
+    X_tr, X_te, y_tr, y_te = train_test_split(X, y, test_size=args.test_size, random_state=42, stratify=y)
+    est = build_estimator(args.model)
+    t0 = time.perf_counter()
+    est.fit(X_tr, y_tr)
+    print(f"训练耗时 {time.perf_counter() - t0:.2f}s")
+    if len(set(y_te)) > 1:
+        print(f"留出集 AUC {roc_auc_score(y_te, est.predict_proba(X_te)[:, 1]):.4f}")
+
+    # 全量重训后导出
+    est.fit(X, y)
+    t0 = time.perf_counter()
+    est.predict_proba(X[:1000])
+    print(f"推理 {min(len(X), 1000)} 行耗时 {(time.perf_counter() - t0) * 1000:.2f}ms")
+
+    version = f"{args.model}-{datetime.utcnow():%Y%m%d%H%M}"
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    joblib.dump({"model": est, "feature_names": FEATURE_NAMES, "version": version}, args.out, compress=0)
+    print(f"✅ 已导出 {args.out}（{os.path.getsize(args.out) / 1024:.1f}KB, version={version}）")
+
+
+if __name__ == "__main__":
+    main()